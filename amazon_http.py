@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse, urlunparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from amazon_reviews import (
+    PAGE_OK,
+    REVIEWS_LINK_SELECTORS,
+    BlockedError,
+    EmptyCallback,
+    PageCallback,
+    PageClass,
+    _ProductCrawl,
+    _ajax_reviews_request,
+    _apply_star_filter_query,
+    _extract_host_and_asin,
+    _last_page,
+    _parse_ajax_response_text,
+    _parse_reviews_from_page_html,
+    _reviews_link_url,
+    _direct_reviews_url,
+    classify_html,
+)
+from browser_pool import USER_AGENT, load_storage_state
+from http_cache import ResponseCache
+from metrics import METRICS
+from page_archive import KIND_AJAX, KIND_PAGE, PageArchive
+from rate_limit import HostRateLimiter
+from review_index import ReviewIndex
+from review_links import ReviewLinkMap
+from session_pool import CSRF_COOKIE, Session, SessionPool
+from utils import BLOCK_STATUSES, BLOCK_URL_MARKERS, STORAGE_STATE_PATH
+from utils import text_has_block as _text_has_block
+
+
+NEXT_PAGE_RE = re.compile(r'<li[^>]*class="[^"]*\ba-last\b[^"]*"[^>]*>\s*<a\b')
+
+# (kind, ASIN, star, page) an archived response is filed under
+ArchiveKey = Tuple[str, str, int, int]
+
+
+class HttpReviewClient:
+    """Keep-alive HTTP client that reuses the cookies saved by ``interactive_login``.
+
+    ``origin`` rewrites every request to another scheme/host (e.g. a local stub
+    server) while cookies and headers are still chosen for the Amazon host.
+    ``page_fanout`` > 1 lets ``scrape_reviews_http`` fetch that many review
+    pages of a product at once once its review total is known. With
+    ``sessions`` each request is sent with the cookies of the next available
+    account instead of ``storage_state_path``. With ``archive`` every review
+    page and AJAX payload fetched is kept for re-parsing.
+    """
+
+    def __init__(
+        self,
+        storage_state_path: Path = STORAGE_STATE_PATH,
+        origin: Optional[str] = None,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        review_links: Optional[ReviewLinkMap] = None,
+        page_fanout: int = 1,
+        sessions: Optional[SessionPool] = None,
+        archive: Optional[PageArchive] = None,
+    ) -> None:
+        self.origin = origin.rstrip("/") if origin else None
+        self.cache = cache
+        self.limiter = limiter
+        self.review_links = review_links
+        self.archive = archive
+        self.page_fanout = max(1, min(page_fanout, pool_size))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "user-agent": USER_AGENT,
+            "accept-language": "en-US,en;q=0.9",
+            "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        })
+        self._cookies: List[Dict] = (load_storage_state(Path(storage_state_path)) or {}).get("cookies", [])
+        self._cookies_lock = threading.Lock()
+        self.sessions = sessions
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "HttpReviewClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _cookies_for(self, host: str, session: Optional[Session] = None) -> Dict[str, str]:
+        jar: Dict[str, str] = {}
+        for c in session.cookies() if session is not None else self._cookies:
+            domain = (c.get("domain") or "").lstrip(".")
+            if domain and (host == domain or host.endswith("." + domain)):
+                jar[c["name"]] = c.get("value", "")
+        return jar
+
+    def _remember_cookies(self, host: str, resp: requests.Response, session: Optional[Session] = None) -> None:
+        with self._cookies_lock:
+            cookies = session.cookies() if session is not None else self._cookies
+            for c in resp.cookies:
+                cookies = [x for x in cookies if x.get("name") != c.name]
+                cookies.append({"name": c.name, "value": c.value, "domain": host})
+            if session is not None:
+                session.state = {**(session.state or {}), "cookies": cookies}
+            else:
+                self._cookies = cookies
+
+    def csrf_token(self, host: str) -> Optional[str]:
+        return self._cookies_for(host).get(CSRF_COOKIE) or None
+
+    def _target(self, url: str) -> Tuple[str, str]:
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if self.origin:
+            o = urlparse(self.origin)
+            url = urlunparse((o.scheme, o.netloc, parsed.path, parsed.params, parsed.query, parsed.fragment))
+        return host, url
+
+    def _check(
+        self,
+        host: str,
+        url: str,
+        resp: requests.Response,
+        session: Optional[Session] = None,
+        archive_key: Optional[ArchiveKey] = None,
+    ) -> str:
+        text = resp.text
+        reason = self._block_reason(resp, text)
+        if self.archive is not None and archive_key is not None:
+            kind, asin, star, page = archive_key
+            # Blocked answers are kept too, for debugging; re-parsing skips them
+            self.archive.put(kind, host, asin, star, page, url, text, status=resp.status_code, blocked=reason is not None)
+        if reason is not None:
+            if self.limiter is not None:
+                self.limiter.blocked(host)
+            if session is not None:
+                self.sessions.blocked(session)
+            raise BlockedError(reason)
+        if self.limiter is not None:
+            self.limiter.success(host)
+        if session is not None:
+            self.sessions.success(session)
+        return text
+
+    def _block_reason(self, resp: requests.Response, text: str) -> Optional[str]:
+        if resp.status_code in BLOCK_STATUSES:
+            return f"HTTP {resp.status_code} for {resp.url}"
+        if any(marker in resp.url for marker in BLOCK_URL_MARKERS):
+            return f"redirected to {resp.url}"
+        if _text_has_block(text):
+            return f"captcha page at {resp.url}"
+        return None
+
+    def _cached(self, method: str, url: str, body: Optional[str]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(method, url, body)
+        if cached is not None:
+            return cached.text()
+        if self.cache.replay:
+            raise BlockedError(f"not in cache (replay): {url}")
+        return None
+
+    def _store(self, method: str, url: str, body: Optional[str], resp: requests.Response, text: str) -> None:
+        if self.cache is not None and resp.status_code == 200:
+            self.cache.put(method, url, body, resp.status_code, resp.headers.get("content-type", ""), text.encode("utf-8"))
+
+    def get(self, url: str, archive_key: Optional[ArchiveKey] = None) -> str:
+        """GET ``url``; with ``archive_key`` a network answer is archived under it, blocked or not."""
+        cached = self._cached("GET", url, None)
+        if cached is not None:
+            return cached
+        host, target = self._target(url)
+        if self.limiter is not None:
+            self.limiter.acquire(host)
+        account = self.sessions.acquire() if self.sessions is not None else None
+        try:
+            with METRICS.timer("http_get"):
+                resp = self.session.get(target, cookies=self._cookies_for(host, account), timeout=self.timeout)
+            METRICS.count("bytes.http", len(resp.content))
+            self._remember_cookies(host, resp, account)
+            text = self._check(host, url, resp, account, archive_key)
+        finally:
+            if account is not None:
+                self.sessions.release(account)
+        self._store("GET", url, None, resp, text)
+        return text
+
+    def post_form(
+        self, url: str, form: Dict[str, str], headers: Dict[str, str], archive_key: Optional[ArchiveKey] = None,
+    ) -> str:
+        body = urlencode(form)
+        cached = self._cached("POST", url, body)
+        if cached is not None:
+            return cached
+        host, target = self._target(url)
+        if self.limiter is not None:
+            self.limiter.acquire(host)
+        account = self.sessions.acquire() if self.sessions is not None else None
+        try:
+            cookies = self._cookies_for(host, account)
+            if account is not None and cookies.get(CSRF_COOKIE):
+                # The token has to match the account whose cookies go with it
+                headers = {**headers, CSRF_COOKIE: cookies[CSRF_COOKIE]}
+            with METRICS.timer("http_post"):
+                resp = self.session.post(target, data=form, headers=headers, cookies=cookies, timeout=self.timeout)
+            METRICS.count("bytes.http", len(resp.content))
+            self._remember_cookies(host, resp, account)
+            text = self._check(host, url, resp, account, archive_key)
+        finally:
+            if account is not None:
+                self.sessions.release(account)
+        self._store("POST", url, body, resp, text)
+        return text
+
+
+def _fetch_reviews_via_ajax_http(client: HttpReviewClient, host: str, asin: str, star: int, page_number: int) -> List[Dict]:
+    url, form, headers = _ajax_reviews_request(host, asin, star, page_number, client.csrf_token(host))
+    text = client.post_form(url, form, headers, archive_key=(KIND_AJAX, asin, star, page_number))
+    return _parse_ajax_response_text(text)
+
+
+def _fetch_review_page_http(
+    client: HttpReviewClient, base_reviews_url: str, host: str, asin: str, star: int, page_idx: int,
+) -> Tuple[PageClass, List[Dict], bool, float]:
+    """Fetch, classify and parse one review page: (class, rows, has_next, seconds)."""
+    started = time.perf_counter()
+    try:
+        url = _apply_star_filter_query(base_reviews_url, star, page_number=page_idx)
+        html = client.get(url, archive_key=(KIND_PAGE, asin, star, page_idx))
+        status = classify_html(html)
+        chunk: List[Dict] = []
+        if status.state == PAGE_OK:
+            with METRICS.timer("parse_html", asin=asin, page=page_idx):
+                chunk = _parse_reviews_from_page_html(html)
+            if not chunk:
+                METRICS.count("fallback.ajax")
+                with METRICS.timer("ajax_fallback", asin=asin, page=page_idx):
+                    chunk = _fetch_reviews_via_ajax_http(client, host, asin, star, page_idx)
+    except BlockedError as e:
+        e.next_page = page_idx
+        raise
+    has_next = status.state == PAGE_OK and bool(NEXT_PAGE_RE.search(html))
+    return status, chunk, has_next, time.perf_counter() - started
+
+
+def _reviews_link_http(client: HttpReviewClient, product_url: str, reviews_url: str, host: str, asin: str) -> Optional[str]:
+    """The detail page's reviews link when it differs from ``reviews_url``; learned in ``client.review_links``."""
+    METRICS.count("fallback.detail_page")
+    try:
+        with METRICS.timer("reviews_link", asin=asin):
+            html = client.get(product_url)
+    except BlockedError:
+        return None
+    soup = BeautifulSoup(html, "html.parser")
+    href = None
+    for sel in REVIEWS_LINK_SELECTORS:
+        link = soup.select_one(sel)
+        if link is not None:
+            href = link.get("href")
+            break
+    if not href:
+        return None
+    found = _reviews_link_url(product_url, href)
+    if found == reviews_url:
+        return None
+    if client.review_links is not None:
+        client.review_links.put(host, asin, found)
+    return found
+
+
+def _fetch_review_pages_http(
+    client: HttpReviewClient,
+    base_reviews_url: str,
+    host: str,
+    asin: str,
+    star: int,
+    start_page: int,
+    max_pages: int,
+    fanout: int = 1,
+    product_url: Optional[str] = None,
+) -> Iterator[Tuple[int, PageClass, List[Dict], float]]:
+    """Yield (page, class, rows, seconds) in page order.
+
+    The first page's review total bounds the crawl; with ``fanout`` > 1 the
+    remaining pages are then fetched that many at a time. If the first page
+    is not a review list, the reviews link is looked up on ``product_url``.
+    """
+    status, chunk, has_next, seconds = _fetch_review_page_http(client, base_reviews_url, host, asin, star, start_page)
+    # Like the browser engines: neither a review list nor a no-reviews notice, so the reviews live elsewhere
+    if status.state == PAGE_OK and not status.listing and product_url is not None and product_url != base_reviews_url:
+        found = _reviews_link_http(client, product_url, base_reviews_url, host, asin)
+        if found is not None:
+            base_reviews_url = found
+            status, chunk, has_next, seconds = _fetch_review_page_http(client, base_reviews_url, host, asin, star, start_page)
+    yield start_page, status, chunk, seconds
+    if not has_next:
+        return
+    last_page = _last_page(status.total, max_pages)
+    rest = range(start_page + 1, last_page + 1)
+    if fanout <= 1 or status.total is None:
+        for page_idx in rest:
+            status, chunk, has_next, seconds = _fetch_review_page_http(client, base_reviews_url, host, asin, star, page_idx)
+            yield page_idx, status, chunk, seconds
+            if not has_next:
+                return
+        return
+    executor = ThreadPoolExecutor(max_workers=fanout, thread_name_prefix=f"http-{asin}")
+    try:
+        futures = [
+            (page_idx, executor.submit(_fetch_review_page_http, client, base_reviews_url, host, asin, star, page_idx))
+            for page_idx in rest
+        ]
+        for page_idx, future in futures:
+            status, chunk, has_next, seconds = future.result()
+            yield page_idx, status, chunk, seconds
+            if status.state != PAGE_OK:
+                return
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def scrape_reviews_http(
+    product_url: str,
+    star: int,
+    max_pages: int = 2,
+    client: Optional[HttpReviewClient] = None,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[PageCallback] = None,
+    start_page: int = 1,
+    on_empty: Optional[EmptyCallback] = None,
+) -> List[Dict]:
+    """Browserless variant of ``scrape_reviews_for_product``; raises ``BlockedError`` on a block.
+
+    Pages already handed to ``on_page`` stay delivered; ``BlockedError.rows`` holds
+    them and ``BlockedError.next_page`` says where a browser fallback should pick up.
+    """
+    if client is None:
+        with HttpReviewClient() as own_client:
+            return scrape_reviews_http(
+                product_url, star, max_pages=max_pages, client=own_client, index=index, on_page=on_page, start_page=start_page,
+                on_empty=on_empty,
+            )
+
+    if start_page > max_pages:
+        return []
+    host, asin = _extract_host_and_asin(product_url)
+    if not asin:
+        return []
+    base_reviews_url = _direct_reviews_url(product_url, client.review_links)
+
+    crawl = _ProductCrawl(asin, star, max_pages, index, on_page, on_empty)
+    # Fanning out would fetch pages past the first fully known one
+    fanout = 1 if index is not None else client.page_fanout
+    pages = _fetch_review_pages_http(client, base_reviews_url, host, asin, star, start_page, max_pages, fanout, product_url)
+    try:
+        for page_idx, status, chunk, seconds in pages:
+            if not crawl.admit(page_idx, status) or not crawl.deliver(page_idx, chunk, seconds):
+                break
+    except BlockedError as e:
+        METRICS.count("blocked")
+        e.rows = crawl.finish()
+        raise
+    finally:
+        pages.close()
+    return crawl.finish()
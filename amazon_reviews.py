@@ -1,15 +1,30 @@
 from __future__ import annotations
 
 import json
+import math
 import re
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Tuple
 from urllib.parse import urlencode, urlparse, parse_qs, urlunparse
 
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from browser_pool import BrowserPool
+from http_cache import ResponseCache
+from metrics import METRICS
+from page_archive import KIND_AJAX, KIND_PAGE, PageArchive
+from rate_limit import HostRateLimiter
+from review_index import ReviewIndex
+from review_links import ReviewLinkMap
+from review_parser import DATE_RE, parse_reviews_html
+from session_pool import SessionPool
+from utils import BLOCK_FLAGS
+from utils import response_is_blocked as _response_is_blocked
+from utils import text_has_block as _text_has_block
 
-from utils import STORAGE_STATE_PATH, write_text
+
+# Called with (page_number, rows) as soon as each review page is parsed
+PageCallback = Callable[[int, List[Dict]], None]
+# Called with the page number when a page is classified as having no reviews
+EmptyCallback = Callable[[int], None]
 
 
 STAR_MAP = {
@@ -20,6 +35,10 @@ STAR_MAP = {
     1: "one_star",
 }
 
+# Pseudo star for the combined listing; STAR_MAP has no entry, so it maps to "all_stars"
+ALL_STARS = 0
+REVIEWS_PER_PAGE = 10
+
 
 ASIN_REGEXES = [
     re.compile(r"/dp/([A-Z0-9]{10})"),
@@ -43,21 +62,23 @@ def _reviews_url_from_asin(host: str, asin: str) -> str:
     return f"https://{host}/product-reviews/{asin}"
 
 
-def _get_reviews_link(page, product_url: str) -> Optional[str]:
-    page.goto(product_url, wait_until="domcontentloaded", timeout=60000)
-    _dismiss_overlays(page)
-    link = page.locator('a[data-hook="see-all-reviews-link-foot"]').first
-    if link.count() == 0:
-        link = page.locator('a[data-hook="see-all-reviews-link"]').first
-    if link.count() > 0:
-        href = link.get_attribute("href")
-        if href:
-            return ("https://" + urlparse(product_url).netloc + href) if href.startswith("/") else href
+# "See all reviews" links on a product detail page, in order of preference
+REVIEWS_LINK_SELECTORS = ['a[data-hook="see-all-reviews-link-foot"]', 'a[data-hook="see-all-reviews-link"]']
+
 
+def _reviews_link_url(product_url: str, href: str) -> str:
+    return ("https://" + urlparse(product_url).netloc + href) if href.startswith("/") else href
+
+
+def _direct_reviews_url(product_url: str, review_links: Optional[ReviewLinkMap] = None) -> Optional[str]:
+    """Reviews URL without visiting the detail page: the input itself, a remembered exception, or the ASIN URL."""
+    if "/product-reviews/" in product_url:
+        return product_url
     host, asin = _extract_host_and_asin(product_url)
-    if asin:
-        return _reviews_url_from_asin(host, asin)
-    return None
+    if not asin:
+        return None
+    known = review_links.get(host, asin) if review_links is not None else None
+    return known or _reviews_url_from_asin(host, asin)
 
 
 def _apply_star_filter_query(base_reviews_url: str, star: int, page_number: int = 1, all_stars: bool = False) -> str:
@@ -96,24 +117,226 @@ def _click_star_filter_if_present(page, star: int) -> bool:
     return False
 
 
+PAGE_BLOCKED = "blocked"
+PAGE_EMPTY = "empty"
+PAGE_OK = "ok"
+
+
+class BlockedError(Exception):
+    """Raised when Amazon answers with a block or captcha that retries did not get past.
+
+    ``rows`` holds what the product's crawl had already delivered and
+    ``next_page`` is the first page it did not get, where a resume or a
+    fallback engine should pick up.
+    """
+
+    def __init__(self, message: str, next_page: int = 1) -> None:
+        super().__init__(message)
+        self.next_page = next_page
+        self.rows: List[Dict] = []
+
+
+def _blocked(asin: Optional[str], page_idx: int, what: str = "blocked") -> BlockedError:
+    return BlockedError(f"{asin} page {page_idx}: {what}", next_page=page_idx)
+
+
+class PageClass(NamedTuple):
+    state: str
+    # Review count for the current filter, from the "N total ratings, M with reviews" line
+    total: Optional[int] = None
+    # The page has a review list or filter summary (False on detail and search pages)
+    listing: bool = False
+    # HTTP status of the navigation that loaded the page; None when it was not navigated to
+    status: Optional[int] = None
+
+
+REVIEW_TOTAL_SELECTOR = '[data-hook="cr-filter-info-review-rating-count"], [data-hook="cr-filter-info-section"]'
+REVIEW_TOTAL_RE = re.compile(
+    r'data-hook="cr-filter-info-(?:review-rating-count|section)"[^>]*>(.*?)</(?:div|span)>', re.S
+)
+TOTAL_NUMBER_RE = re.compile(r"\d[\d,.\s]*")
+
+# One evaluate per page: selector checks first, the body text is only scanned when no review is present.
+# textContent (unlike inner_text) does not force a layout.
+_CLASSIFY_PAGE_JS = r"""
+({blockFlags, emptyFlags, totalSelector}) => {
+  const info = document.querySelector(totalSelector);
+  const listing = !!(document.querySelector('#cm_cr-review_list') || info);
+  const total = info ? info.textContent : null;
+  if (document.querySelector('div[data-hook="review"], li[data-hook="review"]')) {
+    return {state: 'ok', total, listing};
+  }
+  if (document.querySelector('#captchacharacters, form[action*="validateCaptcha"]')) {
+    return {state: 'blocked', total: null, listing: false};
+  }
+  const text = (document.body ? document.body.textContent : '').toLowerCase();
+  if (blockFlags.some(f => text.includes(f))) return {state: 'blocked', total: null, listing: false};
+  if (emptyFlags.some(f => text.includes(f))) return {state: 'empty', total, listing: true};
+  return {state: 'ok', total, listing};
+}
+"""
+
+
+def parse_review_total(text: Optional[str]) -> Optional[int]:
+    """Filtered review count from "1,234 total ratings, 321 with reviews" style text: the last number."""
+    if not text:
+        return None
+    numbers = [re.sub(r"\D", "", n) for n in TOTAL_NUMBER_RE.findall(text)]
+    numbers = [n for n in numbers if n]
+    return int(numbers[-1]) if numbers else None
+
+
+def _page_class(state: str, total_text: Optional[str], listing: bool) -> PageClass:
+    total = parse_review_total(total_text)
+    if state == PAGE_OK and total == 0:
+        state = PAGE_EMPTY
+    return PageClass(state, total, listing)
+
+
+def _classify_page(page) -> PageClass:
+    raw = page.evaluate(_CLASSIFY_PAGE_JS, {
+        "blockFlags": [f.lower() for f in BLOCK_FLAGS],
+        "emptyFlags": [f.lower() for f in NO_REVIEWS_MARKERS],
+        "totalSelector": REVIEW_TOTAL_SELECTOR,
+    })
+    return _page_class(raw["state"], raw["total"], raw["listing"])
+
+
+def classify_html(html: str) -> PageClass:
+    """``_classify_page`` for raw HTML (HTTP engine, cached pages)."""
+    m = REVIEW_TOTAL_RE.search(html)
+    total_text = re.sub(r"<[^>]+>", " ", m.group(1)) if m else None
+    listing = bool(m) or 'id="cm_cr-review_list"' in html
+    if 'data-hook="review"' in html:
+        return _page_class(PAGE_OK, total_text, listing)
+    if _text_has_block(html):
+        return PageClass(PAGE_BLOCKED)
+    if _text_says_no_reviews(html):
+        return _page_class(PAGE_EMPTY, total_text, True)
+    return _page_class(PAGE_OK, total_text, listing)
+
+
+def _last_page(total: Optional[int], max_pages: int) -> int:
+    """Last page worth requesting: from the review total when known, else ``max_pages``."""
+    if total is None:
+        return max_pages
+    return max(1, min(max_pages, math.ceil(total / REVIEWS_PER_PAGE)))
+
+
 def _page_has_captcha_or_block(page) -> bool:
-    text = page.inner_text("body")
-    flags = [
-        "Enter the characters you see below",
-        "To discuss automated access to Amazon data",
-        "sorry we just need to make sure you're not a robot",
-        "CBI_ROBOT_MITIGATION",
-    ]
-    return any(flag.lower() in text.lower() for flag in flags)
+    return _classify_page(page).state == PAGE_BLOCKED
 
 
-def _page_says_no_reviews(page) -> bool:
-    text = page.inner_text("body")
-    flags = [
-        "There are no reviews that match the current selection",
-        "No customer reviews",
-    ]
-    return any(flag.lower() in text.lower() for flag in flags)
+# Extra attempts per navigation after a block, each behind the limiter's backoff
+BLOCK_RETRIES = 2
+
+
+# The page logic below is written once, as generators that yield I/O operations
+# as (name, *args) tuples. ``_run_steps`` performs them with ``_SyncIO``;
+# amazon_reviews_async awaits the same operations, so the sync and async
+# engines share navigation, classification, fallbacks and delivery.
+Steps = Generator[Tuple[Any, ...], Any, Any]
+
+
+def _navigate_steps(
+    page, url: str, limiter: Optional[HostRateLimiter] = None, timeout: int = 60000, sessions: Optional[SessionPool] = None,
+) -> Steps:
+    host = urlparse(url).netloc
+    for _ in range(BLOCK_RETRIES + 1 if limiter is not None else 1):
+        if limiter is not None:
+            yield ("acquire", limiter, host)
+        resp = yield ("goto", page, url, timeout)
+        code = resp.status if resp is not None else None
+        if _response_is_blocked(code, page.url):
+            result = PageClass(PAGE_BLOCKED, status=code)
+        else:
+            result = (yield ("classify", page))._replace(status=code)
+        # After classifying, so a captcha served with a 200 cools the account down too
+        if sessions is not None:
+            sessions.navigated(page.context, result.state == PAGE_BLOCKED)
+        if result.state != PAGE_BLOCKED:
+            if limiter is not None:
+                limiter.success(host)
+            return result
+        METRICS.count("blocked")
+        backoff = f", backing off {limiter.blocked(host):.1f}s" if limiter is not None else ""
+        print(f"{host}: blocked at {url}{backoff}")
+    return result
+
+
+def _reviews_link_steps(
+    page, product_url: str, limiter: Optional[HostRateLimiter] = None, sessions: Optional[SessionPool] = None,
+) -> Steps:
+    if (yield from _navigate_steps(page, product_url, limiter, sessions=sessions)).state != PAGE_BLOCKED:
+        yield ("dismiss", page)
+        href = yield ("reviews_link_href", page)
+        if href:
+            return _reviews_link_url(product_url, href)
+    host, asin = _extract_host_and_asin(product_url)
+    if asin:
+        return _reviews_url_from_asin(host, asin)
+    return None
+
+
+def _open_reviews_steps(
+    page,
+    product_url: str,
+    reviews_url: str,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    sessions: Optional[SessionPool] = None,
+) -> Steps:
+    result = yield from _navigate_steps(page, reviews_url, limiter, sessions=sessions)
+    if result.state == PAGE_BLOCKED:
+        return None
+    if result.listing:
+        return reviews_url
+    host, asin = _extract_host_and_asin(product_url)
+    METRICS.count("fallback.detail_page")
+    with METRICS.timer("reviews_link", asin=asin):
+        found = yield from _reviews_link_steps(page, product_url, limiter, sessions)
+    if not found or found == reviews_url:
+        return reviews_url
+    if review_links is not None and asin:
+        review_links.put(host, asin, found)
+    result = yield from _navigate_steps(page, found, limiter, sessions=sessions)
+    return found if result.state != PAGE_BLOCKED else None
+
+
+def _navigate(
+    page, url: str, limiter: Optional[HostRateLimiter] = None, timeout: int = 60000, sessions: Optional[SessionPool] = None,
+) -> PageClass:
+    """Navigate behind the host's rate limiter and classify the result; ``PAGE_BLOCKED`` once retries run out.
+
+    With ``sessions`` the result counts towards the account the page's context is signed in as.
+    """
+    return _run_steps(_navigate_steps(page, url, limiter, timeout, sessions))
+
+
+def _goto(
+    page, url: str, limiter: Optional[HostRateLimiter] = None, timeout: int = 60000, sessions: Optional[SessionPool] = None,
+) -> bool:
+    """Navigate behind the host's rate limiter; False if the page is still a block or captcha."""
+    return _navigate(page, url, limiter, timeout, sessions).state != PAGE_BLOCKED
+
+
+def _open_reviews_page(
+    page,
+    product_url: str,
+    reviews_url: str,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    sessions: Optional[SessionPool] = None,
+) -> Optional[str]:
+    """Navigate to ``reviews_url``; only if that is not a review list, look the link up on the detail page.
+
+    Returns the reviews URL that worked, or None when blocked.
+    """
+    return _run_steps(_open_reviews_steps(page, product_url, reviews_url, limiter, review_links, sessions))
+
+
+def _text_says_no_reviews(text: str) -> bool:
+    return any(flag.lower() in text.lower() for flag in NO_REVIEWS_MARKERS)
 
 
 def _expand_truncated_reviews(page) -> None:
@@ -126,327 +349,217 @@ def _expand_truncated_reviews(page) -> None:
             continue
 
 
-def _dismiss_overlays(page) -> None:
-    for sel in [
-        '#sp-cc-accept',
-        'input#sp-cc-accept',
-        'input[name="accept"]',
-    ]:
-        btn = page.locator(sel)
-        if btn.count() > 0:
-            try:
-                btn.click(timeout=500)
-                time.sleep(0.2)
-            except Exception:
-                pass
-    for sel in [
-        'input[name="glowDoneButton"]',
-        'button[name="glowDoneButton"]',
-        '#a-popover-1 button[name="glowDoneButton"]',
-    ]:
-        btn = page.locator(sel)
-        if btn.count() > 0:
-            try:
-                btn.click(timeout=500)
-                time.sleep(0.2)
-            except Exception:
-                pass
-
-
-def _parse_reviews_on_page(page) -> List[Dict]:
-    results: List[Dict] = []
-    try:
-        page.wait_for_selector('#cm_cr-review_list, div[data-hook="review"], span[data-hook="review-body"]', timeout=30000)
-    except Exception:
-        return results
+OVERLAY_SELECTORS = [
+    '#sp-cc-accept',
+    'input#sp-cc-accept',
+    'input[name="accept"]',
+    'input[name="glowDoneButton"]',
+    'button[name="glowDoneButton"]',
+    '#a-popover-1 button[name="glowDoneButton"]',
+]
 
-    _expand_truncated_reviews(page)
+_FIND_OVERLAYS_JS = "sels => sels.filter(s => document.querySelector(s))"
 
-    review_items = page.locator('div[data-hook="review"]')
-    if review_items.count() == 0:
-        review_items = page.locator('#cm_cr-review_list div.review')
-
-    def _extract_date_text_from_node(n):
-        # Prefer explicit selector
-        loc = n.locator('span[data-hook="review-date"]')
-        if loc.count() > 0:
-            return loc.nth(0).inner_text()
-        loc = n.locator('.review-date')
-        if loc.count() > 0:
-            return loc.nth(0).inner_text()
-        # Fallback: nearest preceding date inside review subtree
-        try:
-            loc = n.locator('xpath=.//preceding::span[@data-hook="review-date"][1] | .//preceding::span[contains(@class, "review-date")][1]').first
-            if loc and loc.count() > 0:
-                return loc.inner_text()
-        except Exception:
-            pass
-        # Fallback regex
-        try:
-            text = n.inner_text()
-            m = re.search(r'(Reviewed[^\n]* on [^\n]+)|(\b\d{4}[-/年].{0,8}?\d{1,2}[-/月].{0,8}?\d{1,2}日?\b)', text)
-            return m.group(0) if m else ""
-        except Exception:
-            return ""
-
-    def _extract_author_from_node(n):
-        # Prefer explicit selector
-        loc = n.locator('.a-profile-content .a-profile-name')
-        if loc.count() > 0:
-            return loc.nth(0).inner_text()
-        for sel in ['span.a-profile-name', 'span[data-hook="review-author"]', 'a[data-hook="review-author"]']:
-            loc = n.locator(sel)
-            if loc.count() > 0:
-                return loc.nth(0).inner_text()
-        # Fallback: nearest preceding profile name
+
+def _dismiss_overlays(page) -> None:
+    # One round-trip to see which overlays exist; usually none do
+    for sel in page.evaluate(_FIND_OVERLAYS_JS, OVERLAY_SELECTORS):
         try:
-            loc = n.locator('xpath=.//preceding::span[contains(@class, "a-profile-name")][1] | .//preceding::a[@data-hook="review-author"][1]').first
-            if loc and loc.count() > 0:
-                return loc.inner_text()
+            page.locator(sel).first.click(timeout=500)
         except Exception:
             pass
-        return ""
 
-    if review_items.count() > 0:
-        count = review_items.count()
-        for i in range(count):
-            node = review_items.nth(i)
-            body_locator = node.locator('span[data-hook="review-body"] span')
-            if body_locator.count() == 0:
-                body_locator = node.locator('span[data-hook="review-body"]')
-            if body_locator.count() == 0:
-                body_locator = node.locator('.review-text-content span')
-            content = body_locator.all_text_contents()
-            content_text = "\n".join([t.strip() for t in content if t and t.strip()])
-
-            rating_locator = node.locator('i[data-hook="review-star-rating"] span')
-            if rating_locator.count() == 0:
-                rating_locator = node.locator('i[data-hook="cmps-review-star-rating"] span')
-            if rating_locator.count() == 0:
-                rating_locator = node.locator('span.a-icon-alt')
-            rating_text = rating_locator.nth(0).inner_text() if rating_locator.count() > 0 else ""
-
-            nickname = _extract_author_from_node(node)
-            date_text = _extract_date_text_from_node(node)
-
-            if not (content_text or rating_text or nickname or date_text):
+
+NO_REVIEWS_MARKERS = [
+    "There are no reviews that match the current selection",
+    "No customer reviews",
+]
+REVIEW_LIST_SELECTOR = '#cm_cr-review_list, div[data-hook="review"], span[data-hook="review-body"]'
+
+# Runs the whole DOM extraction in one page.evaluate round-trip. Mirrors the
+# locator fallbacks (selector chains, XPath preceding:: lookups) and reports
+# which fallback fired in "fallbacks". Where no date element is found the
+# review's text comes back as "date_scan" and the date regex runs in Python,
+# so it matches exactly what the locator code matched. "bodies" holds the
+# standalone review-body scan, used when no review item yields a row.
+_EXTRACT_REVIEWS_JS = r"""
+() => {
+  const fallbacks = {};
+  const hit = (name) => { fallbacks[name] = (fallbacks[name] || 0) + 1; };
+  const text = (el) => (el ? (el.innerText || "") : "");
+  const first = (root, sels) => {
+    for (const sel of sels) {
+      const el = root.querySelector(sel);
+      if (el) return el;
+    }
+    return null;
+  };
+  const xpathFirst = (node, expr) => {
+    try {
+      const snap = document.evaluate(expr, node, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+      return snap.snapshotLength > 0 ? snap.snapshotItem(0) : null;
+    } catch (e) {
+      return null;
+    }
+  };
+  const extractDate = (n) => {
+    const el = first(n, ['span[data-hook="review-date"]', '.review-date']);
+    if (el) return text(el);
+    const prev = xpathFirst(n, './/preceding::span[@data-hook="review-date"][1] | .//preceding::span[contains(@class, "review-date")][1]');
+    if (prev) { hit("date:preceding"); return text(prev); }
+    return null;
+  };
+  const extractAuthor = (n) => {
+    const el = first(n, ['.a-profile-content .a-profile-name', 'span.a-profile-name', 'span[data-hook="review-author"]', 'a[data-hook="review-author"]']);
+    if (el) return text(el);
+    const prev = xpathFirst(n, './/preceding::span[contains(@class, "a-profile-name")][1] | .//preceding::a[@data-hook="review-author"][1]');
+    if (prev) { hit("author:preceding"); return text(prev); }
+    return "";
+  };
+  const joinTexts = (els) => els.map((e) => (e.textContent || "").trim()).filter((t) => t).join("\n");
+
+  const reviews = [];
+  let items = Array.from(document.querySelectorAll('div[data-hook="review"]'));
+  if (items.length === 0) {
+    items = Array.from(document.querySelectorAll('#cm_cr-review_list div.review'));
+    if (items.length > 0) hit("items:review_list_div");
+  }
+  for (const node of items) {
+    let bodies = [];
+    for (const sel of ['span[data-hook="review-body"] span', 'span[data-hook="review-body"]', '.review-text-content span']) {
+      bodies = Array.from(node.querySelectorAll(sel));
+      if (bodies.length > 0) break;
+    }
+    const rating = first(node, ['i[data-hook="review-star-rating"] span', 'i[data-hook="cmps-review-star-rating"] span', 'span.a-icon-alt']);
+    const row = {
+      review_content: joinTexts(bodies),
+      review_rating_text: text(rating),
+      review_date: extractDate(node),
+      reviewer: extractAuthor(node),
+    };
+    if (row.review_date === null) {
+      row.review_date = "";
+      row.date_scan = text(node);
+    } else if (!(row.review_content || row.review_rating_text || row.reviewer || row.review_date)) {
+      continue;
+    }
+    reviews.push(row);
+  }
+  // A row waiting on the date regex may still be dropped in Python
+  const kept = reviews.some((r) => r.review_content || r.review_rating_text || r.reviewer || r.review_date);
+  const scanned = [];
+  if (!kept) {
+    // Fallback: scan standalone bodies on the page; like the locator code, only their text is taken
+    for (const body of document.querySelectorAll('span[data-hook="review-body"]')) {
+      const content = joinTexts([body]);
+      if (!content) continue;
+      scanned.push({ review_content: content, review_rating_text: "", review_date: "", reviewer: "" });
+    }
+  }
+  return { reviews, bodies: scanned, fallbacks };
+}
+"""
+
+
+def _extracted_rows(result: Dict, fallbacks: Optional[Dict[str, int]] = None) -> List[Dict]:
+    """Rows from an ``_EXTRACT_REVIEWS_JS`` result, with the date regex applied."""
+    hits = dict(result.get("fallbacks", {}))
+    rows: List[Dict] = []
+    for row in result.get("reviews", []):
+        scan = row.pop("date_scan", None)
+        if scan is not None:
+            m = DATE_RE.search(scan)
+            if m:
+                row["review_date"] = m.group(0)
+                hits["date:regex"] = hits.get("date:regex", 0) + 1
+            if not (row["review_content"] or row["review_rating_text"] or row["reviewer"] or row["review_date"]):
                 continue
+        rows.append(row)
+    if not rows:
+        rows = result.get("bodies", [])
+        if rows:
+            hits["body_scan"] = len(rows)
+    if fallbacks is not None:
+        for name, n in hits.items():
+            fallbacks[name] = fallbacks.get(name, 0) + n
+    return rows
+
+
+def _parse_reviews_on_page(page, fallbacks: Optional[Dict[str, int]] = None) -> List[Dict]:
+    try:
+        page.wait_for_selector(REVIEW_LIST_SELECTOR, timeout=30000)
+    except Exception:
+        return []
 
-            results.append({
-                "review_content": content_text,
-                "review_rating_text": rating_text,
-                "review_date": date_text,
-                "reviewer": nickname,
-            })
-        if results:
-            return results
-
-    # Fallback: scan standalone bodies on the page
-    bodies = page.locator('span[data-hook="review-body"]')
-    for i in range(bodies.count()):
-        body_node = bodies.nth(i)
-        content_list = body_node.all_text_contents()
-        content_text = "\n".join([t.strip() for t in content_list if t and t.strip()])
-        rating_text = ""
-        date_text = ""
-        nickname = ""
-        try:
-            anc = body_node.locator('xpath=ancestor::div[contains(@data-hook, "review")] | xpath=ancestor::div[contains(@class, "review")]').first
-            if anc and anc.count() > 0:
-                rt = anc.locator('i//span[contains(@class, "a-icon-alt")]').first
-                if rt.count() == 0:
-                    rt = anc.locator('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span').first
-                if rt and rt.count() > 0:
-                    rating_text = rt.inner_text()
-                # Prefer explicit selectors
-                name_loc = anc.locator('.a-profile-content .a-profile-name')
-                if name_loc.count() == 0:
-                    name_loc = anc.locator('span.a-profile-name, a[data-hook="review-author"], span[data-hook="review-author"]')
-                if name_loc and name_loc.count() > 0:
-                    nickname = name_loc.nth(0).inner_text()
-                date_loc = anc.locator('span[data-hook="review-date"], .review-date')
-                if date_loc and date_loc.count() > 0:
-                    date_text = date_loc.nth(0).inner_text()
-                else:
-                    date_text = _extract_date_text_from_node(anc)
-        except Exception:
-            pass
-        if content_text:
-            results.append({
-                "review_content": content_text,
-                "review_rating_text": rating_text,
-                "review_date": date_text,
-                "reviewer": nickname,
-            })
-    return results
+    _expand_truncated_reviews(page)
 
+    return _extracted_rows(page.evaluate(_EXTRACT_REVIEWS_JS), fallbacks)
 
-def _parse_reviews_from_ajax_html(html_text: str) -> List[Dict]:
-    soup = BeautifulSoup(html_text, "html.parser")
-    results: List[Dict] = []
-    review_items = soup.select('div[data-hook="review"], #cm_cr-review_list div.review, div.a-section.review')
-
-    def _extract_date_text(node):
-        el = node.select_one('span[data-hook="review-date"], .review-date')
-        if el:
-            return el.get_text(strip=True)
-        # Fallback: nearest preceding date
-        prev = node.find_previous(lambda t: t.name == 'span' and (t.get('data-hook') == 'review-date' or 'review-date' in t.get('class', [])))
-        if prev:
-            return prev.get_text(strip=True)
-        # Regex fallback
-        text = node.get_text("\n", strip=True)
-        m = re.search(r'(Reviewed[^\n]* on [^\n]+)|(\b\d{4}[-/年].{0,8}?\d{1,2}[-/月].{0,8}?\d{1,2}日?\b)', text)
-        return m.group(0) if m else ""
-
-    def _extract_author(node):
-        # Prefer explicit selector
-        el = node.select_one('.a-profile-content .a-profile-name')
-        if el:
-            return el.get_text(strip=True)
-        for sel in ['span.a-profile-name', 'span[data-hook="review-author"]', 'a[data-hook="review-author"]']:
-            el = node.select_one(sel)
-            if el:
-                return el.get_text(strip=True)
-        # Fallback: nearest preceding profile name
-        prev = node.find_previous(lambda t: (t.name in ['span', 'a']) and ('a-profile-name' in t.get('class', []) or t.get('data-hook') == 'review-author'))
-        if prev:
-            return prev.get_text(strip=True)
-        return ""
 
-    for node in review_items:
-        body_texts = [t.get_text(strip=True) for t in node.select('span[data-hook="review-body"] span, span[data-hook="review-body"], .review-text-content span')]
-        content_text = "\n".join([t for t in body_texts if t])
-        rating_el = node.select_one('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span, span.a-icon-alt')
-        rating_text = rating_el.get_text(strip=True) if rating_el else ""
-        nickname = _extract_author(node)
-        date_text = _extract_date_text(node)
-        if not (content_text or rating_text or nickname or date_text):
-            continue
-        results.append({
-            "review_content": content_text,
-            "review_rating_text": rating_text,
-            "review_date": date_text,
-            "reviewer": nickname,
-        })
-
-    if results:
-        return results
-
-    # Fallback: scan standalone bodies when container markup differs
-    for body in soup.select('span[data-hook="review-body"]'):
-        content_text = body.get_text("\n", strip=True)
-        anc = body.find_parent(lambda tag: (getattr(tag, 'name', None) == 'div' and 'review' in ' '.join(tag.get('class', []))) or (tag and tag.has_attr('data-hook') and 'review' in tag['data-hook']))
-        rating_text = ""
-        date_text = ""
-        nickname = ""
-        search_base = anc if anc else body
-        rt = search_base.select_one('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span, span.a-icon-alt')
-        rating_text = rt.get_text(strip=True) if rt else ""
-        dt = search_base.select_one('span[data-hook="review-date"], .review-date')
-        if dt:
-            date_text = dt.get_text(strip=True)
-        else:
-            prev_dt = search_base.find_previous(lambda t: t.name == 'span' and (t.get('data-hook') == 'review-date' or 'review-date' in t.get('class', [])))
-            if prev_dt:
-                date_text = prev_dt.get_text(strip=True)
-        au = search_base.select_one('.a-profile-content .a-profile-name, span.a-profile-name, span[data-hook="review-author"], a[data-hook="review-author"]')
-        nickname = au.get_text(strip=True) if au else (search_base.find_previous(lambda t: (t.name in ['span','a']) and ('a-profile-name' in t.get('class', []) or t.get('data-hook') == 'review-author')).get_text(strip=True) if search_base.find_previous(lambda t: (t.name in ['span','a']) and ('a-profile-name' in t.get('class', []) or t.get('data-hook') == 'review-author')) else "")
-        if content_text:
-            results.append({
-                "review_content": content_text,
-                "review_rating_text": rating_text,
-                "review_date": date_text,
-                "reviewer": nickname,
-            })
-    return results
+def _parse_reviews_from_ajax_html(html_text: str) -> List[Dict]:
+    return parse_reviews_html(html_text)
 
 
 def _parse_reviews_from_page_html(html_text: str) -> List[Dict]:
-    soup = BeautifulSoup(html_text, "html.parser")
-    results: List[Dict] = []
-    review_items = soup.select('div[data-hook="review"], #cm_cr-review_list div.review, div.a-section.review')
-
-    def _extract_date_text(node):
-        el = node.select_one('span[data-hook="review-date"], .review-date')
-        if el:
-            return el.get_text(strip=True)
-        prev = node.find_previous(lambda t: t.name == 'span' and (t.get('data-hook') == 'review-date' or 'review-date' in t.get('class', [])))
-        if prev:
-            return prev.get_text(strip=True)
-        text = node.get_text("\n", strip=True)
-        m = re.search(r'(Reviewed[^\n]* on [^\n]+)|(\b\d{4}[-/年].{0,8}?\d{1,2}[-/月].{0,8}?\d{1,2}日?\b)', text)
-        return m.group(0) if m else ""
-
-    def _extract_author(node):
-        el = node.select_one('.a-profile-content .a-profile-name')
-        if el:
-            return el.get_text(strip=True)
-        for sel in ['span.a-profile-name', 'span[data-hook="review-author"]', 'a[data-hook="review-author"]']:
-            el = node.select_one(sel)
-            if el:
-                return el.get_text(strip=True)
-        prev = node.find_previous(lambda t: (t.name in ['span','a']) and ('a-profile-name' in t.get('class', []) or t.get('data-hook') == 'review-author'))
-        if prev:
-            return prev.get_text(strip=True)
-        return ""
-
-    for node in review_items:
-        body_texts = [t.get_text(strip=True) for t in node.select('span[data-hook="review-body"] span, span[data-hook="review-body"], .review-text-content span')]
-        content_text = "\n".join([t for t in body_texts if t])
-        rating_el = node.select_one('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span, span.a-icon-alt')
-        rating_text = rating_el.get_text(strip=True) if rating_el else ""
-        nickname = _extract_author(node)
-        date_text = _extract_date_text(node)
-        if not (content_text or rating_text or nickname or date_text):
-            continue
-        results.append({
-            "review_content": content_text,
-            "review_rating_text": rating_text,
-            "review_date": date_text,
-            "reviewer": nickname,
-        })
-
-    if results:
-        return results
-
-    # Fallback to body-only
-    for body in soup.select('span[data-hook="review-body"]'):
-        content_text = body.get_text("\n", strip=True)
-        anc = body.find_parent(lambda tag: (getattr(tag, 'name', None) == 'div' and 'review' in ' '.join(tag.get('class', []))) or (tag and tag.has_attr('data-hook') and 'review' in tag['data-hook']))
-        rating_text = ""
-        date_text = ""
-        nickname = ""
-        search_base = anc if anc else body
-        rt = search_base.select_one('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span, span.a-icon-alt')
-        rating_text = rt.get_text(strip=True) if rt else ""
-        dt = search_base.select_one('span[data-hook="review-date"], .review-date')
-        if dt:
-            date_text = dt.get_text(strip=True)
-        else:
-            prev_dt = search_base.find_previous(lambda t: t.name == 'span' and (t.get('data-hook') == 'review-date' or 'review-date' in t.get('class', [])))
-            if prev_dt:
-                date_text = prev_dt.get_text(strip=True)
-        au = search_base.select_one('.a-profile-content .a-profile-name, span.a-profile-name, span[data-hook="review-author"], a[data-hook="review-author"]')
-        if au:
-            nickname = au.get_text(strip=True)
-        else:
-            prev_au = search_base.find_previous(lambda t: (t.name in ['span','a']) and ('a-profile-name' in t.get('class', []) or t.get('data-hook') == 'review-author'))
-            nickname = prev_au.get_text(strip=True) if prev_au else ""
-        if content_text:
-            results.append({
-                "review_content": content_text,
-                "review_rating_text": rating_text,
-                "review_date": date_text,
-                "reviewer": nickname,
-            })
-    return results
+    return parse_reviews_html(html_text)
+
+
+def _needs_html_fill_in(chunk: List[Dict]) -> bool:
+    return bool(chunk) and all((not r.get('reviewer') or not r.get('review_date')) for r in chunk)
+
+
+def _fill_missing_from_html(chunk: List[Dict], html: str) -> None:
+    bs_chunk = _parse_reviews_from_page_html(html)
+    # Prefer filling missing fields by aligning by order
+    for i in range(min(len(chunk), len(bs_chunk))):
+        if not chunk[i].get('reviewer'):
+            chunk[i]['reviewer'] = bs_chunk[i].get('reviewer', '')
+        if not chunk[i].get('review_date'):
+            chunk[i]['review_date'] = bs_chunk[i].get('review_date', '')
+
+
+REVIEW_ITEM_SELECTOR = 'div[data-hook="review"], #cm_cr-review_list div.review, span[data-hook="review-body"]'
+SCROLL_QUIET_MS = 400
+SCROLL_CEILING = 5.0
+
+# Scrolls to the bottom and watches the DOM; resolves once the review list has
+# not grown for quietMs, or when the ceiling is hit.
+_SCROLL_UNTIL_STABLE_JS = r"""
+([sel, quietMs, maxMs]) => new Promise((resolve) => {
+  const start = performance.now();
+  const count = () => document.querySelectorAll(sel).length;
+  let last = count();
+  let lastChange = start;
+  const toBottom = () => window.scrollTo(0, document.body.scrollHeight);
+  const obs = new MutationObserver(() => {
+    const c = count();
+    if (c !== last) {
+      last = c;
+      lastChange = performance.now();
+      toBottom();
+    }
+  });
+  obs.observe(document.body, { childList: true, subtree: true });
+  toBottom();
+  const tick = () => {
+    const now = performance.now();
+    if (now - lastChange >= quietMs || now - start >= maxMs) {
+      obs.disconnect();
+      resolve({ count: last, ms: Math.round(now - start) });
+    } else {
+      setTimeout(tick, 50);
+    }
+  };
+  setTimeout(tick, 50);
+})
+"""
 
 
-def _slow_scroll(page, steps: int = 8, wait: float = 0.6) -> None:
-    for _ in range(steps):
-        page.evaluate("window.scrollBy(0, document.body.scrollHeight / 2)")
-        time.sleep(wait)
+def _scroll_until_stable(page, ceiling: float = SCROLL_CEILING, quiet_ms: int = SCROLL_QUIET_MS) -> Dict:
+    try:
+        return page.evaluate(_SCROLL_UNTIL_STABLE_JS, [REVIEW_ITEM_SELECTOR, quiet_ms, int(ceiling * 1000)])
+    except Exception:
+        return {"count": 0, "ms": 0}
 
 
 def _get_csrf_from_cookies(context) -> Optional[str]:
@@ -460,7 +573,7 @@ def _get_csrf_from_cookies(context) -> Optional[str]:
     return None
 
 
-def _fetch_reviews_via_ajax(context, host: str, asin: str, star: int, page_number: int) -> List[Dict]:
+def _ajax_reviews_request(host: str, asin: str, star: int, page_number: int, csrf: Optional[str]) -> Tuple[str, Dict[str, str], Dict[str, str]]:
     form = {
         "asin": asin,
         "pageNumber": str(page_number),
@@ -480,16 +593,12 @@ def _fetch_reviews_via_ajax(context, host: str, asin: str, star: int, page_numbe
         "origin": f"https://{host}",
         "referer": f"https://{host}/product-reviews/{asin}",
     }
-    csrf = _get_csrf_from_cookies(context)
     if csrf:
         headers["anti-csrftoken-a2z"] = csrf
+    return url, form, headers
 
-    resp = context.request.post(url, form=form, headers=headers, timeout=60000)
-    status = resp.status
-    text = resp.text()
-    # Persist raw response for debugging
-    write_text(f"STATUS={status}\n\n" + text, f"debug_ajax_reviews_p{page_number}.html")
 
+def _parse_ajax_response_text(text: str) -> List[Dict]:
     # Amazon often returns a JSON with html fragments; try to parse it
     html_text = text
     try:
@@ -501,62 +610,302 @@ def _fetch_reviews_via_ajax(context, host: str, asin: str, star: int, page_numbe
     return _parse_reviews_from_ajax_html(html_text)
 
 
-def scrape_reviews_for_product(product_url: str, star: int, max_pages: int = 2, headless: bool = False) -> List[Dict]:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless, args=["--disable-blink-features=AutomationControlled"]) 
-        context = browser.new_context(
-            storage_state=str(STORAGE_STATE_PATH) if STORAGE_STATE_PATH.exists() else None,
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-            locale="en-US",
-            extra_http_headers={"accept-language": "en-US,en;q=0.9"},
-            timezone_id="America/Los_Angeles",
-            viewport={"width": 1300, "height": 900},
-        )
-        context.set_default_timeout(40000)
-        context.set_default_navigation_timeout(60000)
-        page = context.new_page()
-
-        base_reviews_url = _get_reviews_link(page, product_url)
-        host, asin = _extract_host_and_asin(product_url)
-        if not base_reviews_url or not asin:
-            browser.close()
-            return []
-
-        all_reviews: List[Dict] = []
-        page.goto(base_reviews_url, wait_until="domcontentloaded", timeout=60000)
-        _dismiss_overlays(page)
-        _slow_scroll(page)
-
-        clicked = _click_star_filter_if_present(page, star)
-
-        for page_idx in range(1, max_pages + 1):
+def _ajax_steps(
+    context,
+    host: str,
+    asin: str,
+    star: int,
+    page_number: int,
+    csrf: Optional[str],
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    archive: Optional[PageArchive] = None,
+) -> Steps:
+    """Raw AJAX review payload for one page; None when blocked."""
+    url, form, headers = _ajax_reviews_request(host, asin, star, page_number, csrf)
+    body = urlencode(form)
+    cached = cache.get("POST", url, body) if cache is not None else None
+    if cached is not None:
+        return cached.text()
+    if cache is not None and cache.replay:
+        return ""
+    if limiter is not None:
+        yield ("acquire", limiter, host)
+    status, final_url, content_type, text, size = yield ("post", context, url, form, headers)
+    METRICS.count("bytes.ajax", size)
+    blocked = _response_is_blocked(status, final_url) or _text_has_block(text)
+    if archive is not None:
+        # Blocked answers are kept too, for debugging; re-parsing skips them
+        archive.put(KIND_AJAX, host, asin, star, page_number, url, text, status=status, blocked=blocked)
+    if limiter is not None:
+        limiter.observe(host, blocked)
+    if blocked:
+        METRICS.count("blocked")
+        return None
+    if cache is not None and status == 200:
+        cache.put("POST", url, body, status, content_type, text.encode("utf-8"))
+    return text
+
+
+def _ajax_rows_steps(
+    context,
+    host: str,
+    asin: str,
+    star: int,
+    page_number: int,
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    archive: Optional[PageArchive] = None,
+) -> Steps:
+    csrf = yield ("csrf", context)
+    text = yield from _ajax_steps(context, host, asin, star, page_number, csrf, cache, limiter, archive)
+    if text is None:
+        raise _blocked(asin, page_number, "AJAX request blocked")
+    return _parse_ajax_response_text(text) if text else []
+
+
+def _fetch_reviews_via_ajax(
+    context,
+    host: str,
+    asin: str,
+    star: int,
+    page_number: int,
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    archive: Optional[PageArchive] = None,
+) -> List[Dict]:
+    return _run_steps(_ajax_rows_steps(context, host, asin, star, page_number, cache, limiter, archive))
+
+
+class _ProductCrawl:
+    """Per-product state every engine shares: the page plan, delivery, index filter and callback."""
+
+    def __init__(
+        self,
+        asin: str,
+        star: int,
+        max_pages: int,
+        index: Optional[ReviewIndex] = None,
+        on_page: Optional[PageCallback] = None,
+        on_empty: Optional[EmptyCallback] = None,
+    ) -> None:
+        self.asin = asin
+        self.star = star
+        self.max_pages = max_pages
+        self.index = index
+        self.on_page = on_page
+        self.on_empty = on_empty
+        self.rows: List[Dict] = []
+        self.total: Optional[int] = None
+        self.last_page = max_pages
+        self.fallbacks: Dict[str, int] = {}
+
+    def admit(self, page_idx: int, status: PageClass) -> bool:
+        """False when the page has no reviews, which ends the crawl; learns the review total.
+
+        Raises ``BlockedError`` for a blocked page.
+        """
+        if status.state == PAGE_BLOCKED:
+            raise _blocked(self.asin, page_idx)
+        if status.state == PAGE_EMPTY:
+            METRICS.count("empty_pages")
+            print(f"{self.asin} page {page_idx}: no reviews")
+            if self.on_empty is not None:
+                self.on_empty(page_idx)
+            return False
+        if self.total is None and status.total is not None:
+            self.total = status.total
+            self.last_page = _last_page(self.total, self.max_pages)
+            print(f"{self.asin}: {self.total} reviews, crawling up to page {self.last_page}")
+        return True
+
+    def deliver(self, page_idx: int, chunk: List[Dict], elapsed: float, note: str = "") -> bool:
+        """Filter, count and hand on one page of rows; False once only known reviews are left."""
+        only_known = False
+        if self.index is not None:
+            new_chunk = self.index.filter_new(self.asin, self.star, chunk, record=False)
+            only_known = bool(chunk) and not new_chunk
+            chunk = new_chunk
+        self.rows.extend(chunk)
+        METRICS.observe("page", elapsed, asin=self.asin, page=page_idx)
+        METRICS.count("pages")
+        METRICS.count("reviews", len(chunk))
+        print(f"{self.asin} page {page_idx}: {len(chunk)} reviews in {elapsed:.2f}s{note}")
+        if self.on_page is not None:
+            self.on_page(page_idx, chunk)
+        if self.index is not None and chunk:
+            # Only once on_page has written them: rows lost to a failed write stay new for the next run
+            self.index.record(self.asin, self.star, chunk)
+        if only_known:
+            print(f"{self.asin} page {page_idx}: only known reviews, stopping")
+        return not only_known
+
+    def fallback(self, name: str) -> None:
+        self.fallbacks[name] = self.fallbacks.get(name, 0) + 1
+
+    def finish(self) -> List[Dict]:
+        if self.fallbacks:
+            print(f"{self.asin} fallbacks: {self.fallbacks}")
+            for name, n in self.fallbacks.items():
+                METRICS.count(f"fallback.{name}", n)
+        return self.rows
+
+
+def _product_steps(
+    page,
+    product_url: str,
+    star: int,
+    max_pages: int = 2,
+    scroll_ceiling: float = SCROLL_CEILING,
+    cache: Optional[ResponseCache] = None,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[PageCallback] = None,
+    start_page: int = 1,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    page_fanout: int = 1,
+    archive: Optional[PageArchive] = None,
+    sessions: Optional[SessionPool] = None,
+    on_empty: Optional[EmptyCallback] = None,
+) -> Steps:
+    if start_page > max_pages:
+        return []
+    context = page.context
+    host, asin = _extract_host_and_asin(product_url)
+    base_reviews_url = _direct_reviews_url(product_url, review_links)
+    if not base_reviews_url or not asin:
+        return []
+
+    crawl = _ProductCrawl(asin, star, max_pages, index, on_page, on_empty)
+    try:
+        clicked = False
+        if start_page == 1:
+            with METRICS.timer("navigate", asin=asin, page=1):
+                base_reviews_url = yield from _open_reviews_steps(page, product_url, base_reviews_url, limiter, review_links, sessions)
+            if base_reviews_url is None:
+                raise _blocked(asin, 1)
+            yield ("dismiss", page)
+            with METRICS.timer("scroll", asin=asin, page=1):
+                yield ("scroll", page, scroll_ceiling)
+            clicked = yield ("click_star", page, star)
+
+        for page_idx in range(start_page, max_pages + 1):
+            started = time.monotonic()
             if not clicked or page_idx > 1:
                 url = _apply_star_filter_query(base_reviews_url, star, page_number=page_idx)
-                page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            _dismiss_overlays(page)
-            _slow_scroll(page)
-
-            chunk = _parse_reviews_on_page(page)
+                with METRICS.timer("navigate", asin=asin, page=page_idx):
+                    status = yield from _navigate_steps(page, url, limiter, sessions=sessions)
+            else:
+                status = yield ("classify", page)
+            if not crawl.admit(page_idx, status):
+                break
+            yield ("dismiss", page)
+            with METRICS.timer("scroll", asin=asin, page=page_idx):
+                settled = yield ("scroll", page, scroll_ceiling)
+            if archive is not None:
+                with METRICS.timer("archive", asin=asin, page=page_idx):
+                    archive.put(
+                        KIND_PAGE, host, asin, star, page_idx, page.url, (yield ("content", page)),
+                        # Only admitted pages get here, so never a block
+                        status=status.status, blocked=False,
+                    )
+
+            with METRICS.timer("parse_dom", asin=asin, page=page_idx):
+                chunk = yield ("parse_dom", page, crawl.fallbacks)
             if not chunk:
-                # AJAX fallback
-                ajax_chunk = _fetch_reviews_via_ajax(context, host, asin, star, page_idx)
-                chunk = ajax_chunk
+                crawl.fallback("ajax")
+                with METRICS.timer("ajax_fallback", asin=asin, page=page_idx):
+                    chunk = yield from _ajax_rows_steps(context, host, asin, star, page_idx, cache, limiter, archive)
             # Final fallback: parse full page HTML with BeautifulSoup to ensure author/date
-            if chunk and all((not r.get('reviewer') or not r.get('review_date')) for r in chunk):
-                html = page.content()
-                bs_chunk = _parse_reviews_from_page_html(html)
-                if bs_chunk:
-                    # Prefer filling missing fields by aligning by order
-                    for i in range(min(len(chunk), len(bs_chunk))):
-                        if not chunk[i].get('reviewer'):
-                            chunk[i]['reviewer'] = bs_chunk[i].get('reviewer', '')
-                        if not chunk[i].get('review_date'):
-                            chunk[i]['review_date'] = bs_chunk[i].get('review_date', '')
-            all_reviews.extend(chunk)
-
-            next_link = page.locator('li.a-last a')
-            if next_link.count() == 0:
+            if _needs_html_fill_in(chunk):
+                crawl.fallback("bs_fill_in")
+                with METRICS.timer("bs_fill_in", asin=asin, page=page_idx):
+                    _fill_missing_from_html(chunk, (yield ("content", page)))
+            note = f" (scroll settled in {settled['ms']}ms)"
+            if not crawl.deliver(page_idx, chunk, time.monotonic() - started, note):
                 break
 
-        browser.close()
-        return all_reviews
+            if page_idx >= crawl.last_page or not (yield ("has_next", page)):
+                break
+            if page_fanout > 1 and index is None and crawl.total is not None:
+                # Only the async engine can overlap requests; it fetches and delivers the rest over AJAX
+                yield ("fan_out", context, host, asin, star, list(range(page_idx + 1, crawl.last_page + 1)), page_fanout,
+                       cache, limiter, archive, crawl)
+                break
+    except BlockedError as e:
+        e.rows = crawl.finish()
+        raise
+    return crawl.finish()
+
+
+class _SyncIO:
+    """The operations ``Steps`` generators yield, on the sync Playwright API."""
+
+    acquire = staticmethod(lambda limiter, host: limiter.acquire(host))
+    goto = staticmethod(lambda page, url, timeout: page.goto(url, wait_until="domcontentloaded", timeout=timeout))
+    classify = staticmethod(_classify_page)
+    dismiss = staticmethod(_dismiss_overlays)
+    scroll = staticmethod(_scroll_until_stable)
+    click_star = staticmethod(_click_star_filter_if_present)
+    parse_dom = staticmethod(_parse_reviews_on_page)
+    content = staticmethod(lambda page: page.content())
+    has_next = staticmethod(lambda page: page.locator('li.a-last a').count() > 0)
+    csrf = staticmethod(_get_csrf_from_cookies)
+
+    @staticmethod
+    def reviews_link_href(page) -> Optional[str]:
+        for sel in REVIEWS_LINK_SELECTORS:
+            link = page.locator(sel).first
+            if link.count() > 0:
+                return link.get_attribute("href")
+        return None
+
+    @staticmethod
+    def post(context, url: str, form: Dict[str, str], headers: Dict[str, str]) -> Tuple[int, str, str, str, int]:
+        resp = context.request.post(url, form=form, headers=headers, timeout=60000)
+        return resp.status, resp.url, resp.headers.get("content-type", ""), resp.text(), len(resp.body())
+
+
+def _run_steps(steps: Steps) -> Any:
+    """Drive a ``Steps`` generator with the sync API; exceptions are thrown back into it."""
+    value: Any = None
+    error: Optional[Exception] = None
+    while True:
+        try:
+            op = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = getattr(_SyncIO, op[0])(*op[1:])
+        except Exception as e:
+            error = e
+
+
+def scrape_reviews_for_product(
+    product_url: str,
+    star: int,
+    max_pages: int = 2,
+    headless: bool = False,
+    pool: Optional[BrowserPool] = None,
+    scroll_ceiling: float = SCROLL_CEILING,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[PageCallback] = None,
+    start_page: int = 1,
+    on_empty: Optional[EmptyCallback] = None,
+) -> List[Dict]:
+    """Scrape one product's reviews for ``star``; raises ``BlockedError`` when a block outlasts the retries."""
+    if pool is None:
+        with BrowserPool(headless=headless) as own_pool:
+            return scrape_reviews_for_product(
+                product_url, star, max_pages=max_pages, headless=headless, pool=own_pool, scroll_ceiling=scroll_ceiling,
+                index=index, on_page=on_page, start_page=start_page, on_empty=on_empty,
+            )
+    if start_page > max_pages:
+        return []
+    with pool.page() as page:
+        return _run_steps(_product_steps(
+            page, product_url, star, max_pages=max_pages, scroll_ceiling=scroll_ceiling, cache=pool.cache, index=index,
+            on_page=on_page, start_page=start_page, limiter=pool.limiter, review_links=pool.review_links, archive=pool.archive,
+            sessions=pool.sessions, on_empty=on_empty,
+        ))
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright
+
+from amazon_reviews import (
+    BLOCK_FLAGS,
+    NO_REVIEWS_MARKERS,
+    OVERLAY_SELECTORS,
+    PageClass,
+    PageCallback,
+    REVIEW_ITEM_SELECTOR,
+    REVIEW_LIST_SELECTOR,
+    REVIEW_TOTAL_SELECTOR,
+    REVIEWS_LINK_SELECTORS,
+    SCROLL_CEILING,
+    SCROLL_QUIET_MS,
+    STAR_MAP,
+    Steps,
+    _CLASSIFY_PAGE_JS,
+    _EXTRACT_REVIEWS_JS,
+    _FIND_OVERLAYS_JS,
+    _SCROLL_UNTIL_STABLE_JS,
+    BlockedError,
+    _ProductCrawl,
+    _ajax_steps,
+    _blocked,
+    _extract_host_and_asin,
+    _extracted_rows,
+    _page_class,
+    _parse_ajax_response_text,
+    _product_steps,
+)
+from browser_pool import LAUNCH_ARGS, context_options, count_response_bytes, load_storage_state
+from http_cache import ResponseCache
+from metrics import METRICS
+from page_archive import PageArchive
+from rate_limit import HostRateLimiter
+from resource_blocking import ResourceBlocker
+from review_index import ReviewIndex
+from review_links import ReviewLinkMap
+from session_pool import Session, SessionPool
+from utils import STORAGE_STATE_PATH
+
+
+# Called with (product_index, page_number, rows); product_index is 1-based
+ProductPageCallback = Callable[[int, int, List[Dict]], None]
+
+
+async def _dismiss_overlays(page) -> None:
+    for sel in await page.evaluate(_FIND_OVERLAYS_JS, OVERLAY_SELECTORS):
+        try:
+            await page.locator(sel).first.click(timeout=500)
+        except Exception:
+            pass
+
+
+async def _scroll_until_stable(page, ceiling: float = SCROLL_CEILING, quiet_ms: int = SCROLL_QUIET_MS) -> Dict:
+    try:
+        return await page.evaluate(_SCROLL_UNTIL_STABLE_JS, [REVIEW_ITEM_SELECTOR, quiet_ms, int(ceiling * 1000)])
+    except Exception:
+        return {"count": 0, "ms": 0}
+
+
+async def _classify_page(page) -> PageClass:
+    raw = await page.evaluate(_CLASSIFY_PAGE_JS, {
+        "blockFlags": [f.lower() for f in BLOCK_FLAGS],
+        "emptyFlags": [f.lower() for f in NO_REVIEWS_MARKERS],
+        "totalSelector": REVIEW_TOTAL_SELECTOR,
+    })
+    return _page_class(raw["state"], raw["total"], raw["listing"])
+
+
+async def _click_star_filter_if_present(page, star: int) -> bool:
+    for sel in [f'a[href*="filterByStar={STAR_MAP.get(star, "all_stars")}"]', f'a[data-hook="cr-filter-stars-{star}"]']:
+        link = page.locator(sel).first
+        if await link.count() > 0:
+            try:
+                await link.click()
+                await page.wait_for_selector('div[data-hook="review"], #cm_cr-review_list', timeout=15000)
+                return True
+            except Exception:
+                return False
+    return False
+
+
+async def _expand_truncated_reviews(page) -> None:
+    buttons = page.locator('span[data-action="columnbalancing-showfullreview"] a, a[data-hook="review-title"] + span a')
+    for i in range(await buttons.count()):
+        try:
+            await buttons.nth(i).click(timeout=500)
+        except Exception:
+            continue
+
+
+async def _parse_reviews_on_page(page, fallbacks: Optional[Dict[str, int]] = None) -> List[Dict]:
+    try:
+        await page.wait_for_selector(REVIEW_LIST_SELECTOR, timeout=30000)
+    except Exception:
+        return []
+    await _expand_truncated_reviews(page)
+    return _extracted_rows(await page.evaluate(_EXTRACT_REVIEWS_JS), fallbacks)
+
+
+async def _csrf_token(context) -> Optional[str]:
+    for c in await context.cookies():
+        if c.get("name") == "anti-csrftoken-a2z" and c.get("value"):
+            return c.get("value")
+    return None
+
+
+async def _ajax_page_text(
+    context,
+    host: str,
+    asin: str,
+    star: int,
+    page_number: int,
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    csrf: Optional[str] = None,
+    archive: Optional[PageArchive] = None,
+) -> Optional[str]:
+    """Raw AJAX review payload for one page; None when blocked."""
+    return await _run_steps_async(_ajax_steps(context, host, asin, star, page_number, csrf, cache, limiter, archive))
+
+
+async def _fan_out_ajax_pages(
+    context,
+    host: str,
+    asin: str,
+    star: int,
+    page_numbers: List[int],
+    fanout: int,
+    cache: Optional[ResponseCache] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    archive: Optional[PageArchive] = None,
+) -> AsyncIterator[Tuple[int, Optional[List[Dict]], float]]:
+    """Fetch AJAX review pages up to ``fanout`` at a time; yield (page, rows, seconds) in page order.
+
+    rows is None for a blocked page, which ends the iteration.
+    """
+    sem = asyncio.Semaphore(max(1, fanout))
+    csrf = await _csrf_token(context)
+
+    async def _one(page_number: int) -> Tuple[Optional[List[Dict]], float]:
+        async with sem:
+            started = time.monotonic()
+            with METRICS.timer("ajax_page", asin=asin, page=page_number):
+                text = await _ajax_page_text(context, host, asin, star, page_number, cache, limiter, csrf, archive)
+            rows = None if text is None else _parse_ajax_response_text(text)
+            return rows, time.monotonic() - started
+
+    tasks = [asyncio.ensure_future(_one(n)) for n in page_numbers]
+    try:
+        for page_number, task in zip(page_numbers, tasks):
+            rows, seconds = await task
+            yield page_number, rows, seconds
+            if rows is None:
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class _AsyncIO:
+    """The operations ``Steps`` generators yield, on the async Playwright API."""
+
+    @staticmethod
+    async def acquire(limiter: HostRateLimiter, host: str) -> None:
+        await limiter.acquire_async(host)
+
+    @staticmethod
+    async def goto(page, url: str, timeout: int):
+        return await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+
+    classify = staticmethod(_classify_page)
+    dismiss = staticmethod(_dismiss_overlays)
+    scroll = staticmethod(_scroll_until_stable)
+    click_star = staticmethod(_click_star_filter_if_present)
+    parse_dom = staticmethod(_parse_reviews_on_page)
+    csrf = staticmethod(_csrf_token)
+
+    @staticmethod
+    async def content(page) -> str:
+        return await page.content()
+
+    @staticmethod
+    async def has_next(page) -> bool:
+        return await page.locator('li.a-last a').count() > 0
+
+    @staticmethod
+    async def reviews_link_href(page) -> Optional[str]:
+        for sel in REVIEWS_LINK_SELECTORS:
+            link = page.locator(sel).first
+            if await link.count() > 0:
+                return await link.get_attribute("href")
+        return None
+
+    @staticmethod
+    async def post(context, url: str, form: Dict[str, str], headers: Dict[str, str]) -> Tuple[int, str, str, str, int]:
+        resp = await context.request.post(url, form=form, headers=headers, timeout=60000)
+        return resp.status, resp.url, resp.headers.get("content-type", ""), await resp.text(), len(await resp.body())
+
+    @staticmethod
+    async def fan_out(
+        context,
+        host: str,
+        asin: str,
+        star: int,
+        page_numbers: List[int],
+        fanout: int,
+        cache: Optional[ResponseCache],
+        limiter: Optional[HostRateLimiter],
+        archive: Optional[PageArchive],
+        crawl: _ProductCrawl,
+    ) -> None:
+        fanned = _fan_out_ajax_pages(context, host, asin, star, page_numbers, fanout, cache=cache, limiter=limiter, archive=archive)
+        try:
+            async for fan_idx, chunk, elapsed in fanned:
+                if chunk is None:
+                    raise _blocked(asin, fan_idx, "AJAX request blocked")
+                crawl.deliver(fan_idx, chunk, elapsed, " (ajax)")
+        finally:
+            await fanned.aclose()
+
+
+async def _run_steps_async(steps: Steps) -> Any:
+    """Drive a ``Steps`` generator from amazon_reviews with the async API."""
+    value: Any = None
+    error: Optional[Exception] = None
+    while True:
+        try:
+            op = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = await getattr(_AsyncIO, op[0])(*op[1:])
+        except Exception as e:
+            error = e
+
+
+async def scrape_reviews_for_product_async(
+    context,
+    product_url: str,
+    star: int,
+    max_pages: int = 2,
+    scroll_ceiling: float = SCROLL_CEILING,
+    cache: Optional[ResponseCache] = None,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[PageCallback] = None,
+    start_page: int = 1,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    page_fanout: int = 1,
+    archive: Optional[PageArchive] = None,
+    sessions: Optional[SessionPool] = None,
+) -> List[Dict]:
+    """Scrape one product's reviews on a page of ``context``.
+
+    With ``page_fanout`` > 1 (and no ``index``), once the first page has given
+    the review total the remaining pages are fetched from the AJAX endpoint,
+    ``page_fanout`` at a time, instead of navigating to each.
+    """
+    if start_page > max_pages:
+        return []
+    page = await context.new_page()
+    try:
+        return await _run_steps_async(_product_steps(
+            page, product_url, star, max_pages=max_pages, scroll_ceiling=scroll_ceiling, cache=cache, index=index,
+            on_page=on_page, start_page=start_page, limiter=limiter, review_links=review_links, page_fanout=page_fanout,
+            archive=archive, sessions=sessions,
+        ))
+    finally:
+        await page.close()
+
+
+async def scrape_products_async(
+    product_links: List[str],
+    star: int,
+    max_pages: int = 2,
+    headless: bool = False,
+    concurrency: int = 4,
+    per_host: Optional[int] = None,
+    scroll_ceiling: float = SCROLL_CEILING,
+    blocker: Optional[ResourceBlocker] = None,
+    cache: Optional[ResponseCache] = None,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[ProductPageCallback] = None,
+    start_pages: Optional[Dict[int, int]] = None,
+    on_product_done: Optional[Callable[[int], None]] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    page_fanout: int = 1,
+    sessions: Optional[SessionPool] = None,
+    archive: Optional[PageArchive] = None,
+) -> List[List[Dict]]:
+    """Scrape several products at once over one browser; results keep input order.
+
+    ``start_pages`` maps a 1-based product index to the page to resume from;
+    ``on_product_done`` is called with that index when a product finishes
+    without error or block. Products whose start page is past ``max_pages``
+    are already finished and are not scheduled; their result is empty. With
+    ``sessions`` products are spread over the healthy accounts, one browser
+    context each.
+    """
+    starts = start_pages or {}
+    todo = [(idx, link) for idx, link in enumerate(product_links, 1) if starts.get(idx, 1) <= max_pages]
+    results: List[List[Dict]] = [[] for _ in product_links]
+    if not todo:
+        return results
+    global_sem = asyncio.Semaphore(max(1, concurrency))
+    host_sems: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(max(1, per_host or concurrency)))
+
+    async with async_playwright() as p:
+        with METRICS.timer("browser_launch"):
+            browser = await p.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+
+        async def _new_context(state):
+            context = await browser.new_context(**context_options(state))
+            context.on("response", count_response_bytes)
+            context.set_default_timeout(40000)
+            context.set_default_navigation_timeout(60000)
+            if blocker is not None:
+                await blocker.install_async(context)
+            if cache is not None:
+                await cache.install_async(context)
+            return context
+
+        # One context per account; each product runs signed in as the next available session
+        contexts: Dict[str, object] = {}
+        shared = None if sessions is not None else await _new_context(load_storage_state(STORAGE_STATE_PATH))
+
+        async def _context_for(session: Session):
+            if session.name not in contexts:
+                contexts[session.name] = await _new_context(session.state)
+                sessions.watch(contexts[session.name], session)
+            return contexts[session.name]
+
+        async def _one(idx: int, link: str) -> List[Dict]:
+            host, _ = _extract_host_and_asin(link)
+            async with global_sem, host_sems[host]:
+                print(f"[{idx}] start {link}")
+                session = await sessions.acquire_async() if sessions is not None else None
+                try:
+                    context = shared if session is None else await _context_for(session)
+                    rows = await scrape_reviews_for_product_async(
+                        context, link, star, max_pages=max_pages, scroll_ceiling=scroll_ceiling, cache=cache, index=index,
+                        on_page=partial(on_page, idx) if on_page is not None else None,
+                        start_page=starts.get(idx, 1), limiter=limiter,
+                        review_links=review_links, page_fanout=page_fanout, archive=archive, sessions=sessions,
+                    )
+                except BlockedError as e:
+                    # Not done: a resume picks the product up at e.next_page
+                    print(f"[{idx}] blocked: {e}")
+                    return e.rows
+                except Exception as e:
+                    print(f"[{idx}] failed: {e}")
+                    return []
+                finally:
+                    if session is not None:
+                        sessions.release(session)
+                print(f"[{idx}] done: {len(rows)} reviews")
+                if on_product_done is not None:
+                    on_product_done(idx)
+                return rows
+
+        try:
+            for (idx, _), rows in zip(todo, await asyncio.gather(*[_one(idx, link) for idx, link in todo])):
+                results[idx - 1] = rows
+            return results
+        finally:
+            await browser.close()
+
+
+def scrape_products_concurrently(
+    product_links: List[str],
+    star: int,
+    max_pages: int = 2,
+    headless: bool = False,
+    concurrency: int = 4,
+    per_host: Optional[int] = None,
+    scroll_ceiling: float = SCROLL_CEILING,
+    blocker: Optional[ResourceBlocker] = None,
+    cache: Optional[ResponseCache] = None,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[ProductPageCallback] = None,
+    start_pages: Optional[Dict[int, int]] = None,
+    on_product_done: Optional[Callable[[int], None]] = None,
+    limiter: Optional[HostRateLimiter] = None,
+    review_links: Optional[ReviewLinkMap] = None,
+    page_fanout: int = 1,
+    sessions: Optional[SessionPool] = None,
+    archive: Optional[PageArchive] = None,
+) -> List[List[Dict]]:
+    return asyncio.run(scrape_products_async(
+        product_links, star, max_pages=max_pages, headless=headless, concurrency=concurrency, per_host=per_host,
+        scroll_ceiling=scroll_ceiling, blocker=blocker, cache=cache, index=index, on_page=on_page, start_pages=start_pages,
+        on_product_done=on_product_done, limiter=limiter, review_links=review_links,
+        page_fanout=page_fanout, sessions=sessions, archive=archive,
+    ))
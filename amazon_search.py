@@ -1,27 +1,25 @@
-from typing import List
+from typing import List, Optional
 from urllib.parse import quote
 
-from playwright.sync_api import sync_playwright
-
-from utils import STORAGE_STATE_PATH
+from amazon_reviews import _goto
+from browser_pool import BrowserPool
+from metrics import METRICS
 
 
 AMAZON_SEARCH_URL = "https://www.amazon.com/s?k={query}"
 
 
-def search_top_products(keyword: str, limit: int = 3, headless: bool = False) -> List[str]:
+def search_top_products(keyword: str, limit: int = 3, headless: bool = False, pool: Optional[BrowserPool] = None) -> List[str]:
+    if pool is None:
+        with BrowserPool(headless=headless) as own_pool:
+            return search_top_products(keyword, limit=limit, headless=headless, pool=own_pool)
+
     query_url = AMAZON_SEARCH_URL.format(query=quote(keyword))
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless, args=["--disable-blink-features=AutomationControlled"]) 
-        context = browser.new_context(
-            storage_state=str(STORAGE_STATE_PATH) if STORAGE_STATE_PATH.exists() else None,
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36",
-            locale="en-US",
-            geolocation=None,
-        )
-        page = context.new_page()
-        page.goto(query_url, wait_until="domcontentloaded")
+    with pool.page() as page:
+        with METRICS.timer("search"):
+            if not _goto(page, query_url, pool.limiter, sessions=pool.sessions):
+                return []
         try:
             page.wait_for_selector('div.s-main-slot div[data-component-type="s-search-result"]', timeout=10000)
         except Exception:
@@ -55,5 +53,4 @@ def search_top_products(keyword: str, limit: int = 3, headless: bool = False) ->
             if len(links) >= limit:
                 break
 
-        browser.close()
         return links
@@ -0,0 +1,205 @@
+import argparse
+import json
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixture_server import FixtureServer  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from rate_limit import HostRateLimiter  # noqa: E402
+
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+HISTORY_PATH = RESULTS_DIR / "history.jsonl"
+# Parameters that make two runs comparable
+SCENARIO_KEYS = ["engine", "products", "pages", "latency_ms", "jitter_ms", "captcha_rate", "no_reviews_rate", "rate", "page_fanout"]
+MISSING_STORAGE_STATE = Path(__file__).resolve().parent / "no_storage_state.json"
+
+
+def _git_revision() -> str:
+    # Read .git directly: a forked git process would show up in the children's peak RSS
+    git_dir = Path(__file__).resolve().parent.parent / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head[:7]
+        ref = head[5:]
+        if (git_dir / ref).exists():
+            return (git_dir / ref).read_text().strip()[:7]
+        for line in (git_dir / "packed-refs").read_text().splitlines():
+            if line.endswith(" " + ref):
+                return line.split()[0][:7]
+    except OSError:
+        pass
+    return "unknown"
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is KiB on Linux; children only count once they have exited (Chromium after close)
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def _limiter(rate: float) -> Optional[HostRateLimiter]:
+    return HostRateLimiter(rate=rate, max_rate=max(rate, 50.0), backoff_base=0.5, backoff_max=5.0) if rate > 0 else None
+
+
+def run_browser(server: FixtureServer, pages: int, rate: float, headless: bool) -> int:
+    from amazon_reviews import BlockedError, scrape_reviews_for_product
+    from amazon_search import search_top_products
+    from browser_pool import BrowserPool
+
+    reviews = 0
+    with BrowserPool(headless=headless, storage_state_path=MISSING_STORAGE_STATE, origin=server.origin, limiter=_limiter(rate)) as pool:
+        links = search_top_products("bench", limit=server.products, headless=headless, pool=pool)
+        for link in links:
+            try:
+                reviews += len(scrape_reviews_for_product(link, 5, max_pages=pages, headless=headless, pool=pool))
+            except BlockedError as e:
+                reviews += len(e.rows)
+    return reviews
+
+
+def run_http(server: FixtureServer, pages: int, rate: float, page_fanout: int = 1) -> int:
+    from amazon_http import BlockedError, HttpReviewClient, scrape_reviews_http
+
+    reviews = 0
+    with HttpReviewClient(storage_state_path=MISSING_STORAGE_STATE, origin=server.origin, limiter=_limiter(rate), page_fanout=page_fanout) as client:
+        for link in server.product_urls():
+            try:
+                reviews += len(scrape_reviews_http(link, 5, max_pages=pages, client=client))
+            except BlockedError as e:
+                reviews += len(e.rows)
+    return reviews
+
+
+def run_scenario(args: argparse.Namespace) -> Dict:
+    METRICS.reset()
+    server = FixtureServer(
+        products=args.products,
+        pages=args.pages,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        captcha_rate=args.captcha_rate,
+        no_reviews_rate=args.no_reviews_rate,
+        seed=args.seed,
+    )
+    with server:
+        started = time.perf_counter()
+        if args.engine == "browser":
+            reviews = run_browser(server, args.pages, args.rate, headless=not args.headed)
+        else:
+            reviews = run_http(server, args.pages, args.rate, args.page_fanout)
+        seconds = time.perf_counter() - started
+
+    report = METRICS.report()
+    page_stats = report["stages"].get("page", {})
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "label": args.label,
+        **{key: getattr(args, key) for key in SCENARIO_KEYS},
+        "seconds": round(seconds, 3),
+        "pages_crawled": report["pages"],
+        "reviews": reviews,
+        "pages_per_sec": round(report["pages"] / seconds, 3) if seconds else 0.0,
+        "reviews_per_sec": round(reviews / seconds, 3) if seconds else 0.0,
+        "page_latency": {k: page_stats.get(k, 0.0) for k in ("p50", "p95", "max")},
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": report["stages"],
+        "fallbacks": report["fallbacks"],
+        "counters": report["counters"],
+        "served": dict(server.stats),
+    }
+
+
+def _previous(result: Dict) -> Optional[Dict]:
+    if not HISTORY_PATH.exists():
+        return None
+    match = None
+    for line in HISTORY_PATH.read_text(encoding="utf-8").splitlines():
+        try:
+            old = json.loads(line)
+        except ValueError:
+            continue
+        if all(old.get(k) == result.get(k) for k in SCENARIO_KEYS):
+            match = old
+    return match
+
+
+def compare(result: Dict, previous: Dict, threshold: float) -> List[str]:
+    """Return regressions beyond ``threshold`` percent against the previous run of the same scenario."""
+    checks = [
+        ("pages_per_sec", result["pages_per_sec"], previous.get("pages_per_sec", 0), -1),
+        ("page_latency.p95", result["page_latency"]["p95"], previous.get("page_latency", {}).get("p95", 0), 1),
+        ("peak_rss_mb.self", result["peak_rss_mb"]["self"], previous.get("peak_rss_mb", {}).get("self", 0), 1),
+    ]
+    regressions = []
+    for name, new, old, worse in checks:
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        print(f"  {name:<18} {old:>10} -> {new:<10} ({change:+.1f}%)")
+        if change * worse > threshold:
+            regressions.append(f"{name} {change:+.1f}%")
+    return regressions
+
+
+def store(result: Dict) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{result['timestamp'].replace(':', '')}_{result['engine']}_{result['revision']}.json"
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    with HISTORY_PATH.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({k: v for k, v in result.items() if k not in ("stages", "counters")}, ensure_ascii=False) + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawl benchmark against a local Amazon-like fixture server")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser", help="browser: search_top_products + scrape_reviews_for_product; http: scrape_reviews_http")
+    parser.add_argument("--products", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=3, help="Review pages per product")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency per response")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Chance that a review page or AJAX call is a captcha")
+    parser.add_argument("--no-reviews-rate", type=float, default=0.0, help="Chance that a review page or AJAX call is empty")
+    parser.add_argument("--rate", type=float, default=0.0, help="Run behind HostRateLimiter starting at this rate (0 = no limiter)")
+    parser.add_argument("--page-fanout", type=int, default=1, help="Review pages fetched at once per product (http engine)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--headed", action="store_true", help="Show the browser")
+    parser.add_argument("--label", type=str, default="", help="Free-form note stored with the result")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change that counts as a regression")
+    parser.add_argument("--no-store", action="store_true", help="Do not write the result to bench/results")
+    args = parser.parse_args()
+
+    result = run_scenario(args)
+    print(
+        f"{result['engine']}: {result['pages_crawled']} pages, {result['reviews']} reviews in {result['seconds']}s "
+        f"({result['pages_per_sec']} pages/s, {result['reviews_per_sec']} reviews/s); "
+        f"page p50 {result['page_latency']['p50']}s p95 {result['page_latency']['p95']}s; "
+        f"peak RSS {result['peak_rss_mb']['self']} MB (+{result['peak_rss_mb']['children']} MB children)"
+    )
+    print(f"served: {result['served']}  fallbacks: {result['fallbacks']}")
+
+    previous = _previous(result)
+    regressions: List[str] = []
+    if previous is not None:
+        print(f"vs {previous.get('revision')} ({previous.get('timestamp')}):")
+        regressions = compare(result, previous, args.threshold)
+    if not args.no_store:
+        print(f"saved: {store(result)}")
+    if regressions:
+        print("REGRESSION: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from review_parser import available_backends, parse_reviews_html  # noqa: E402
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def bench(pages: List[str], backend: str, min_seconds: float) -> dict:
+    reviews = 0
+    parsed = 0
+    start = time.perf_counter()
+    while True:
+        for html in pages:
+            reviews += len(parse_reviews_html(html, backend=backend))
+            parsed += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {
+        "backend": backend,
+        "pages": parsed,
+        "reviews": reviews,
+        "seconds": elapsed,
+        "pages_per_sec": parsed / elapsed,
+        "reviews_per_sec": reviews / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark for review_parser on saved review pages")
+    parser.add_argument("files", nargs="*", help="Saved review page HTML files (default: bench/fixtures/*.html)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Minimum run time per backend")
+    args = parser.parse_args()
+
+    paths = [Path(f) for f in args.files] or sorted(FIXTURES_DIR.glob("*.html"))
+    pages = [p.read_text(encoding="utf-8") for p in paths]
+    print(f"{len(pages)} pages: {', '.join(p.name for p in paths)}")
+    for backend in available_backends():
+        r = bench(pages, backend, args.seconds)
+        print(f"{r['backend']:<12} {r['pages_per_sec']:8.1f} pages/s {r['reviews_per_sec']:9.1f} reviews/s")
+
+
+if __name__ == "__main__":
+    main()
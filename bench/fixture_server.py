@@ -0,0 +1,189 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+SITE_DIR = FIXTURES_DIR / "site"
+
+RECORDED_ASIN = "B0TESTASIN"
+PAGINATION_RE = re.compile(r'<div id="cm_cr-pagination_bar">.*?</div>', re.S)
+REVIEW_LIST_RE = re.compile(r'(<div id="cm_cr-review_list".*?)<div id="cm_cr-pagination_bar"', re.S)
+ASIN_RE = re.compile(r"/(?:dp|product-reviews)/([A-Z0-9]{10})")
+TOTAL_RE = re.compile(r'(data-hook="cr-filter-info-review-rating-count"[^>]*>)[^<]*')
+
+
+def _load(name: str) -> str:
+    return (SITE_DIR / name).read_text(encoding="utf-8")
+
+
+class FixtureServer:
+    """Local Amazon look-alike serving search, detail, review and AJAX pages.
+
+    Review pages are the recorded pages in ``bench/fixtures`` (rotated per page
+    number) with the ASIN, review total and pagination rewritten. ``latency`` (+ up to
+    ``jitter``) seconds is added to every response; ``captcha_rate`` and
+    ``no_reviews_rate`` are the chances that a review page or AJAX call gets a
+    captcha or an empty "no reviews" page instead. Injection is seeded, so a
+    scenario is reproducible.
+    """
+
+    def __init__(
+        self,
+        products: int = 3,
+        pages: int = 3,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        captcha_rate: float = 0.0,
+        no_reviews_rate: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.products = products
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.captcha_rate = captcha_rate
+        self.no_reviews_rate = no_reviews_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._review_pages = [
+            p.read_text(encoding="utf-8")
+            for p in sorted(FIXTURES_DIR.glob("*.html"))
+            if 'data-hook="review"' in p.read_text(encoding="utf-8")
+        ]
+        self._templates = {name: _load(f"{name}.html") for name in ("search", "search_result", "detail", "no_reviews", "captcha")}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def asins(self) -> List[str]:
+        return [f"B0BENCH{n:03d}" for n in range(1, self.products + 1)]
+
+    def product_urls(self) -> List[str]:
+        return [f"https://www.amazon.com/dp/{asin}" for asin in self.asins()]
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def _inject(self) -> Optional[str]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.captcha_rate:
+            return "captcha"
+        if roll < self.captcha_rate + self.no_reviews_rate:
+            return "no_reviews"
+        return None
+
+    def _delay(self) -> None:
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def search_page(self, keyword: str) -> str:
+        results = "\n".join(
+            self._templates["search_result"].format(asin=asin, n=n, keyword=keyword)
+            for n, asin in enumerate(self.asins(), 1)
+        )
+        return self._templates["search"].format(keyword=keyword, results=results)
+
+    def review_page(self, asin: str, page_number: int) -> str:
+        html = self._review_pages[(page_number - 1) % len(self._review_pages)].replace(RECORDED_ASIN, asin)
+        total = self.pages * 10
+        html = TOTAL_RE.sub(lambda m: f"{m.group(1)}{total} total ratings, {total} with reviews", html, count=1)
+        if page_number < self.pages:
+            nxt = f'<li class="a-last"><a href="/product-reviews/{asin}?pageNumber={page_number + 1}">Next page</a></li>'
+        else:
+            nxt = '<li class="a-disabled a-last">Next page</li>'
+        bar = f'<div id="cm_cr-pagination_bar"><ul class="a-pagination"><li class="a-disabled">Previous page</li>{nxt}</ul></div>'
+        return PAGINATION_RE.sub(lambda _: bar, html, count=1) if PAGINATION_RE.search(html) else html.replace("<footer", bar + "<footer", 1)
+
+    def ajax_response(self, asin: str, page_number: int) -> str:
+        m = REVIEW_LIST_RE.search(self.review_page(asin, page_number))
+        return json.dumps({"reviewsHtml": m.group(1) if m else ""})
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]], form: Dict[str, List[str]]):
+        """Return (status, content_type, body) for a request."""
+        html = "text/html; charset=utf-8"
+        if path.startswith("/s"):
+            return 200, html, self.search_page((query.get("k") or [""])[0])
+        if "/hz/reviews-render/ajax/" in path and method == "POST":
+            asin = (form.get("asin") or [""])[0]
+            injected = self._inject()
+            if injected == "captcha":
+                return 200, html, self._templates["captcha"]
+            if injected == "no_reviews":
+                return 200, "application/json", json.dumps({"reviewsHtml": ""})
+            return 200, "application/json", self.ajax_response(asin, int((form.get("pageNumber") or ["1"])[0]))
+        m = ASIN_RE.search(path)
+        if m and "/product-reviews/" in path:
+            injected = self._inject()
+            if injected:
+                return 200, html, self._templates[injected]
+            return 200, html, self.review_page(m.group(1), int((query.get("pageNumber") or ["1"])[0]))
+        if m:
+            return 200, html, self._templates["detail"].format(asin=m.group(1))
+        return 404, "text/plain", "not found"
+
+    def _handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self, method: str) -> None:
+                parsed = urlparse(self.path)
+                form: Dict[str, List[str]] = {}
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    form = parse_qs(self.rfile.read(length).decode("utf-8", errors="replace"))
+                server._delay()
+                status, content_type, body = server.route(method, parsed.path, parse_qs(parsed.query), form)
+                kind = "captcha" if "validateCaptcha" in body else "no_reviews" if "no reviews that match" in body else str(status)
+                server._count(kind)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._serve("GET")
+
+            def do_POST(self) -> None:
+                self._serve("POST")
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return _Handler
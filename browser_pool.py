@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse, urlunparse
+
+from playwright.sync_api import sync_playwright
+
+from http_cache import ResponseCache
+from metrics import METRICS
+from page_archive import PageArchive
+from rate_limit import HostRateLimiter
+from resource_blocking import ResourceBlocker
+from review_links import ReviewLinkMap
+from session_pool import Session, SessionPool
+from utils import STORAGE_STATE_PATH
+
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+
+def context_options(storage_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "storage_state": storage_state,
+        "user_agent": USER_AGENT,
+        "locale": "en-US",
+        "extra_http_headers": {"accept-language": "en-US,en;q=0.9"},
+        "timezone_id": "America/Los_Angeles",
+        "viewport": {"width": 1300, "height": 900},
+    }
+
+
+def load_storage_state(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def count_response_bytes(response) -> None:
+    # Content-Length only: reading bodies here would cost a round trip per response
+    length = response.headers.get("content-length")
+    if length and length.isdigit():
+        METRICS.count("bytes.browser", int(length))
+
+
+class OriginRewrite:
+    """Route handler that serves every request from ``origin`` (e.g. a local fixture server)."""
+
+    def __init__(self, origin: str) -> None:
+        self.origin = urlparse(origin.rstrip("/"))
+
+    def target(self, url: str) -> str:
+        parsed = urlparse(url)
+        return urlunparse((self.origin.scheme, self.origin.netloc, parsed.path, parsed.params, parsed.query, ""))
+
+    def install(self, context) -> None:
+        def handle(route) -> None:
+            req = route.request
+            # Not route.fetch(url=...): Playwright refuses to change the scheme there
+            resp = context.request.fetch(
+                self.target(req.url), method=req.method, headers=req.headers, data=req.post_data_buffer, max_redirects=0,
+            )
+            route.fulfill(response=resp)
+
+        context.route("**/*", handle)
+
+
+class BrowserPool:
+    """One Chromium per run; hands out pages from a warm, logged-in context.
+
+    The context is recycled after ``max_pages_per_context`` pages to keep
+    renderer memory bounded. Cookies picked up along the way are carried
+    into the next context. ``origin`` serves every request from another
+    scheme/host, like ``HttpReviewClient``'s.
+    """
+
+    def __init__(
+        self,
+        headless: bool = False,
+        storage_state_path: Path = STORAGE_STATE_PATH,
+        max_pages_per_context: int = 20,
+        blocker: Optional[ResourceBlocker] = None,
+        cache: Optional[ResponseCache] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        origin: Optional[str] = None,
+        review_links: Optional[ReviewLinkMap] = None,
+        page_fanout: int = 1,
+        sessions: Optional[SessionPool] = None,
+        archive: Optional[PageArchive] = None,
+    ) -> None:
+        self.headless = headless
+        self.storage_state_path = Path(storage_state_path)
+        self.max_pages_per_context = max(1, max_pages_per_context)
+        self.blocker = blocker
+        self.cache = cache
+        self.limiter = limiter
+        self.origin = OriginRewrite(origin) if origin else None
+        self.review_links = review_links
+        self.archive = archive
+        # Review pages fetched at once per product; only the async engine can overlap requests
+        self.page_fanout = max(1, page_fanout)
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._context_pages = 0
+        self._storage_state: Optional[Dict[str, Any]] = None
+        # With a session pool every context is signed in as the next available account
+        self.sessions = sessions
+        self._session: Optional[Session] = None
+
+    def __enter__(self) -> "BrowserPool":
+        # Chromium is launched lazily on the first page request
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def start(self) -> "BrowserPool":
+        if self._browser is not None:
+            return self
+        self._storage_state = load_storage_state(self.storage_state_path)
+        with METRICS.timer("browser_launch"):
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+        return self
+
+    def _new_context(self):
+        state = self._storage_state
+        if self.sessions is not None:
+            self._session = self.sessions.acquire()
+            state = self._session.state
+        with METRICS.timer("context_new"):
+            context = self._browser.new_context(**context_options(state))
+        context.on("response", count_response_bytes)
+        if self._session is not None:
+            self.sessions.watch(context, self._session)
+        context.set_default_timeout(40000)
+        context.set_default_navigation_timeout(60000)
+        if self.blocker is not None:
+            self.blocker.install(context)
+        # Registered after the blocker so it sees requests first and falls back to the blocker
+        if self.cache is not None:
+            self.cache.install(context)
+        # Registered last so it sees requests first: with an origin nothing may reach the real host,
+        # not even a cache miss
+        if self.origin is not None:
+            self.origin.install(context)
+        return context
+
+    def _recycle_context(self) -> None:
+        if self._context is None:
+            return
+        state = None
+        try:
+            state = self._context.storage_state()
+        except Exception:
+            pass
+        try:
+            self._context.close()
+        except Exception:
+            pass
+        if self._session is not None:
+            self.sessions.release(self._session, state)
+            self._session = None
+        elif state is not None:
+            self._storage_state = state
+        self._context = None
+        self._context_pages = 0
+
+    def context(self):
+        if self._browser is None:
+            self.start()
+        if self._context is None:
+            self._context = self._new_context()
+            self._context_pages = 0
+        return self._context
+
+    @contextmanager
+    def page(self) -> Iterator[Any]:
+        context = self.context()
+        page = context.new_page()
+        self._context_pages += 1
+        try:
+            yield page
+        finally:
+            try:
+                page.close()
+            except Exception:
+                pass
+            # A blocked session is cooling down; the next page goes to another account
+            if self._context_pages >= self.max_pages_per_context or (
+                self._session is not None and self.sessions.cooling(self._session)
+            ):
+                self._recycle_context()
+
+    def close(self) -> None:
+        self._recycle_context()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
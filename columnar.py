@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils import OUTPUT_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for --formats parquet
+    pa = None
+
+
+PARQUET_DIR = OUTPUT_DIR / "parquet"
+PARTITION_KEYS = ["asin", "star", "crawl_date"]
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+
+
+def review_schema():
+    _require_pyarrow()
+    text_dict = pa.dictionary(pa.int32(), pa.string())
+    # Partition columns (asin/star/crawl_date) live in the directory names
+    return pa.schema([
+        ("review_content", pa.string()),
+        ("review_rating_text", text_dict),
+        ("review_date", pa.string()),
+        ("reviewer", text_dict),
+        ("product_index", pa.int32()),
+        ("product_url", text_dict),
+    ])
+
+
+class ParquetDatasetSink:
+    """Hive-partitioned Parquet dataset: ``asin=<ASIN>/star=<n>/crawl_date=<YYYY-MM-DD>``.
+
+    Rows are buffered per partition and written as one row group every
+    ``batch_rows`` rows, so memory stays bounded however long the run is.
+    Rows must carry ``asin`` and ``star``.
+    """
+
+    def __init__(self, root: Path = PARQUET_DIR, batch_rows: int = 1000, crawl_date: Optional[str] = None) -> None:
+        _require_pyarrow()
+        self.path = Path(root)
+        self.batch_rows = max(1, batch_rows)
+        self.crawl_date = crawl_date or date.today().isoformat()
+        self.count = 0
+        self.schema = review_schema()
+        self._part_name = f"part-{uuid.uuid4().hex[:12]}.parquet"
+        self._buffers: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._writers: Dict[Tuple[str, int], Any] = {}
+
+    def __enter__(self) -> "ParquetDatasetSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _partition_dir(self, key: Tuple[str, int]) -> Path:
+        asin, star = key
+        return self.path / f"asin={asin}" / f"star={star}" / f"crawl_date={self.crawl_date}"
+
+    def _flush_partition(self, key: Tuple[str, int]) -> None:
+        rows = self._buffers.get(key)
+        if not rows:
+            return
+        writer = self._writers.get(key)
+        if writer is None:
+            out_dir = self._partition_dir(key)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(str(out_dir / self._part_name), self.schema, compression="zstd", use_dictionary=True)
+            self._writers[key] = writer
+        columns = {name: [r.get(name) for r in rows] for name in self.schema.names}
+        writer.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        self._buffers[key] = []
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            key = (str(row.get("asin") or "unknown"), int(row.get("star") or 0))
+            buf = self._buffers.setdefault(key, [])
+            buf.append(row)
+            self.count += 1
+            if len(buf) >= self.batch_rows:
+                self._flush_partition(key)
+
+    def sync(self) -> None:
+        # Called after every page; flushing here would make each page its own row group.
+        # Partitions are written at batch_rows and at close instead.
+        pass
+
+    def close(self) -> None:
+        for key in list(self._buffers):
+            self._flush_partition(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+def read_reviews(
+    root: Path = PARQUET_DIR,
+    columns: Optional[Sequence[str]] = None,
+    asin: Optional[str] = None,
+    star: Optional[int] = None,
+    since: Optional[str] = None,
+):
+    """Load a projection of the dataset; partition filters prune whole directories."""
+    _require_pyarrow()
+    dataset = ds.dataset(str(root), format="parquet", partitioning="hive")
+    expr = None
+    for cond in [
+        (ds.field("asin") == asin) if asin else None,
+        (ds.field("star") == star) if star is not None else None,
+        (ds.field("crawl_date") >= since) if since else None,
+    ]:
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expr)
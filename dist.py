@@ -0,0 +1,262 @@
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+from utils import (
+    STORAGE_STATE_PATH,
+    extract_host_and_asin_from_url,
+    normalize_product_url,
+    open_review_sinks,
+    parse_formats,
+    parse_star_list,
+    review_fingerprint,
+)
+from amazon_http import BlockedError, HttpReviewClient, scrape_reviews_http
+from amazon_reviews import scrape_reviews_for_product
+from amazon_search import search_top_products
+from browser_pool import BrowserPool
+from metrics import METRICS
+from page_archive import PageArchive
+from rate_limit import HostRateLimiter
+from review_links import ReviewLinkMap
+from session_pool import SessionPool
+from work_queue import LEASED, PENDING, WorkQueue, WorkUnit, open_queue
+
+
+# Seconds before a failed unit is offered again, times the attempt number
+RETRY_DELAY = 30.0
+# Blocks back off harder: doubled per attempt
+BLOCKED_RETRY_DELAY = 120.0
+# Printed when the lease ran out and another worker has taken the unit over
+LEASE_LOST = "租约已被其他工作进程接管"
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class _Heartbeat:
+    """Keeps extending a unit's lease while it is being worked on."""
+
+    def __init__(self, queue: WorkQueue, unit: WorkUnit, worker: str, visibility: float) -> None:
+        self.queue = queue
+        self.unit = unit
+        self.worker = worker
+        self.visibility = visibility
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{unit.id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.visibility / 3):
+            if not self.queue.extend(self.unit, self.worker, self.visibility):
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_enqueue(
+    queue: WorkQueue, job: str, keyword: str | None, urls: str | None, stars: List[int], pages: int, limit: int, headless: bool,
+) -> None:
+    if urls:
+        links = [u.strip() if "product-reviews/" in u else normalize_product_url(u) for u in urls.split(",") if u.strip()]
+    else:
+        print(f"搜索关键词: {keyword} ...")
+        links = search_top_products(keyword, limit=limit, headless=headless)
+    units = []
+    for link in links:
+        asin = extract_host_and_asin_from_url(link)[1]
+        if not asin:
+            print(f"跳过无 ASIN 的链接: {link}")
+            continue
+        units.extend((link, asin, star, page) for star in stars for page in range(1, pages + 1))
+    added = queue.enqueue(job, units)
+    print(f"任务 {job}: {len(links)} 个产品，新增 {added} 个工作单元(共 {len(units)} 个)")
+
+
+def _scrape_unit(
+    pool: BrowserPool, http_client: HttpReviewClient | None, unit: WorkUnit, headless: bool,
+) -> Tuple[List[Dict], bool, bool]:
+    """Scrape one review page; returns (rows, blocked, empty).
+
+    ``empty`` only when the page was classified as having no reviews; zero rows alone do not say so.
+    """
+    empty: List[int] = []
+    rows = None
+    if http_client is not None:
+        try:
+            rows = scrape_reviews_http(
+                unit.url, unit.star, max_pages=unit.page, client=http_client, start_page=unit.page, on_empty=empty.append,
+            )
+        except BlockedError as e:
+            METRICS.count("fallback.http_to_browser")
+            print(f"HTTP 模式受阻({e})，改用浏览器 ...")
+    if rows is None:
+        try:
+            rows = scrape_reviews_for_product(
+                unit.url, unit.star, max_pages=unit.page, headless=headless, pool=pool, start_page=unit.page,
+                on_empty=empty.append,
+            )
+        except BlockedError:
+            return [], True, False
+    for r in rows:
+        r["product_url"] = unit.url
+        r["asin"] = unit.asin
+        r["star"] = unit.star
+    return rows, False, bool(empty)
+
+
+def run_worker(
+    queue: WorkQueue,
+    headless: bool,
+    use_http: bool,
+    visibility: float,
+    poll: float,
+    forever: bool,
+    limiter: HostRateLimiter | None,
+    sessions: SessionPool | None,
+    archive: PageArchive | None = None,
+) -> None:
+    worker = _worker_id()
+    done = failed = 0
+    print(f"工作进程 {worker} 启动")
+    with BrowserPool(headless=headless, limiter=limiter, review_links=ReviewLinkMap(), sessions=sessions, archive=archive) as pool:
+        http_client = HttpReviewClient(
+            limiter=limiter, review_links=pool.review_links, sessions=sessions, archive=archive,
+        ) if use_http else None
+        try:
+            while True:
+                units = queue.lease(worker, n=1, visibility=visibility)
+                if not units:
+                    counts = queue.counts()
+                    # Units leased elsewhere may still come back if their worker fails
+                    if not forever and counts[PENDING] == 0 and counts[LEASED] == 0:
+                        break
+                    time.sleep(poll)
+                    continue
+                unit = units[0]
+                label = f"{unit.job} {unit.asin} {unit.star}星 第{unit.page}页(第{unit.attempts}次)"
+                try:
+                    with _Heartbeat(queue, unit, worker, visibility):
+                        rows, blocked, empty = _scrape_unit(pool, http_client, unit, headless)
+                except Exception as e:
+                    state = queue.fail(unit, worker, f"{type(e).__name__}: {e}", retry_after=RETRY_DELAY * unit.attempts)
+                    failed += 1
+                    print(f"{label} 出错: {e} -> {state or LEASE_LOST}")
+                    continue
+                if blocked:
+                    state = queue.fail(unit, worker, "blocked", retry_after=BLOCKED_RETRY_DELAY * 2 ** (unit.attempts - 1))
+                    failed += 1
+                    print(f"{label} 受阻 -> {state or LEASE_LOST}")
+                    continue
+                if not queue.complete(unit, worker, rows):
+                    print(f"{label}: {LEASE_LOST}，结果丢弃")
+                    continue
+                done += 1
+                print(f"{label}: {len(rows)} 条评论")
+                if empty:
+                    dropped = queue.cancel_after(unit.job, unit.asin, unit.star, unit.page)
+                    if dropped:
+                        print(f"{unit.asin} {unit.star}星 第{unit.page}页已无评论，取消后续 {dropped} 页")
+        finally:
+            if http_client is not None:
+                http_client.close()
+    print(f"工作进程 {worker} 结束: 完成 {done} 个单元，失败 {failed} 次")
+    if limiter is not None:
+        print(f"限速: {limiter.summary()}")
+    if sessions is not None:
+        print(f"账号: {sessions.summary()}")
+    if archive is not None:
+        print(f"原始页面归档: {archive.summary()}")
+
+
+def run_status(queue: WorkQueue, job: str | None) -> None:
+    counts = queue.counts(job)
+    print(f"{job or '全部任务'}: " + "，".join(f"{state} {n}" for state, n in counts.items()))
+    for f in queue.failures(job):
+        print(f"  失败 {f['job']} {f['asin']} {f['star']}星 第{f['page']}页 ({f['attempts']} 次): {f['error']}")
+
+
+def run_export(queue: WorkQueue, job: str, formats: List[str]) -> None:
+    seen: Set[Tuple[str, int, str]] = set()
+    base_name = f"dist_{job}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    duplicates = 0
+    with open_review_sinks(base_name, formats=formats) as sink:
+        for row in queue.rows(job):
+            key = (row.get("asin"), row.get("star"), review_fingerprint(row))
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            sink.write_rows([row])
+        paths = sink.paths
+    print(f"任务 {job}: 导出 {len(seen)} 条评论，去重 {duplicates} 条")
+    for p in paths:
+        print(f"已保存: {p}")
+    run_status(queue, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed crawl: a coordinator fills a work queue, workers lease and scrape (ASIN, star, page) units")
+    parser.add_argument("--queue", type=str, default=None, help="Queue backend: a SQLite path or sqlite:///path (default: work_queue.sqlite)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Give up on a unit after N failed attempts")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Coordinator: turn a keyword search or product URLs into work units")
+    enqueue.add_argument("--job", type=str, required=True)
+    enqueue.add_argument("--keyword", type=str, default=None)
+    enqueue.add_argument("--urls", type=str, default=None, help="Comma-separated product URLs")
+    enqueue.add_argument("--stars", type=str, default="5", help="Comma-separated stars, or 'all'")
+    enqueue.add_argument("--pages", type=int, default=2, help="Review pages per product and star")
+    enqueue.add_argument("--limit", type=int, default=3, help="Products taken from the keyword search")
+    enqueue.add_argument("--headless", action="store_true")
+
+    work = sub.add_parser("work", help="Worker: lease units and scrape them until the queue is drained")
+    work.add_argument("--headless", action="store_true")
+    work.add_argument("--http", action="store_true", help="Fetch pages over plain HTTP; fall back to the browser on a block")
+    work.add_argument("--visibility", type=float, default=300.0, help="Lease length in seconds; renewed while a unit is worked on")
+    work.add_argument("--poll", type=float, default=5.0, help="Seconds between polls of an empty queue")
+    work.add_argument("--forever", action="store_true", help="Keep polling after the queue is drained")
+    work.add_argument("--rate", type=float, default=1.0, help="Starting requests per second per Amazon host (0 disables rate control)")
+    work.add_argument("--max-rate", type=float, default=5.0)
+    work.add_argument("--sessions", action="store_true", help="Spread requests over every saved login")
+    work.add_argument("--archive", action="store_true", help="Keep every fetched review page in archive/ for python reparse.py")
+
+    status = sub.add_parser("status", help="Unit counts per state and failed units")
+    status.add_argument("--job", type=str, default=None)
+
+    export = sub.add_parser("export", help="Write a job's rows, de-duplicated, to output/")
+    export.add_argument("--job", type=str, required=True)
+    export.add_argument("--formats", type=str, default="jsonl,csv")
+    args = parser.parse_args()
+
+    with open_queue(args.queue, max_attempts=args.max_attempts) as queue:
+        if args.command == "enqueue":
+            if not args.keyword and not args.urls:
+                parser.error("enqueue needs --keyword or --urls")
+            run_enqueue(queue, args.job, args.keyword, args.urls, parse_star_list(args.stars), args.pages, args.limit, args.headless)
+        elif args.command == "work":
+            sessions = SessionPool() if args.sessions else None
+            if sessions is None and not STORAGE_STATE_PATH.exists():
+                print("尚未登录。请先运行 python main.py --login")
+                return
+            limiter = HostRateLimiter(rate=args.rate, max_rate=max(args.rate, args.max_rate)) if args.rate > 0 else None
+            archive = PageArchive() if args.archive else None
+            run_worker(queue, args.headless, args.http, args.visibility, args.poll, args.forever, limiter, sessions, archive)
+        elif args.command == "status":
+            run_status(queue, args.job)
+        else:
+            run_export(queue, args.job, parse_formats(args.formats))
+
+
+if __name__ == "__main__":
+    main()
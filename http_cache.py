@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from utils import ROOT_DIR, response_is_blocked, text_has_block
+
+
+CACHE_DIR = ROOT_DIR / "http_cache"
+
+# Query parameters Amazon adds for tracking only; they never change the content
+IGNORED_PARAMS = {"ref", "ref_", "qid", "sr", "crid", "sprefix", "dib", "dib_tag", "content-id", "pd_rd_w", "pd_rd_r", "pf_rd_p", "pf_rd_r"}
+
+AJAX_PATH_MARKER = "/hz/reviews-render/ajax/"
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    content_type: str
+    body: bytes
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+def normalize_url(url: str) -> str:
+    parsed = urlparse(url)
+    # Drop "/ref=..." path segments, e.g. /dp/B0XXXX/ref=sr_1_1
+    path = "/".join(seg for seg in parsed.path.split("/") if not seg.startswith("ref="))
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path or "/", "", urlencode(query), ""))
+
+
+def cache_key(method: str, url: str, body: Optional[str] = None) -> str:
+    parts = [method.upper(), normalize_url(url)]
+    if body:
+        parts.append(urlencode(sorted(parse_qsl(body, keep_blank_values=True))))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def is_cacheable(url: str, resource_type: str) -> bool:
+    return resource_type == "document" or AJAX_PATH_MARKER in url
+
+
+class ResponseCache:
+    """Content-addressed, zlib-compressed response store with TTL and LRU eviction.
+
+    In ``replay`` mode TTLs are ignored and nothing ever touches the network:
+    a request without a cached response is a miss.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, ttl: Optional[float] = None, max_bytes: int = 512 * 1024 * 1024, replay: bool = False) -> None:
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        # --workers processes share the cache; wait out their writes instead of failing
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30.0, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, status INTEGER, content_type TEXT,"
+            " size INTEGER, created REAL, last_access REAL)"
+        )
+        self._db.commit()
+
+    def _object_path(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / (key[2:] + ".z")
+
+    def get(self, method: str, url: str, body: Optional[str] = None) -> Optional[CachedResponse]:
+        key = cache_key(method, url, body)
+        with self._lock:
+            row = self._db.execute("SELECT status, content_type, created FROM entries WHERE key = ?", (key,)).fetchone()
+            path = self._object_path(key)
+            expired = row is not None and not self.replay and self.ttl is not None and time.time() - row[2] > self.ttl
+            if row is None or expired or not path.exists():
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return CachedResponse(row[0], row[1] or "", zlib.decompress(path.read_bytes()))
+
+    def put(self, method: str, url: str, body: Optional[str], status: int, content_type: str, data: bytes) -> None:
+        if self.replay:
+            return
+        key = cache_key(method, url, body)
+        compressed = zlib.compress(data, 6)
+        path = self._object_path(key)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(compressed)
+            tmp.replace(path)
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, url, status, content_type, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, normalize_url(url), status, content_type, len(compressed), now, now),
+            )
+            self._db.commit()
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall():
+            try:
+                self._object_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def summary(self) -> str:
+        mode = "replay" if self.replay else "live"
+        return f"{mode}: {self.hits} hits, {self.misses} misses"
+
+    # Playwright context routing: serve documents and review XHRs from the cache
+
+    def _storable(self, status: int, url: str, body: bytes) -> bool:
+        # Captcha pages often come back as a 200; caching one would replay the block
+        return status == 200 and not response_is_blocked(status, url) and not text_has_block(body.decode("utf-8", errors="replace"))
+
+    def _route_headers(self, cached: CachedResponse) -> Dict[str, str]:
+        return {"content-type": cached.content_type or "text/html; charset=utf-8"}
+
+    def handle(self, route) -> None:
+        req = route.request
+        if not is_cacheable(req.url, req.resource_type):
+            if self.replay:
+                route.abort()
+            else:
+                route.fallback()
+            return
+        cached = self.get(req.method, req.url, req.post_data)
+        if cached is not None:
+            route.fulfill(status=cached.status, headers=self._route_headers(cached), body=cached.body)
+            return
+        if self.replay:
+            route.fulfill(status=504, body="")
+            return
+        resp = route.fetch()
+        data = resp.body()
+        if self._storable(resp.status, resp.url, data):
+            self.put(req.method, req.url, req.post_data, resp.status, resp.headers.get("content-type", ""), data)
+        route.fulfill(response=resp, body=data)
+
+    async def handle_async(self, route) -> None:
+        req = route.request
+        if not is_cacheable(req.url, req.resource_type):
+            if self.replay:
+                await route.abort()
+            else:
+                await route.fallback()
+            return
+        cached = self.get(req.method, req.url, req.post_data)
+        if cached is not None:
+            await route.fulfill(status=cached.status, headers=self._route_headers(cached), body=cached.body)
+            return
+        if self.replay:
+            await route.fulfill(status=504, body="")
+            return
+        resp = await route.fetch()
+        data = await resp.body()
+        if self._storable(resp.status, resp.url, data):
+            self.put(req.method, req.url, req.post_data, resp.status, resp.headers.get("content-type", ""), data)
+        await route.fulfill(response=resp, body=data)
+
+    def install(self, context) -> None:
+        context.route("**/*", self.handle)
+
+    async def install_async(self, context) -> None:
+        await context.route("**/*", self.handle_async)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils import OUTPUT_DIR
+
+
+JOBS_DIR = OUTPUT_DIR / "jobs"
+
+
+class JobJournal:
+    """Append-only record of finished (product, star, page) units for one job.
+
+    ``job.json`` holds the job parameters; ``journal.jsonl`` gets one fsynced
+    line per finished page and per finished product, written only after that
+    page's rows reached the output files.
+    """
+
+    def __init__(self, job_id: str, root: Path = JOBS_DIR) -> None:
+        self.job_id = job_id
+        self.dir = Path(root) / job_id
+        self.params: Dict[str, Any] = {}
+        self._pages: Dict[Tuple[str, int], Dict[int, int]] = {}
+        self._buckets: Dict[str, Dict[int, int]] = {}
+        self._done: Set[Tuple[str, int]] = set()
+        self._f = None
+
+    @classmethod
+    def create(cls, params: Dict[str, Any], job_id: Optional[str] = None, root: Path = JOBS_DIR) -> "JobJournal":
+        journal = cls(job_id or datetime.now().strftime("%Y%m%d_%H%M%S"), root=root)
+        journal.dir.mkdir(parents=True, exist_ok=True)
+        journal.params = dict(params)
+        (journal.dir / "job.json").write_text(
+            json.dumps({"job_id": journal.job_id, "created": time.time(), "params": journal.params}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        return journal
+
+    @classmethod
+    def load(cls, job_id: str, root: Path = JOBS_DIR) -> "JobJournal":
+        journal = cls(job_id, root=root)
+        job_file = journal.dir / "job.json"
+        if not job_file.exists():
+            raise FileNotFoundError(f"未找到任务 {job_id}: {job_file}")
+        journal.params = json.loads(job_file.read_text(encoding="utf-8"))["params"]
+        journal_file = journal.dir / "journal.jsonl"
+        if journal_file.exists():
+            for line in journal_file.read_text(encoding="utf-8").splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                key = (rec["product"], int(rec["star"]))
+                if rec.get("event") == "page":
+                    journal._note_page(key, int(rec["page"]), int(rec.get("rows", 0)), rec.get("buckets"))
+                elif rec.get("event") == "product":
+                    journal._done.add(key)
+        return journal
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._f is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._f = (self.dir / "journal.jsonl").open("a", encoding="utf-8")
+        record["ts"] = time.time()
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def _note_page(self, key: Tuple[str, int], page: int, rows: int, buckets: Optional[Dict[str, int]]) -> None:
+        self._pages.setdefault(key, {})[page] = rows
+        if buckets:
+            counts = self._buckets.setdefault(key[0], {})
+            for star, n in buckets.items():
+                counts[int(star)] = counts.get(int(star), 0) + int(n)
+
+    def page_done(
+        self,
+        product: str,
+        star: int,
+        page: int,
+        rows: int,
+        outputs: List[str],
+        buckets: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """``buckets`` holds per-star row counts for pages of the combined listing."""
+        record = {"event": "page", "product": product, "star": star, "page": page, "rows": rows, "outputs": outputs}
+        if buckets:
+            record["buckets"] = {str(k): v for k, v in buckets.items()}
+        self._note_page((product, star), page, rows, record.get("buckets"))
+        self._append(record)
+
+    def product_done(self, product: str, star: int) -> None:
+        self._done.add((product, star))
+        self._append({"event": "product", "product": product, "star": star})
+
+    def is_product_done(self, product: str, star: int) -> bool:
+        return (product, star) in self._done
+
+    def next_page(self, product: str, star: int) -> int:
+        pages = self._pages.get((product, star))
+        return max(pages) + 1 if pages else 1
+
+    def last_page_rows(self, product: str, star: int) -> Optional[int]:
+        pages = self._pages.get((product, star))
+        return pages[max(pages)] if pages else None
+
+    def bucket_counts(self, product: str) -> Dict[int, int]:
+        return dict(self._buckets.get(product, {}))
+
+    def has_progress(self) -> bool:
+        return bool(self._pages or self._done)
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
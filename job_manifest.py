@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from utils import parse_star_list
+
+
+class ManifestJob(NamedTuple):
+    line: int
+    keyword: Optional[str]
+    urls: List[str]
+    stars: List[int]
+    pages: int
+    limit: int
+
+    @property
+    def label(self) -> str:
+        return self.keyword or f"{len(self.urls)} url(s)"
+
+
+def load_manifest(path: Path, pages: int = 2, limit: int = 3) -> List[ManifestJob]:
+    """Read a JSONL manifest; one job per line.
+
+    Each line has ``keyword`` or ``urls`` (list or comma-separated string),
+    ``star``/``stars`` (e.g. 5, "5星", [1, 2], "1,2" or "all") and optionally
+    ``pages`` and ``limit``, which default to the command line values.
+    Blank lines and lines starting with ``#`` are skipped.
+    """
+    jobs: List[ManifestJob] = []
+    for n, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        raw = raw.strip()
+        if not raw or raw.startswith("#"):
+            continue
+        try:
+            spec = json.loads(raw)
+            urls = spec.get("urls") or []
+            if isinstance(urls, str):
+                urls = urls.split(",")
+            urls = [u.strip() for u in urls if u.strip()]
+            keyword = (spec.get("keyword") or "").strip() or None
+            if not keyword and not urls:
+                raise ValueError("needs keyword or urls")
+            stars_value = spec.get("stars", spec.get("star"))
+            if stars_value is None:
+                raise ValueError("needs star or stars")
+            jobs.append(ManifestJob(
+                line=n,
+                keyword=keyword,
+                urls=urls,
+                stars=parse_star_list(",".join(map(str, stars_value)) if isinstance(stars_value, list) else str(stars_value)),
+                pages=int(spec.get("pages", pages)),
+                limit=int(spec.get("limit", limit)),
+            ))
+        except (ValueError, TypeError, AttributeError) as e:
+            raise ValueError(f"{path}:{n}: {e}") from e
+    return jobs
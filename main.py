@@ -1,16 +1,58 @@
 import argparse
+import json
+import multiprocessing
+import time
+from contextlib import ExitStack
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Set, Tuple
 
-from utils import STORAGE_STATE_PATH, write_csv, write_json, normalize_star_input, normalize_product_url
+from utils import (
+    OUTPUT_DIR,
+    STORAGE_STATE_PATH,
+    extract_host_and_asin_from_url,
+    normalize_product_url,
+    bucket_by_star,
+    open_review_sinks,
+    parse_formats,
+    parse_star_list,
+    review_fingerprint,
+    sink_paths,
+    write_json,
+)
 from amazon_login import interactive_login
 from amazon_search import search_top_products
-from amazon_reviews import scrape_reviews_for_product
+from amazon_reviews import ALL_STARS, REVIEWS_PER_PAGE, SCROLL_CEILING, PageCallback, scrape_reviews_for_product
+from amazon_reviews_async import scrape_products_concurrently
+from amazon_http import BlockedError, HttpReviewClient, scrape_reviews_http
+from browser_pool import BrowserPool
+from http_cache import ResponseCache
+from job_journal import JobJournal
+from job_manifest import load_manifest
+from metrics import METRICS
+from page_archive import PageArchive
+from rate_limit import HostRateLimiter
+from review_index import ReviewIndex
+from review_links import ReviewLinkMap
+from review_pipeline import StageTimings, scrape_reviews_pipelined
+from resource_blocking import ResourceBlocker
+from session_pool import SESSIONS_DIR, SessionPool, session_path
 
 
-def run_login(headless: bool) -> None:
-    interactive_login(storage_state_path=STORAGE_STATE_PATH, headless=headless)
+def run_login(headless: bool, session: str | None = None) -> None:
+    path = STORAGE_STATE_PATH
+    if session:
+        SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        path = session_path(session)
+    interactive_login(storage_state_path=path, headless=headless)
+
+
+def run_check_sessions(sessions: SessionPool) -> None:
+    for r in sessions.report():
+        status = "可用" if r["healthy"] else f"不可用: {r['problem']}"
+        print(f"{r['name']:<16} {status}  ({r['path']})")
+    print(f"可用账号 {len(sessions.healthy())}/{len(sessions.sessions)}")
 
 
 def _normalize_if_needed(url: str) -> str:
@@ -20,7 +62,134 @@ def _normalize_if_needed(url: str) -> str:
     return normalize_product_url(u)
 
 
-def run_scrape_interactive(headless: bool, urls_arg: str | None = None, pages: int = 2, limit: int = 3) -> None:
+def run_scrape_interactive(
+    headless: bool,
+    urls_arg: str | None = None,
+    pages: int = 2,
+    limit: int = 3,
+    recycle_after: int = 20,
+    concurrency: int = 1,
+    per_host: int | None = None,
+    use_http: bool = False,
+    scroll_ceiling: float = SCROLL_CEILING,
+    block: str | None = None,
+    cache: ResponseCache | None = None,
+    index: ReviewIndex | None = None,
+    formats: List[str] | None = None,
+    resume: str | None = None,
+    stars_arg: str | None = None,
+    parse_workers: int = 0,
+    limiter: HostRateLimiter | None = None,
+    review_links: ReviewLinkMap | None = None,
+    page_fanout: int = 1,
+    sessions: SessionPool | None = None,
+    archive: PageArchive | None = None,
+    report_tag: str | None = None,
+) -> None:
+    blocker = ResourceBlocker.parse(block)
+    timings = StageTimings() if parse_workers > 0 else None
+    with BrowserPool(headless=headless, max_pages_per_context=recycle_after, blocker=blocker, cache=cache, limiter=limiter,
+                     review_links=review_links, page_fanout=page_fanout, sessions=sessions, archive=archive) as pool:
+        http_client = HttpReviewClient(
+            cache=cache, limiter=limiter, review_links=review_links, page_fanout=page_fanout, sessions=sessions, archive=archive,
+        ) if use_http else None
+        try:
+            if resume:
+                journal = JobJournal.load(resume)
+                print(f"继续任务 {journal.job_id} ...")
+            else:
+                chosen = _choose_products_and_stars(pool, headless=headless, urls_arg=urls_arg, limit=limit, stars_arg=stars_arg)
+                if chosen is None:
+                    return
+                product_links, stars = chosen
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                journal = JobJournal.create({
+                    "product_links": product_links,
+                    "stars": stars,
+                    "pages": pages,
+                    "formats": formats or ["jsonl", "csv"],
+                    "base_name": f"amazon_reviews_{{star}}star_{timestamp}",
+                }, job_id=timestamp)
+                print(f"任务 ID: {journal.job_id} (中断后可用 --resume {journal.job_id} 继续)")
+            try:
+                _crawl(
+                    pool, http_client, journal, headless=headless, concurrency=concurrency, per_host=per_host,
+                    scroll_ceiling=scroll_ceiling, index=index, parse_workers=parse_workers, timings=timings,
+                )
+            finally:
+                journal.close()
+        finally:
+            if http_client is not None:
+                http_client.close()
+    _write_run_report(report_tag)
+    if timings is not None:
+        print(f"流水线各阶段耗时: {timings.summary()}")
+    if limiter is not None:
+        print(f"限速: {limiter.summary()}")
+    if sessions is not None:
+        print(f"账号: {sessions.summary()}")
+    if archive is not None:
+        print(f"原始页面归档: {archive.summary()}")
+    if blocker is not None:
+        print(f"资源拦截: {blocker.summary()}")
+    if cache is not None:
+        print(f"响应缓存: {cache.summary()}")
+
+
+def _write_run_report(tag: str | None = None) -> None:
+    report = METRICS.report()
+    # Worker processes finish within the same second; the tag keeps their reports apart
+    name = f"run_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}" + (f"_{tag}" if tag else "")
+    path = METRICS.write_report(OUTPUT_DIR / f"{name}.json")
+    print(f"运行报告: {path} ({report['pages']} 页，{report['pages_per_sec']} 页/秒)")
+
+
+def _scrape_one(
+    pool: BrowserPool,
+    http_client: HttpReviewClient | None,
+    link: str,
+    star: int,
+    pages: int,
+    headless: bool,
+    scroll_ceiling: float,
+    index: ReviewIndex | None,
+    on_page: PageCallback | None = None,
+    start_page: int = 1,
+    parse_workers: int = 0,
+    timings: StageTimings | None = None,
+) -> List[Dict]:
+    rows: List[Dict] = []
+    if http_client is not None:
+        try:
+            return scrape_reviews_http(link, star, max_pages=pages, client=http_client, index=index, on_page=on_page, start_page=start_page)
+        except BlockedError as e:
+            METRICS.count("fallback.http_to_browser")
+            print(f"HTTP 模式受阻({e})，从第 {e.next_page} 页改用浏览器抓取 ...")
+            rows = list(e.rows)
+            start_page = e.next_page
+        except OSError as e:
+            METRICS.count("fallback.http_to_browser")
+            print(f"HTTP 模式出错({e})，改用浏览器抓取 ...")
+    try:
+        if parse_workers > 0:
+            rows += scrape_reviews_pipelined(
+                link, star=star, max_pages=pages, headless=headless, pool=pool, scroll_ceiling=scroll_ceiling,
+                index=index, on_page=on_page, start_page=start_page, workers=parse_workers, timings=timings,
+            )
+            return rows
+        rows += scrape_reviews_for_product(
+            link, star=star, max_pages=pages, headless=headless, pool=pool, scroll_ceiling=scroll_ceiling,
+            index=index, on_page=on_page, start_page=start_page,
+        )
+    except BlockedError as e:
+        e.rows = rows + e.rows
+        raise
+    return rows
+
+
+def _choose_products_and_stars(
+    pool: BrowserPool, headless: bool, urls_arg: str | None, limit: int, stars_arg: str | None = None,
+) -> Tuple[List[str], List[int]] | None:
     product_links: List[str] = []
     if urls_arg:
         product_links = [_normalize_if_needed(u) for u in urls_arg.split(",") if u.strip()]
@@ -31,12 +200,12 @@ def run_scrape_interactive(headless: bool, urls_arg: str | None = None, pages: i
             product_links = [_normalize_if_needed(u) for u in raw_urls.split(",") if u.strip()]
         else:
             print(f"正在搜索: {keyword} ...")
-            product_links = search_top_products(keyword, limit=limit, headless=headless)
+            product_links = search_top_products(keyword, limit=limit, headless=headless, pool=pool)
             product_links = [normalize_product_url(u) for u in product_links]
 
     if not product_links:
         print("未获取到产品链接。")
-        return
+        return None
 
     product_links = product_links[:limit]
 
@@ -44,24 +213,419 @@ def run_scrape_interactive(headless: bool, urls_arg: str | None = None, pages: i
     for i, link in enumerate(product_links, 1):
         print(f"{i}. {link}")
 
-    star_raw = input("请输入评论星级(1-5，例如 5 或 5星): ").strip()
-    star = normalize_star_input(star_raw)
+    if stars_arg:
+        return product_links, parse_star_list(stars_arg)
+    star_raw = input("请输入评论星级(1-5，例如 5 或 5星；多个星级用逗号分隔，或输入 all): ").strip()
+    return product_links, parse_star_list(star_raw)
+
+
+def _crawl(
+    pool: BrowserPool,
+    http_client: HttpReviewClient | None,
+    journal: JobJournal,
+    headless: bool,
+    concurrency: int,
+    per_host: int | None,
+    scroll_ceiling: float,
+    index: ReviewIndex | None,
+    parse_workers: int = 0,
+    timings: StageTimings | None = None,
+) -> Tuple[int, List[str]]:
+    params = journal.params
+    product_links: List[str] = params["product_links"]
+    stars: List[int] = params.get("stars") or [params["star"]]
+    pages: int = params["pages"]
+
+    with ExitStack() as stack:
+        # Resumed jobs append to the same output files
+        sinks = {
+            star: stack.enter_context(open_review_sinks(params["base_name"].format(star=star), append=journal.has_progress(), formats=params["formats"]))
+            for star in stars
+        }
+        outputs = sink_paths(sinks.values())
+        # Star-filtered top-up pages overlap the combined listing; keep each review once per star
+        seen: Dict[Tuple[int, int], Set[str]] = {}
+
+        def on_page(listing_star: int, idx: int, page_number: int, rows: List[Dict]) -> None:
+            link = product_links[idx - 1]
+            asin = extract_host_and_asin_from_url(link)[1]
+            buckets = bucket_by_star(rows, stars) if listing_star == ALL_STARS else {listing_star: rows}
+            # Rows actually written per star, after de-duplication; the star top-up resumes from these
+            written: Dict[int, int] = {}
+            for star, bucket in buckets.items():
+                fingerprints = seen.setdefault((idx, star), set())
+                fresh: List[Dict] = []
+                for r in bucket:
+                    fp = review_fingerprint(r)
+                    if fp in fingerprints:
+                        continue
+                    fingerprints.add(fp)
+                    r["product_index"] = idx
+                    r["product_url"] = link
+                    r["asin"] = asin
+                    r["star"] = star
+                    fresh.append(r)
+                sinks[star].write_rows(fresh)
+                sinks[star].sync()
+                written[star] = len(fresh)
+            journal.page_done(
+                link, listing_star, page_number, len(rows), outputs, buckets=written if listing_star == ALL_STARS else None,
+            )
+
+        def run_listing(listing_star: int, start_pages: Dict[int, int]) -> None:
+            label = "全部星级" if listing_star == ALL_STARS else f"星级 {listing_star}"
+            todo = [idx for idx in sorted(start_pages) if start_pages[idx] <= pages]
+            if not todo:
+                return
+
+            def on_product_done(idx: int) -> None:
+                journal.product_done(product_links[idx - 1], listing_star)
+
+            # Overlapping page requests need the async engine; --http fans out on its own
+            if concurrency > 1 or (pool.page_fanout > 1 and http_client is None):
+                # The async engine drives its own browser; release the sync one first
+                pool.close()
+                print(f"并发抓取 {len(todo)} 个产品的评论({label})，并发数: {concurrency}，每个产品同时 {pool.page_fanout} 页，页数: {pages} ...")
+                results = scrape_products_concurrently(
+                    product_links, listing_star, max_pages=pages, headless=headless, concurrency=concurrency, per_host=per_host,
+                    scroll_ceiling=scroll_ceiling, blocker=pool.blocker, cache=pool.cache, index=index,
+                    on_page=partial(on_page, listing_star), start_pages=start_pages, on_product_done=on_product_done,
+                    limiter=pool.limiter, review_links=pool.review_links, page_fanout=pool.page_fanout,
+                    sessions=pool.sessions, archive=pool.archive,
+                )
+                for idx in todo:
+                    print(f"第 {idx} 个产品抓取到 {len(results[idx - 1])} 条评论({label})")
+            else:
+                for idx in todo:
+                    link = product_links[idx - 1]
+                    print(f"抓取第 {idx} 个产品的评论({label})，页数: {pages}，起始页: {start_pages[idx]} ...")
+                    try:
+                        rows = _scrape_one(
+                            pool, http_client, link, listing_star, pages, headless, scroll_ceiling, index,
+                            on_page=partial(on_page, listing_star, idx), start_page=start_pages[idx],
+                            parse_workers=parse_workers, timings=timings,
+                        )
+                    except BlockedError as e:
+                        # Left unfinished in the journal, so --resume retries it from the blocked page
+                        print(f"第 {idx} 个产品受阻({e})，已抓取 {len(e.rows)} 条评论({label})，可用 --resume 继续")
+                        continue
+                    on_product_done(idx)
+                    print(f"第 {idx} 个产品抓取到 {len(rows)} 条评论({label})")
+
+        def resume_points(listing_star: int) -> Dict[int, int]:
+            return {
+                idx: pages + 1 if journal.is_product_done(link, listing_star) else journal.next_page(link, listing_star)
+                for idx, link in enumerate(product_links, 1)
+            }
+
+        if len(stars) == 1:
+            run_listing(stars[0], resume_points(stars[0]))
+        else:
+            # One pass over the combined listing, then star-filtered pages only where a bucket is short
+            run_listing(ALL_STARS, resume_points(ALL_STARS))
+            for star in stars:
+                start_pages = resume_points(star)
+                for idx, link in enumerate(product_links, 1):
+                    have = journal.bucket_counts(link).get(star, 0)
+                    if have >= pages * REVIEWS_PER_PAGE or _combined_listing_exhausted(journal, link, pages):
+                        start_pages[idx] = pages + 1
+                    else:
+                        # Both listings are sorted by date, so the bucket already covers the first pages
+                        start_pages[idx] = max(start_pages[idx], have // REVIEWS_PER_PAGE + 1)
+                run_listing(star, start_pages)
+
+        total = sum(sink.count for sink in sinks.values())
+        if len(stars) > 1:
+            print("各星级本次保存: " + "，".join(f"{star} 星 {sink.count} 条" for star, sink in sinks.items()))
+
+    paths = "\n".join(outputs)
+    print(f"保存完成: {paths}\n本次保存 {total} 条评论")
+    return total, outputs
 
-    all_rows: List[Dict] = []
-    for idx, link in enumerate(product_links, 1):
-        print(f"抓取第 {idx} 个产品的评论(星级 {star})，页数: {pages} ...")
-        rows = scrape_reviews_for_product(link, star=star, max_pages=pages, headless=headless)
-        print(f"第 {idx} 个产品抓取到 {len(rows)} 条评论")
-        for r in rows:
-            r["product_index"] = idx
-            r["product_url"] = link
-        all_rows.extend(rows)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = f"amazon_reviews_{star}star_{timestamp}"
-    json_path = write_json(all_rows, base_name + ".json")
-    csv_path = write_csv(all_rows, base_name + ".csv")
-    print(f"保存完成: {json_path}\n{csv_path}\n共保存 {len(all_rows)} 条评论")
+def _combined_listing_exhausted(journal: JobJournal, link: str, pages: int) -> bool:
+    # A blocked listing is never marked done, so a block cannot pass for the end of the reviews
+    if not journal.is_product_done(link, ALL_STARS):
+        return False
+    # Stopped before the page budget (no next page, or only known reviews with --incremental)
+    return journal.next_page(link, ALL_STARS) - 1 < pages or journal.last_page_rows(link, ALL_STARS) == 0
+
+
+def run_batch(
+    manifest_path: Path,
+    headless: bool,
+    pages: int = 2,
+    limit: int = 3,
+    recycle_after: int = 20,
+    concurrency: int = 1,
+    per_host: int | None = None,
+    use_http: bool = False,
+    scroll_ceiling: float = SCROLL_CEILING,
+    block: str | None = None,
+    cache: ResponseCache | None = None,
+    index: ReviewIndex | None = None,
+    formats: List[str] | None = None,
+    parse_workers: int = 0,
+    limiter: HostRateLimiter | None = None,
+    review_links: ReviewLinkMap | None = None,
+    page_fanout: int = 1,
+    sessions: SessionPool | None = None,
+    archive: PageArchive | None = None,
+) -> None:
+    timings = StageTimings() if parse_workers > 0 else None
+    jobs = load_manifest(manifest_path, pages=pages, limit=limit)
+    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    print(f"批量任务 {batch_id}: 共 {len(jobs)} 个任务")
+    blocker = ResourceBlocker.parse(block)
+    # (asin, star) -> job line that crawls it; a product shared by several jobs is fetched once per star
+    claimed: Dict[Tuple[str, int], int] = {}
+    summary: List[Dict] = []
+    with BrowserPool(headless=headless, max_pages_per_context=recycle_after, blocker=blocker, cache=cache, limiter=limiter,
+                     review_links=review_links, page_fanout=page_fanout, sessions=sessions, archive=archive) as pool:
+        http_client = HttpReviewClient(
+            cache=cache, limiter=limiter, review_links=review_links, page_fanout=page_fanout, sessions=sessions, archive=archive,
+        ) if use_http else None
+        try:
+            for job in jobs:
+                try:
+                    if job.keyword:
+                        print(f"[任务 {job.line}] 正在搜索: {job.keyword} ...")
+                        links = search_top_products(job.keyword, limit=job.limit, headless=headless, pool=pool)
+                        links = [normalize_product_url(u) for u in links]
+                    else:
+                        links = [_normalize_if_needed(u) for u in job.urls]
+                    links = links[:job.limit]
+                except Exception as e:
+                    print(f"[任务 {job.line}] 获取产品链接失败: {e}")
+                    summary.append({"line": job.line, "job": job.label, "error": str(e)})
+                    continue
+
+                # Products grouped by the stars no earlier job claimed for them
+                groups: Dict[Tuple[int, ...], List[str]] = {}
+                duplicates = 0
+                for link in links:
+                    asin = extract_host_and_asin_from_url(link)[1] or link
+                    wanted: List[int] = []
+                    for star in job.stars:
+                        owner = claimed.get((asin, star))
+                        if owner is not None:
+                            print(f"[任务 {job.line}] {asin} ({star} 星) 已由任务 {owner} 抓取，跳过")
+                            duplicates += 1
+                            continue
+                        claimed[(asin, star)] = job.line
+                        wanted.append(star)
+                    if wanted:
+                        groups.setdefault(tuple(wanted), []).append(link)
+                if not groups:
+                    summary.append({"line": job.line, "job": job.label, "stars": job.stars, "products": 0, "duplicates": duplicates, "reviews": 0})
+
+                for stars, product_links in groups.items():
+                    entry: Dict = {"line": job.line, "job": job.label, "stars": list(stars), "products": len(product_links), "duplicates": duplicates, "reviews": 0}
+                    duplicates = 0
+                    summary.append(entry)
+                    star_tag = "-".join(map(str, stars))
+                    job_id = f"{batch_id}_{job.line:03d}_{star_tag}star"
+                    journal = JobJournal.create({
+                        "product_links": product_links,
+                        "stars": list(stars),
+                        "pages": job.pages,
+                        "formats": formats or ["jsonl", "csv"],
+                        "base_name": f"amazon_reviews_{{star}}star_{batch_id}_job{job.line:03d}_{star_tag}",
+                    }, job_id=job_id)
+                    entry["job_id"] = job_id
+                    started = time.perf_counter()
+                    try:
+                        entry["reviews"], entry["outputs"] = _crawl(
+                            pool, http_client, journal, headless=headless, concurrency=concurrency, per_host=per_host,
+                            scroll_ceiling=scroll_ceiling, index=index, parse_workers=parse_workers, timings=timings,
+                        )
+                    except Exception as e:
+                        print(f"[任务 {job.line}] {star_tag} 星抓取失败: {e} (可用 --resume {job_id} 继续)")
+                        entry["error"] = str(e)
+                    finally:
+                        journal.close()
+                        entry["seconds"] = round(time.perf_counter() - started, 1)
+        finally:
+            if http_client is not None:
+                http_client.close()
+
+    print("\n批量任务汇总:")
+    for entry in summary:
+        status = f"失败: {entry['error']}" if entry.get("error") else "完成"
+        star = f"{','.join(map(str, entry['stars']))} 星" if "stars" in entry else "-"
+        print(
+            f"  任务 {entry['line']} [{entry['job']}] {star}: 产品 {entry.get('products', 0)}，"
+            f"重复跳过 {entry.get('duplicates', 0)}，评论 {entry.get('reviews', 0)}，{status}"
+        )
+    total = sum(e.get("reviews", 0) for e in summary)
+    failed = sum(1 for e in summary if e.get("error"))
+    print(f"共保存 {total} 条评论，失败 {failed} 项")
+    report = write_json(summary, f"batch_{batch_id}_summary.json")
+    print(f"汇总已保存: {report}")
+    _write_run_report()
+    if timings is not None:
+        print(f"流水线各阶段耗时: {timings.summary()}")
+    if limiter is not None:
+        print(f"限速: {limiter.summary()}")
+    if sessions is not None:
+        print(f"账号: {sessions.summary()}")
+    if archive is not None:
+        print(f"原始页面归档: {archive.summary()}")
+    if blocker is not None:
+        print(f"资源拦截: {blocker.summary()}")
+    if cache is not None:
+        print(f"响应缓存: {cache.summary()}")
+
+
+def _runtime(args: argparse.Namespace, share: int = 1, sessions: SessionPool | None = None) -> Dict[str, Any]:
+    """Cache, rate limiter, link map, review index and page archive for one crawling process, plus ``sessions``.
+
+    ``share`` splits the request rate between that many worker processes.
+    """
+    cache = None
+    if args.cache or args.replay:
+        cache = ResponseCache(ttl=args.cache_ttl, max_bytes=args.cache_max_mb * 1024 * 1024, replay=args.replay)
+    limiter = None
+    if args.rate > 0 and not args.replay:
+        limiter = HostRateLimiter(rate=args.rate / share, max_rate=max(args.rate, args.max_rate) / share)
+    index = None
+    if args.incremental:
+        index = ReviewIndex(Path(args.index)) if args.index else ReviewIndex()
+    return {
+        "cache": cache,
+        "limiter": limiter,
+        "review_links": ReviewLinkMap(),
+        "index": index,
+        "sessions": sessions,
+        # Replays fetch nothing new, so there is nothing to archive
+        "archive": PageArchive() if args.archive and not args.replay else None,
+    }
+
+
+def _is_sharded(job_id: str) -> bool:
+    return "shards" in JobJournal.load(job_id).params
+
+
+def _run_shard(args: argparse.Namespace, shard_id: str, share: int, session_paths: List[Path] | None = None) -> None:
+    """Worker process: crawl one shard job with its own browser, output files and (with --sessions) accounts."""
+    print(f"[{shard_id}] 工作进程启动")
+    run_scrape_interactive(
+        headless=args.headless, pages=args.pages, recycle_after=args.recycle_after,
+        concurrency=args.concurrency, per_host=args.per_host, use_http=args.http,
+        scroll_ceiling=args.scroll_ceiling, block=args.block, resume=shard_id,
+        parse_workers=args.parse_workers, page_fanout=args.page_fanout, report_tag=shard_id,
+        **_runtime(args, share, SessionPool(session_paths) if session_paths is not None else None),
+    )
+
+
+def run_sharded(args: argparse.Namespace, workers: int, sessions: SessionPool | None = None) -> None:
+    """Split the products across ``workers`` processes, then merge their output shards.
+
+    Every shard is a job of its own (``<job>_shardN``) with its own browser,
+    journal and JSONL output, so a worker that crashes takes nothing else
+    down. ``--resume <job>`` re-runs the unfinished shards and merges again.
+    With ``sessions`` each worker gets its own slice of the healthy accounts:
+    a cooldown is only known to the process that saw the block, so two
+    processes must never sign in as the same account.
+    """
+    accounts = [s.path for s in sessions.healthy()] if sessions is not None else []
+    if sessions is not None and not args.resume and len(accounts) < workers:
+        print(f"只有 {len(accounts)} 个可用账号，工作进程数减为 {len(accounts)}")
+        workers = len(accounts)
+    if args.resume:
+        parent = JobJournal.load(args.resume)
+        print(f"继续分片任务 {parent.job_id} ...")
+    else:
+        with BrowserPool(headless=args.headless) as pool:
+            chosen = _choose_products_and_stars(pool, headless=args.headless, urls_arg=args.urls, limit=args.limit, stars_arg=args.stars)
+        if chosen is None:
+            return
+        product_links, stars = chosen
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        workers = min(workers, len(product_links))
+        shards = []
+        for k in range(workers):
+            shard_id = f"{timestamp}_shard{k + 1}"
+            JobJournal.create({
+                "product_links": product_links[k::workers],
+                "stars": stars,
+                "pages": args.pages,
+                # Shards are intermediate; the merge writes the requested formats
+                "formats": ["jsonl"],
+                "base_name": f"amazon_reviews_{{star}}star_{shard_id}",
+            }, job_id=shard_id)
+            shards.append(shard_id)
+        parent = JobJournal.create({
+            "product_links": product_links,
+            "stars": stars,
+            "pages": args.pages,
+            "formats": parse_formats(args.formats),
+            "base_name": f"amazon_reviews_{{star}}star_{timestamp}",
+            "shards": shards,
+        }, job_id=timestamp)
+        print(f"任务 ID: {parent.job_id} (中断后可用 --resume {parent.job_id} 继续)")
+
+    shards = parent.params["shards"]
+    if sessions is not None and len(accounts) < len(shards):
+        print(f"{len(shards)} 个分片需要至少 {len(shards)} 个可用账号，当前只有 {len(accounts)} 个。")
+        return
+    print(f"{len(parent.params['product_links'])} 个产品分给 {len(shards)} 个工作进程 ...")
+    # spawn: no Playwright or SQLite state is inherited from this process
+    mp = multiprocessing.get_context("spawn")
+    procs = [
+        (shard_id, mp.Process(
+            target=_run_shard, args=(args, shard_id, len(shards), accounts[k::len(shards)] if sessions is not None else None), name=shard_id,
+        ))
+        for k, shard_id in enumerate(shards)
+    ]
+    for _, proc in procs:
+        proc.start()
+    failed = []
+    for shard_id, proc in procs:
+        proc.join()
+        if proc.exitcode != 0:
+            failed.append(shard_id)
+            print(f"[{shard_id}] 工作进程异常退出(退出码 {proc.exitcode})，已保存的评论仍会合并")
+    _merge_shards(parent)
+    if failed:
+        print(f"{len(failed)} 个分片未完成；用 --resume {parent.job_id} 补抓后会重新合并")
+
+
+def _merge_shards(parent: JobJournal) -> None:
+    params = parent.params
+    order = {link: idx for idx, link in enumerate(params["product_links"], 1)}
+    shard_names = [JobJournal.load(shard_id).params["base_name"] for shard_id in params["shards"]]
+    outputs: List[str] = []
+    total = duplicates = 0
+    for star in params["stars"]:
+        seen: Set[Tuple[str, str]] = set()
+        rows: List[Dict] = []
+        for base_name in shard_names:
+            path = OUTPUT_DIR / (base_name.format(star=star) + ".jsonl")
+            if not path.exists():
+                continue
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crashed worker
+                # A resumed shard may write a page again that it had not journaled yet
+                key = (row.get("asin"), review_fingerprint(row))
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                # Shards number their own products from 1
+                row["product_index"] = order.get(row.get("product_url"), row.get("product_index"))
+                rows.append(row)
+        rows.sort(key=lambda r: r.get("product_index") or 0)
+        with open_review_sinks(params["base_name"].format(star=star), formats=params["formats"]) as sink:
+            sink.write_rows(rows)
+            outputs.extend(str(p) for p in sink.paths)
+        total += len(rows)
+    # Every star's Parquet sink reports the same dataset directory
+    paths = "\n".join(dict.fromkeys(outputs))
+    print(f"合并完成: {paths}\n共 {total} 条评论，去重 {duplicates} 条")
 
 
 def main():
@@ -69,17 +633,70 @@ def main():
     parser.add_argument("--login", action="store_true", help="Interactive login and save storage state")
     parser.add_argument("--headless", action="store_true", help="Run browser headless (default off)")
     parser.add_argument("--urls", type=str, default=None, help="Comma-separated product detail or review URLs to scrape directly")
+    parser.add_argument("--stars", type=str, default=None, help="Stars to crawl without prompting, e.g. 5, 1,2,5 or all; several stars share one pass over the combined listing")
     parser.add_argument("--pages", type=int, default=2, help="Number of review pages per product")
     parser.add_argument("--limit", type=int, default=3, help="Max number of products to scrape")
+    parser.add_argument("--concurrency", type=int, default=1, help="Scrape up to N products at once with the async engine")
+    parser.add_argument("--workers", type=int, default=1, help="Split the products across N worker processes, each with its own browser and output shard; shards are merged and de-duplicated at the end")
+    parser.add_argument("--per-host", type=int, default=None, help="Max concurrent products per Amazon host (default: --concurrency)")
+    parser.add_argument("--http", action="store_true", help="Fetch review pages over plain HTTP with saved cookies; fall back to the browser on a block")
+    parser.add_argument("--scroll-ceiling", type=float, default=SCROLL_CEILING, help="Max seconds to wait for the review list to stop growing per page")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse captured review pages on N threads while the browser loads the next page (sequential browser mode)")
+    parser.add_argument("--page-fanout", type=int, default=1, help="Fetch up to N review pages of a product at once once its review total is known (AJAX endpoint in the browser, plain GETs with --http)")
+    parser.add_argument("--rate", type=float, default=1.0, help="Starting requests per second per Amazon host; adapts to blocks (0 disables rate control)")
+    parser.add_argument("--max-rate", type=float, default=5.0, help="Upper bound for the adaptive per-host request rate")
+    parser.add_argument("--block", type=str, default=None, help="Abort these request kinds in crawl contexts, e.g. images,fonts,media,stylesheets,ads,third-party")
+    parser.add_argument("--cache", action="store_true", help="Cache product, review and AJAX responses on disk (http_cache/)")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="Treat cached responses older than N seconds as stale")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Evict least recently used cache entries above this size")
+    parser.add_argument("--replay", action="store_true", help="Run entirely from the cache with zero network access")
+    parser.add_argument("--archive", action="store_true", help="Keep every fetched review page and AJAX payload in archive/ for python reparse.py")
+    parser.add_argument("--incremental", action="store_true", help="Only emit reviews not seen in earlier runs; stop paginating at the first fully known page")
+    parser.add_argument("--index", type=str, default=None, help="Review index database for --incremental (default: review_index.sqlite)")
+    parser.add_argument("--formats", type=str, default="jsonl,csv", help="Comma-separated output formats: jsonl, csv, parquet")
+    parser.add_argument("--jobs", type=str, default=None, metavar="MANIFEST", help="Run every job in a JSONL manifest unattended (keyword or urls, stars, pages, limit per line)")
+    parser.add_argument("--resume", type=str, default=None, metavar="JOB_ID", help="Resume an interrupted job; skips finished products and pages")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve live Prometheus metrics on http://127.0.0.1:PORT/metrics during the run")
+    parser.add_argument("--session", type=str, default=None, metavar="NAME", help="With --login, save the login as sessions/NAME.json for --sessions")
+    parser.add_argument("--sessions", action="store_true", help="Spread work over every saved login (sessions/*.json and storage_state.json); blocked accounts cool down")
+    parser.add_argument("--check-sessions", action="store_true", help="Check each saved login for sign-in and CSRF cookies, then exit")
+    parser.add_argument("--recycle-after", type=int, default=20, help="Recycle the shared browser context after N pages")
     args = parser.parse_args()
 
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    sessions = SessionPool() if args.sessions or args.check_sessions else None
+
     if args.login:
-        run_login(headless=args.headless)
+        run_login(headless=args.headless, session=args.session)
+    elif args.check_sessions:
+        run_check_sessions(sessions)
     else:
-        if not STORAGE_STATE_PATH.exists():
+        if sessions is not None and not sessions.healthy():
+            run_check_sessions(sessions)
+            print("没有可用的账号。请用 --login --session 名称 登录。")
+            return
+        if sessions is None and not STORAGE_STATE_PATH.exists() and not args.replay:
             print("尚未登录。将先打开登录流程。")
             run_login(headless=args.headless)
-        run_scrape_interactive(headless=args.headless, urls_arg=args.urls, pages=args.pages, limit=args.limit)
+        if args.jobs:
+            run_batch(
+                Path(args.jobs), headless=args.headless, pages=args.pages, limit=args.limit, recycle_after=args.recycle_after,
+                concurrency=args.concurrency, per_host=args.per_host, use_http=args.http,
+                scroll_ceiling=args.scroll_ceiling, block=args.block, formats=parse_formats(args.formats),
+                parse_workers=args.parse_workers, page_fanout=args.page_fanout, **_runtime(args, sessions=sessions),
+            )
+            return
+        if args.workers > 1 or (args.resume and _is_sharded(args.resume)):
+            run_sharded(args, args.workers, sessions)
+            return
+        run_scrape_interactive(
+            headless=args.headless, urls_arg=args.urls, pages=args.pages, limit=args.limit, recycle_after=args.recycle_after,
+            concurrency=args.concurrency, per_host=args.per_host, use_http=args.http,
+            scroll_ceiling=args.scroll_ceiling, block=args.block, formats=parse_formats(args.formats),
+            resume=args.resume, stars_arg=args.stars, parse_workers=args.parse_workers,
+            page_fanout=args.page_fanout, **_runtime(args, sessions=sessions),
+        )
 
 
 if __name__ == "__main__":
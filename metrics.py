@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import heapq
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PROMETHEUS_PREFIX = "amazon_crawler"
+QUANTILES = [0.5, 0.95]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(round(q * (len(sorted_values) - 1)))]
+
+
+class Metrics:
+    """In-process timers and counters for one run.
+
+    Timer samples are kept per stage (reservoir-sampled above
+    ``max_samples``) for percentiles; totals, per-ASIN time and the slowest
+    samples with their ASIN and page are kept exactly.
+    """
+
+    def __init__(self, max_samples: int = 50000, slowest: int = 20) -> None:
+        self.max_samples = max_samples
+        self.slowest_kept = slowest
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self._started_perf = time.perf_counter()
+            self._samples: Dict[str, List[float]] = {}
+            self._totals: Dict[str, List[float]] = {}
+            self._counters: Dict[str, float] = {}
+            self._by_asin: Dict[str, Dict[str, float]] = {}
+            self._slowest: List[Tuple[float, int, str, Optional[str], Optional[int]]] = []
+            self._seq = 0
+
+    def observe(self, stage: str, seconds: float, asin: Optional[str] = None, page: Optional[int] = None) -> None:
+        with self._lock:
+            total = self._totals.setdefault(stage, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+            total[2] = max(total[2], seconds)
+            samples = self._samples.setdefault(stage, [])
+            if len(samples) < self.max_samples:
+                samples.append(seconds)
+            else:
+                slot = random.randrange(int(total[0]))
+                if slot < self.max_samples:
+                    samples[slot] = seconds
+            if asin:
+                per = self._by_asin.setdefault(asin, {})
+                per[stage] = per.get(stage, 0.0) + seconds
+            self._seq += 1
+            entry = (seconds, self._seq, stage, asin, page)
+            if len(self._slowest) < self.slowest_kept:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @contextmanager
+    def timer(self, stage: str, asin: Optional[str] = None, page: Optional[int] = None) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, asin=asin, page=page)
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = [(stage, list(self._samples.get(stage, [])), list(total)) for stage, total in self._totals.items()]
+        stats: Dict[str, Dict[str, float]] = {}
+        for stage, samples, (n, total, peak) in sorted(items):
+            samples.sort()
+            stats[stage] = {
+                "count": int(n),
+                "total": round(total, 4),
+                "p50": round(_percentile(samples, 0.5), 4),
+                "p95": round(_percentile(samples, 0.95), 4),
+                "max": round(peak, 4),
+            }
+        return stats
+
+    def report(self) -> Dict[str, Any]:
+        duration = time.perf_counter() - self._started_perf
+        stages = self.stage_stats()
+        with self._lock:
+            counters = dict(self._counters)
+            by_asin = {asin: {k: round(v, 3) for k, v in per.items()} for asin, per in self._by_asin.items()}
+            slowest = sorted(self._slowest, reverse=True)
+        pages = counters.get("pages", 0)
+        return {
+            "started": self.started,
+            "duration_s": round(duration, 3),
+            "pages": int(pages),
+            "reviews": int(counters.get("reviews", 0)),
+            "pages_per_sec": round(pages / duration, 4) if duration > 0 else 0.0,
+            "stages": stages,
+            "fallbacks": {k.split(".", 1)[1]: int(v) for k, v in counters.items() if k.startswith("fallback.")},
+            "bytes": {k.split(".", 1)[1]: int(v) for k, v in counters.items() if k.startswith("bytes.")},
+            "counters": counters,
+            "by_asin": by_asin,
+            "slowest": [{"stage": s, "seconds": round(sec, 4), "asin": a, "page": p} for sec, _, s, a, p in slowest],
+        }
+
+    def write_report(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+        name = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {name} summary")
+        for stage, s in self.stage_stats().items():
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {s["p50" if q == 0.5 else "p95"]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {s["total"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {s["count"]}')
+        with self._lock:
+            counters = sorted(self._counters.items())
+        for key, value in counters:
+            metric = f"{PROMETHEUS_PREFIX}_{key.replace('.', '_').replace('-', '_')}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Expose ``/metrics`` in Prometheus text format from a daemon thread."""
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server
+
+
+# Process-wide registry used by the crawl engines
+METRICS = Metrics()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils import ROOT_DIR
+
+
+ARCHIVE_DIR = ROOT_DIR / "archive"
+# A segment is closed and a new one started past this size
+SEGMENT_BYTES = 64 * 1024 * 1024
+
+KIND_PAGE = "page"
+KIND_AJAX = "ajax"
+
+
+class ArchivedPage(NamedTuple):
+    id: int
+    kind: str
+    host: str
+    asin: str
+    star: int
+    page: int
+    url: str
+    status: Optional[int]
+    fetched: float
+    segment: str
+    offset: int
+    length: int
+
+
+def read_record(path: Path, offset: int, length: int) -> Tuple[Dict[str, Any], str]:
+    """(header, body) of the record at ``offset`` in a segment file."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = zlib.decompress(f.read(length)).decode("utf-8")
+    header, _, body = data.partition("\n")
+    return json.loads(header), body
+
+
+class PageArchive:
+    """Append-only archive of raw review pages and AJAX payloads, for re-parsing offline.
+
+    Every record is compressed on its own and appended to a segment file in
+    ``segments/``; a record starts with a JSON header line, so a segment can be
+    read without the index. ``index.sqlite`` maps (ASIN, star, page) to segment
+    offsets. Each process writes its own segments, so worker processes can
+    share one archive. Nothing is overwritten: fetching a page again adds a
+    newer record.
+    """
+
+    def __init__(self, root: Path = ARCHIVE_DIR, segment_bytes: int = SEGMENT_BYTES) -> None:
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+        self.records = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._segment: Optional[Path] = None
+        self._f = None
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30.0, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " id INTEGER PRIMARY KEY, kind TEXT, host TEXT, asin TEXT, star INTEGER, page INTEGER,"
+            " url TEXT, status INTEGER, blocked INTEGER, fetched REAL, segment TEXT, offset INTEGER, length INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_key ON pages (asin, star, page)")
+        self._db.commit()
+
+    def _open_segment(self) -> None:
+        if self._f is not None:
+            self._f.close()
+        stamp = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        n = 0
+        while True:
+            self._segment = self.root / "segments" / f"{stamp}_{n:03d}.seg"
+            try:
+                # Exclusive create: offsets are only right if nobody else appends to the file
+                self._f = open(self._segment, "xb")
+                return
+            except FileExistsError:
+                n += 1
+
+    def put(
+        self,
+        kind: str,
+        host: str,
+        asin: str,
+        star: int,
+        page: int,
+        url: str,
+        text: str,
+        status: Optional[int] = None,
+        blocked: bool = False,
+    ) -> None:
+        fetched = time.time()
+        header = {"kind": kind, "host": host, "asin": asin, "star": star, "page": page, "url": url,
+                  "status": status, "blocked": blocked, "fetched": fetched}
+        data = zlib.compress((json.dumps(header, ensure_ascii=False) + "\n" + text).encode("utf-8"), 6)
+        with self._lock:
+            if self._f is None or self._f.tell() >= self.segment_bytes:
+                self._open_segment()
+            offset = self._f.tell()
+            self._f.write(data)
+            self._f.flush()
+            self._db.execute(
+                "INSERT INTO pages (kind, host, asin, star, page, url, status, blocked, fetched, segment, offset, length)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, host, asin, star, page, url, status, int(blocked), fetched, self._segment.name, offset, len(data)),
+            )
+            self._db.commit()
+            self.records += 1
+            self.bytes += len(data)
+
+    def latest(self, asins: Optional[Iterable[str]] = None, stars: Optional[Iterable[int]] = None) -> List[ArchivedPage]:
+        """Newest unblocked record per (kind, host, ASIN, star, page), in (ASIN, star, page) order."""
+        where, params = ["blocked = 0"], []
+        for column, values in (("asin", asins), ("star", stars)):
+            if values is not None:
+                values = list(values)
+                where.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        with self._lock:
+            found = self._db.execute(
+                "SELECT id, kind, host, asin, star, page, url, status, fetched, segment, offset, length FROM pages"
+                f" WHERE id IN (SELECT MAX(id) FROM pages WHERE {' AND '.join(where)} GROUP BY kind, host, asin, star, page)"
+                " ORDER BY asin, star, page, kind",
+                params,
+            ).fetchall()
+        return [ArchivedPage(*row) for row in found]
+
+    def segment_path(self, record: ArchivedPage) -> Path:
+        return self.root / "segments" / record.segment
+
+    def read(self, record: ArchivedPage) -> str:
+        return read_record(self.segment_path(record), record.offset, record.length)[1]
+
+    def summary(self) -> str:
+        return f"{self.records} records archived ({self.bytes / 1024 / 1024:.1f} MB compressed)"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+            self._db.close()
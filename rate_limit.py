@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import METRICS
+
+
+class _HostBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.requests = 0
+        self.blocks = 0
+
+
+class HostRateLimiter:
+    """Token bucket per marketplace host with AIMD rate control.
+
+    Every success raises the host's rate by ``increase`` requests/s up to
+    ``max_rate``. Every block or captcha multiplies it by ``decrease`` (not
+    below ``min_rate``) and pauses the host for a jittered exponential backoff.
+    Safe to share between threads and asyncio tasks.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        min_rate: float = 0.1,
+        max_rate: float = 5.0,
+        burst: float = 2.0,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        backoff_base: float = 5.0,
+        backoff_max: float = 120.0,
+    ) -> None:
+        self.initial_rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _HostBucket] = {}
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.initial_rate, self.burst)
+        return bucket
+
+    def _reserve(self, host: str) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            b = self._bucket(host)
+            now = time.monotonic()
+            b.tokens = min(self.burst, b.tokens + (now - b.updated) * b.rate)
+            b.updated = now
+            b.tokens -= 1
+            b.requests += 1
+            wait = -b.tokens / b.rate if b.tokens < 0 else 0.0
+            return max(wait, b.backoff_until - now)
+
+    def acquire(self, host: str) -> None:
+        wait = self._reserve(host)
+        if wait > 0:
+            METRICS.observe("rate_limit_wait", wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, host: str) -> None:
+        wait = self._reserve(host)
+        if wait > 0:
+            METRICS.observe("rate_limit_wait", wait)
+            await asyncio.sleep(wait)
+
+    def success(self, host: str) -> None:
+        with self._lock:
+            b = self._bucket(host)
+            b.failures = 0
+            b.rate = min(self.max_rate, b.rate + self.increase)
+
+    def blocked(self, host: str) -> float:
+        """Record a block; returns the backoff in seconds."""
+        with self._lock:
+            b = self._bucket(host)
+            b.blocks += 1
+            b.failures += 1
+            b.rate = max(self.min_rate, b.rate * self.decrease)
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (b.failures - 1))
+            delay = random.uniform(delay / 2, delay)
+            b.backoff_until = max(b.backoff_until, time.monotonic() + delay)
+            b.tokens = min(b.tokens, 0.0)
+            return delay
+
+    def observe(self, host: str, blocked: bool) -> Optional[float]:
+        if blocked:
+            return self.blocked(host)
+        self.success(host)
+        return None
+
+    def rate(self, host: str) -> float:
+        with self._lock:
+            return self._bucket(host).rate
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = [
+                f"{host}: {b.rate:.2f} req/s, {b.requests} requests, {b.blocks} blocks"
+                for host, b in sorted(self._buckets.items())
+            ]
+        return "; ".join(parts) or "no requests"
@@ -0,0 +1,93 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils import bucket_by_star, open_review_sinks, parse_formats, parse_star_list, review_fingerprint, sink_paths
+from amazon_reviews import ALL_STARS, _parse_ajax_response_text, _parse_reviews_from_page_html
+from page_archive import ARCHIVE_DIR, KIND_AJAX, PageArchive, read_record
+
+
+def _parse_record(task: Tuple[str, int, int, str]) -> List[Dict]:
+    """Worker process: read one archived record and run the current parsers over it."""
+    path, offset, length, kind = task
+    _, text = read_record(Path(path), offset, length)
+    if kind == KIND_AJAX:
+        return _parse_ajax_response_text(text)
+    return _parse_reviews_from_page_html(text)
+
+
+def run_reparse(
+    archive: PageArchive,
+    stars: List[int],
+    asins: Optional[List[str]],
+    workers: int,
+    formats: List[str],
+) -> None:
+    # Combined-listing pages hold every star; they are bucketed like a live crawl does
+    records = archive.latest(asins=asins, stars=[ALL_STARS, *stars])
+    if not records:
+        print("归档中没有匹配的页面。")
+        return
+    product_index = {asin: idx for idx, asin in enumerate(sorted({r.asin for r in records}), 1)}
+    workers = workers or os.cpu_count() or 1
+    tasks = [(str(archive.segment_path(r)), r.offset, r.length, r.kind) for r in records]
+    print(f"重新解析 {len(records)} 个归档页面({len(product_index)} 个产品)，进程数: {workers} ...")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    started = time.monotonic()
+    with ExitStack() as stack, ProcessPoolExecutor(max_workers=workers) as executor:
+        sinks = {
+            star: stack.enter_context(open_review_sinks(f"reparsed_{star}star_{timestamp}", formats=formats))
+            for star in stars
+        }
+        seen: Dict[Tuple[str, int], Set[str]] = {}
+        # Records come back in (ASIN, star, page) order, so each product's rows stay together in page order
+        chunksize = max(1, len(tasks) // (workers * 4))
+        for record, rows in zip(records, executor.map(_parse_record, tasks, chunksize=chunksize)):
+            buckets = bucket_by_star(rows, stars) if record.star == ALL_STARS else {record.star: rows}
+            for star, bucket in buckets.items():
+                fingerprints = seen.setdefault((record.asin, star), set())
+                fresh: List[Dict] = []
+                for r in bucket:
+                    fp = review_fingerprint(r)
+                    if fp in fingerprints:
+                        continue
+                    fingerprints.add(fp)
+                    r["product_index"] = product_index[record.asin]
+                    r["product_url"] = f"https://{record.host}/dp/{record.asin}"
+                    r["asin"] = record.asin
+                    r["star"] = star
+                    fresh.append(r)
+                sinks[star].write_rows(fresh)
+        elapsed = time.monotonic() - started
+        outputs = sink_paths(sinks.values())
+        counts = "，".join(f"{star} 星 {sink.count} 条" for star, sink in sinks.items())
+    print(f"解析完成: {len(records)} 页用时 {elapsed:.1f}s ({len(records) / max(elapsed, 1e-9):.0f} 页/秒)")
+    print(f"各星级: {counts}")
+    print("已保存:\n" + "\n".join(outputs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run the review parsers over archived pages (main.py --archive) without touching the network")
+    parser.add_argument("--stars", type=str, default="all", help="Stars to write, e.g. 5, 1,2,5 or all")
+    parser.add_argument("--asins", type=str, default=None, help="Comma-separated ASINs (default: every archived product)")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (default: one per core)")
+    parser.add_argument("--formats", type=str, default="jsonl,csv", help="Comma-separated output formats: jsonl, csv, parquet")
+    parser.add_argument("--archive-dir", type=str, default=str(ARCHIVE_DIR), help="Archive to read (default: archive/)")
+    args = parser.parse_args()
+
+    asins = [a.strip() for a in args.asins.split(",") if a.strip()] if args.asins else None
+    archive = PageArchive(Path(args.archive_dir))
+    try:
+        run_reparse(archive, parse_star_list(args.stars), asins, args.workers, parse_formats(args.formats))
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+
+# Playwright resource types aborted by each --block category
+RESOURCE_CATEGORIES = {
+    "images": {"image"},
+    "fonts": {"font"},
+    "media": {"media"},
+    "stylesheets": {"stylesheet"},
+}
+HOST_CATEGORIES = {"third-party", "ads"}
+CATEGORIES = set(RESOURCE_CATEGORIES) | HOST_CATEGORIES
+
+FIRST_PARTY_HOST_MARKERS = ["amazon.", "media-amazon.com", "ssl-images-amazon.com", "images-amazon.com"]
+AD_HOST_MARKERS = [
+    "amazon-adsystem.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "fls-na.amazon.",
+    "fls-eu.amazon.",
+    "unagi.amazon.",
+    "unagi-na.amazon.",
+    "aax-us-east.amazon-adsystem.com",
+]
+AD_PATH_MARKERS = ["/gp/ad/", "/1/batch/", "/uedata", "/csm/"]
+
+# Rough transfer sizes used to estimate bytes saved; aborted requests never
+# report their real size.
+ESTIMATED_BYTES = {
+    "image": 20_000,
+    "font": 40_000,
+    "media": 400_000,
+    "stylesheet": 30_000,
+    "script": 40_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+# Never aborted: the page itself and the review XHRs we parse
+NEVER_BLOCK_TYPES = {"document"}
+
+
+def _is_first_party(host: str) -> bool:
+    return any(marker in host for marker in FIRST_PARTY_HOST_MARKERS)
+
+
+def _is_ad_or_tracker(host: str, path: str) -> bool:
+    return any(marker in host for marker in AD_HOST_MARKERS) or any(path.startswith(m) for m in AD_PATH_MARKERS)
+
+
+class ResourceBlocker:
+    """Context route handler that aborts requests the crawler never needs."""
+
+    def __init__(self, categories: Iterable[str]) -> None:
+        self.categories = {c.strip().lower() for c in categories if c and c.strip()}
+        unknown = self.categories - CATEGORIES
+        if unknown:
+            raise ValueError(f"unknown block categories: {', '.join(sorted(unknown))} (choose from {', '.join(sorted(CATEGORIES))})")
+        self._types = set().union(*[RESOURCE_CATEGORIES[c] for c in self.categories if c in RESOURCE_CATEGORIES])
+        self.blocked_requests: Dict[str, int] = {}
+        self.bytes_saved = 0
+        self.allowed_requests = 0
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> Optional["ResourceBlocker"]:
+        if not spec:
+            return None
+        return cls(spec.split(","))
+
+    def category_for(self, url: str, resource_type: str) -> Optional[str]:
+        if resource_type in NEVER_BLOCK_TYPES:
+            return None
+        parsed = urlparse(url)
+        host = parsed.hostname or ""
+        if "ads" in self.categories and _is_ad_or_tracker(host, parsed.path):
+            return "ads"
+        if resource_type in self._types:
+            return next(c for c in self.categories if resource_type in RESOURCE_CATEGORIES.get(c, ()))
+        if "third-party" in self.categories and not _is_first_party(host):
+            return "third-party"
+        return None
+
+    def _record(self, category: Optional[str], resource_type: str) -> bool:
+        if category is None:
+            self.allowed_requests += 1
+            return False
+        self.blocked_requests[category] = self.blocked_requests.get(category, 0) + 1
+        self.bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        return True
+
+    def handle(self, route) -> None:
+        req = route.request
+        if self._record(self.category_for(req.url, req.resource_type), req.resource_type):
+            route.abort()
+        else:
+            route.fallback()
+
+    async def handle_async(self, route) -> None:
+        req = route.request
+        if self._record(self.category_for(req.url, req.resource_type), req.resource_type):
+            await route.abort()
+        else:
+            await route.fallback()
+
+    def install(self, context) -> None:
+        context.route("**/*", self.handle)
+
+    async def install_async(self, context) -> None:
+        await context.route("**/*", self.handle_async)
+
+    def summary(self) -> str:
+        total = sum(self.blocked_requests.values())
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(self.blocked_requests.items()))
+        return f"blocked {total} requests ({detail or 'none'}), ~{self.bytes_saved / 1_000_000:.1f} MB saved, {self.allowed_requests} allowed"
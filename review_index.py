@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from utils import ROOT_DIR, review_fingerprint
+
+
+INDEX_PATH = ROOT_DIR / "review_index.sqlite"
+
+
+class ReviewIndex:
+    """Persistent set of review fingerprints seen per (ASIN, star).
+
+    Review lists are crawled with ``sortBy=recent``, so once a page holds only
+    known reviews every later page is known as well.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            " asin TEXT, star INTEGER, fingerprint TEXT, first_seen REAL,"
+            " PRIMARY KEY (asin, star, fingerprint))"
+        )
+        self._db.commit()
+
+    def filter_new(self, asin: str, star: int, rows: List[Dict], record: bool = True) -> List[Dict]:
+        """Return only the rows not seen before, in order; optionally record them."""
+        if not rows:
+            return []
+        fps = [review_fingerprint(r) for r in rows]
+        with self._lock:
+            placeholders = ",".join("?" * len(fps))
+            known = {
+                fp for (fp,) in self._db.execute(
+                    f"SELECT fingerprint FROM reviews WHERE asin = ? AND star = ? AND fingerprint IN ({placeholders})",
+                    [asin, star, *fps],
+                )
+            }
+            new_rows: List[Dict] = []
+            now = time.time()
+            for fp, row in zip(fps, rows):
+                if fp in known:
+                    continue
+                known.add(fp)
+                new_rows.append(row)
+                if record:
+                    self._db.execute("INSERT INTO reviews (asin, star, fingerprint, first_seen) VALUES (?, ?, ?, ?)", (asin, star, fp, now))
+            self._db.commit()
+        return new_rows
+
+    def record(self, asin: str, star: int, rows: List[Dict]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO reviews (asin, star, fingerprint, first_seen) VALUES (?, ?, ?, ?)",
+                [(asin, star, review_fingerprint(r), now) for r in rows],
+            )
+            self._db.commit()
+
+    def count(self, asin: str, star: int) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM reviews WHERE asin = ? AND star = ?", (asin, star)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
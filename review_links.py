@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from utils import ROOT_DIR
+
+
+LINKS_PATH = ROOT_DIR / "review_links.sqlite"
+
+
+class ReviewLinkMap:
+    """Persistent (host, ASIN) → reviews URL for products whose reviews live elsewhere.
+
+    Only exceptions are stored: for almost every product the reviews URL is
+    ``_reviews_url_from_asin(host, asin)`` and no entry is needed.
+    """
+
+    def __init__(self, path: Path = LINKS_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            " host TEXT, asin TEXT, url TEXT, updated REAL,"
+            " PRIMARY KEY (host, asin))"
+        )
+        self._db.commit()
+
+    def get(self, host: str, asin: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT url FROM links WHERE host = ? AND asin = ?", (host, asin)).fetchone()
+        return row[0] if row else None
+
+    def put(self, host: str, asin: str, url: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO links (host, asin, url, updated) VALUES (?, ?, ?, ?)",
+                (host, asin, url, time.time()),
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
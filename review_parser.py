@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import soupsieve as sv
+from bs4 import BeautifulSoup
+
+
+# Compiled parsers first; html.parser is always available as the last resort
+BACKENDS = ["lxml", "html.parser"]
+
+REVIEW_ITEMS = sv.compile('div[data-hook="review"], #cm_cr-review_list div.review, div.a-section.review')
+REVIEW_BODY_TEXTS = sv.compile('span[data-hook="review-body"] span, span[data-hook="review-body"], .review-text-content span')
+REVIEW_BODY = sv.compile('span[data-hook="review-body"]')
+RATING = sv.compile('i[data-hook="review-star-rating"] span, i[data-hook="cmps-review-star-rating"] span, span.a-icon-alt')
+DATE = sv.compile('span[data-hook="review-date"], .review-date')
+AUTHOR_PREFERRED = sv.compile('.a-profile-content .a-profile-name')
+AUTHOR_CHAIN = [sv.compile(sel) for sel in ['span.a-profile-name', 'span[data-hook="review-author"]', 'a[data-hook="review-author"]']]
+AUTHOR_ANY = sv.compile('.a-profile-content .a-profile-name, span.a-profile-name, span[data-hook="review-author"], a[data-hook="review-author"]')
+
+DATE_RE = re.compile(r'(Reviewed[^\n]* on [^\n]+)|(\b\d{4}[-/年].{0,8}?\d{1,2}[-/月].{0,8}?\d{1,2}日?\b)')
+
+
+def available_backends() -> List[str]:
+    found = []
+    for name in BACKENDS:
+        try:
+            BeautifulSoup("<p></p>", name)
+        except Exception:
+            continue
+        found.append(name)
+    return found
+
+
+_DEFAULT_BACKEND: Optional[str] = None
+
+
+def default_backend() -> str:
+    global _DEFAULT_BACKEND
+    if _DEFAULT_BACKEND is None:
+        _DEFAULT_BACKEND = available_backends()[0]
+    return _DEFAULT_BACKEND
+
+
+def _is_date(tag) -> bool:
+    return tag.name == 'span' and (tag.get('data-hook') == 'review-date' or 'review-date' in tag.get('class', []))
+
+
+def _is_author(tag) -> bool:
+    return tag.name in ('span', 'a') and ('a-profile-name' in tag.get('class', []) or tag.get('data-hook') == 'review-author')
+
+
+def _is_review_container(tag) -> bool:
+    if tag.name == 'div' and 'review' in ' '.join(tag.get('class', [])):
+        return True
+    return tag.has_attr('data-hook') and 'review' in tag['data-hook']
+
+
+class _DocumentIndex:
+    """Document-order positions of every tag, built once per page.
+
+    Replaces ``find_previous(lambda ...)`` scans: the nearest preceding date or
+    author element is a bisect into the sorted positions of those elements.
+    """
+
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self._position: Dict[int, int] = {}
+        self._dates: List[int] = []
+        self._date_tags: List = []
+        self._authors: List[int] = []
+        self._author_tags: List = []
+        for pos, tag in enumerate(soup.find_all(True)):
+            self._position[id(tag)] = pos
+            if _is_date(tag):
+                self._dates.append(pos)
+                self._date_tags.append(tag)
+            if _is_author(tag):
+                self._authors.append(pos)
+                self._author_tags.append(tag)
+
+    def _preceding(self, node, positions: List[int], tags: List):
+        pos = self._position.get(id(node))
+        if pos is None:
+            return None
+        i = bisect_left(positions, pos) - 1
+        return tags[i] if i >= 0 else None
+
+    def preceding_date(self, node):
+        return self._preceding(node, self._dates, self._date_tags)
+
+    def preceding_author(self, node):
+        return self._preceding(node, self._authors, self._author_tags)
+
+
+class _ReviewDocument:
+    def __init__(self, html_text: str, backend: str) -> None:
+        self.soup = BeautifulSoup(html_text, backend)
+        self._index: Optional[_DocumentIndex] = None
+
+    @property
+    def index(self) -> _DocumentIndex:
+        if self._index is None:
+            self._index = _DocumentIndex(self.soup)
+        return self._index
+
+    def date_text(self, node) -> str:
+        el = DATE.select_one(node)
+        if el:
+            return el.get_text(strip=True)
+        prev = self.index.preceding_date(node)
+        if prev:
+            return prev.get_text(strip=True)
+        m = DATE_RE.search(node.get_text("\n", strip=True))
+        return m.group(0) if m else ""
+
+    def author_text(self, node) -> str:
+        el = AUTHOR_PREFERRED.select_one(node)
+        if el:
+            return el.get_text(strip=True)
+        for pattern in AUTHOR_CHAIN:
+            el = pattern.select_one(node)
+            if el:
+                return el.get_text(strip=True)
+        prev = self.index.preceding_author(node)
+        return prev.get_text(strip=True) if prev else ""
+
+    def parse_items(self) -> List[Dict]:
+        results: List[Dict] = []
+        for node in REVIEW_ITEMS.select(self.soup):
+            body_texts = [t.get_text(strip=True) for t in REVIEW_BODY_TEXTS.select(node)]
+            content_text = "\n".join([t for t in body_texts if t])
+            rating_el = RATING.select_one(node)
+            rating_text = rating_el.get_text(strip=True) if rating_el else ""
+            nickname = self.author_text(node)
+            date_text = self.date_text(node)
+            if not (content_text or rating_text or nickname or date_text):
+                continue
+            results.append({
+                "review_content": content_text,
+                "review_rating_text": rating_text,
+                "review_date": date_text,
+                "reviewer": nickname,
+            })
+        return results
+
+    def parse_bodies(self) -> List[Dict]:
+        # Fallback: scan standalone bodies when container markup differs
+        results: List[Dict] = []
+        for body in REVIEW_BODY.select(self.soup):
+            content_text = body.get_text("\n", strip=True)
+            if not content_text:
+                continue
+            anc = body.find_parent(_is_review_container)
+            search_base = anc if anc else body
+            rt = RATING.select_one(search_base)
+            dt = DATE.select_one(search_base)
+            if dt:
+                date_text = dt.get_text(strip=True)
+            else:
+                prev_dt = self.index.preceding_date(search_base)
+                date_text = prev_dt.get_text(strip=True) if prev_dt else ""
+            au = AUTHOR_ANY.select_one(search_base)
+            if not au:
+                au = self.index.preceding_author(search_base)
+            results.append({
+                "review_content": content_text,
+                "review_rating_text": rt.get_text(strip=True) if rt else "",
+                "review_date": date_text,
+                "reviewer": au.get_text(strip=True) if au else "",
+            })
+        return results
+
+
+def parse_reviews_html(html_text: str, backend: Optional[str] = None) -> List[Dict]:
+    """Parse review rows out of a full review page or an AJAX HTML fragment."""
+    doc = _ReviewDocument(html_text, backend or default_backend())
+    return doc.parse_items() or doc.parse_bodies()
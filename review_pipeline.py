@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from amazon_reviews import (
+    SCROLL_CEILING,
+    BlockedError,
+    PageCallback,
+    _ProductCrawl,
+    _apply_star_filter_query,
+    _blocked,
+    _classify_page,
+    _click_star_filter_if_present,
+    _dismiss_overlays,
+    _extract_host_and_asin,
+    _fetch_reviews_via_ajax,
+    _direct_reviews_url,
+    _navigate,
+    _open_reviews_page,
+    _parse_reviews_from_page_html,
+    _scroll_until_stable,
+)
+from browser_pool import BrowserPool
+from metrics import METRICS
+from page_archive import KIND_PAGE
+from review_index import ReviewIndex
+
+
+STAGES = ["fetch", "settle", "capture", "parse", "wait", "deliver"]
+
+
+class StageTimings:
+    """Thread-safe wall-clock totals per pipeline stage.
+
+    ``fetch``/``settle``/``capture`` run on the browser thread, ``parse`` on
+    the workers, ``wait`` is the browser thread blocked on a parse result and
+    ``deliver`` covers the AJAX fallback, index filter and ``on_page``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        METRICS.observe(f"pipeline_{stage}", seconds)
+        with self._lock:
+            stat = self._stats.setdefault(stage, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"count": int(n), "total": round(total, 3), "max": round(peak, 3)}
+                for stage, (n, total, peak) in self._stats.items()
+            }
+
+    def bottleneck(self) -> Optional[str]:
+        totals = self.totals()
+        return max(totals, key=lambda s: totals[s]["total"]) if totals else None
+
+    def summary(self) -> str:
+        totals = self.totals()
+        order = [s for s in STAGES if s in totals] + sorted(s for s in totals if s not in STAGES)
+        parts = [f"{s} {totals[s]['count']}x {totals[s]['total']:.2f}s (max {totals[s]['max']:.2f}s)" for s in order]
+        return ", ".join(parts) + (f"; bottleneck: {self.bottleneck()}" if totals else "")
+
+
+def _timed_parse(timings: StageTimings, html: str) -> List[Dict]:
+    with timings.stage("parse"):
+        return _parse_reviews_from_page_html(html)
+
+
+def scrape_reviews_pipelined(
+    product_url: str,
+    star: int,
+    max_pages: int = 2,
+    headless: bool = False,
+    pool: Optional[BrowserPool] = None,
+    scroll_ceiling: float = SCROLL_CEILING,
+    index: Optional[ReviewIndex] = None,
+    on_page: Optional[PageCallback] = None,
+    start_page: int = 1,
+    workers: int = 2,
+    depth: int = 2,
+    timings: Optional[StageTimings] = None,
+) -> List[Dict]:
+    """Variant of ``scrape_reviews_for_product`` that parses page N while page N+1 loads.
+
+    The browser thread only navigates and captures HTML; parsing runs on
+    ``workers`` threads. At most ``depth`` captured pages wait for delivery, so
+    a slow parser holds the browser back instead of piling up HTML. Results are
+    still delivered in page order.
+    """
+    if pool is None:
+        with BrowserPool(headless=headless) as own_pool:
+            return scrape_reviews_pipelined(
+                product_url, star, max_pages=max_pages, headless=headless, pool=own_pool, scroll_ceiling=scroll_ceiling,
+                index=index, on_page=on_page, start_page=start_page, workers=workers, depth=depth, timings=timings,
+            )
+
+    if start_page > max_pages:
+        return []
+    timings = timings if timings is not None else StageTimings()
+    depth = max(1, depth)
+
+    with pool.page() as page, ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="review-parse") as executor:
+        context = page.context
+
+        base_reviews_url = _direct_reviews_url(product_url, pool.review_links)
+        host, asin = _extract_host_and_asin(product_url)
+        if not base_reviews_url or not asin:
+            return []
+
+        crawl = _ProductCrawl(asin, star, max_pages, index, on_page)
+        # (page, parse future, when the page's fetch started)
+        in_flight: Deque[Tuple[int, Future, float]] = deque()
+
+        def deliver(page_idx: int, future: Future, started: float) -> bool:
+            with timings.stage("wait"):
+                chunk = future.result()
+            with timings.stage("deliver"):
+                if not chunk:
+                    crawl.fallback("ajax")
+                    with METRICS.timer("ajax_fallback", asin=asin, page=page_idx):
+                        chunk = _fetch_reviews_via_ajax(
+                            context, host, asin, star, page_idx, cache=pool.cache, limiter=pool.limiter, archive=pool.archive,
+                        )
+                return crawl.deliver(page_idx, chunk, time.monotonic() - started)
+
+        try:
+            clicked = False
+            if start_page == 1:
+                with timings.stage("fetch"):
+                    base_reviews_url = _open_reviews_page(
+                        page, product_url, base_reviews_url, pool.limiter, pool.review_links, pool.sessions,
+                    )
+                if base_reviews_url is None:
+                    raise _blocked(asin, 1)
+                with timings.stage("settle"):
+                    _dismiss_overlays(page)
+                    _scroll_until_stable(page, scroll_ceiling)
+                clicked = _click_star_filter_if_present(page, star)
+
+            stop = False
+            for page_idx in range(start_page, max_pages + 1):
+                started = time.monotonic()
+                with timings.stage("fetch"), METRICS.timer("navigate", asin=asin, page=page_idx):
+                    if not clicked or page_idx > 1:
+                        url = _apply_star_filter_query(base_reviews_url, star, page_number=page_idx)
+                        status = _navigate(page, url, pool.limiter, sessions=pool.sessions)
+                    else:
+                        status = _classify_page(page)
+                if not crawl.admit(page_idx, status):
+                    break
+                with timings.stage("settle"), METRICS.timer("scroll", asin=asin, page=page_idx):
+                    _dismiss_overlays(page)
+                    _scroll_until_stable(page, scroll_ceiling)
+                with timings.stage("capture"):
+                    html = page.content()
+                    has_next = page_idx < crawl.last_page and page.locator('li.a-last a').count() > 0
+                if pool.archive is not None:
+                    # Compress and write on a parse worker, off the browser thread
+                    executor.submit(
+                        pool.archive.put, KIND_PAGE, host, asin, star, page_idx, page.url, html,
+                        # Only admitted pages get here, so never a block
+                        status=status.status, blocked=False,
+                    )
+                in_flight.append((page_idx, executor.submit(_timed_parse, timings, html), started))
+
+                # Deliver whatever is ready; block only when the queue is full
+                while in_flight and (len(in_flight) >= depth or in_flight[0][1].done()):
+                    if not deliver(*in_flight.popleft()):
+                        stop = True
+                        break
+                if stop or not has_next:
+                    break
+
+            while in_flight and not stop:
+                stop = not deliver(*in_flight.popleft())
+        except BlockedError as e:
+            e.rows = crawl.finish()
+            raise
+        finally:
+            for _, future, _ in in_flight:
+                future.cancel()
+        return crawl.finish()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from metrics import METRICS
+from utils import ROOT_DIR, STORAGE_STATE_PATH
+
+
+SESSIONS_DIR = ROOT_DIR / "sessions"
+# Any of these means the storage state belongs to a signed-in account
+SIGNED_IN_COOKIES = {"at-main", "sess-at-main", "x-main"}
+CSRF_COOKIE = "anti-csrftoken-a2z"
+
+
+class NoSessionError(RuntimeError):
+    """Raised when no saved session passes the health check."""
+
+
+class Session:
+    def __init__(self, name: str, path: Path) -> None:
+        self.name = name
+        self.path = path
+        self.state: Optional[Dict[str, Any]] = None
+        self.problem: Optional[str] = None
+        self.in_use = 0
+        self.last_used = 0.0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.ok = 0
+        self.blocks = 0
+        self.load()
+
+    @property
+    def healthy(self) -> bool:
+        return self.problem is None
+
+    def load(self) -> None:
+        try:
+            self.state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            self.state, self.problem = None, f"unreadable: {e}"
+            return
+        self.problem = check_storage_state(self.state)
+
+    def cookies(self) -> List[Dict[str, Any]]:
+        return (self.state or {}).get("cookies", [])
+
+    def success_rate(self) -> float:
+        total = self.ok + self.blocks
+        return self.ok / total if total else 1.0
+
+
+def check_storage_state(state: Dict[str, Any], now: Optional[float] = None) -> Optional[str]:
+    """None if the storage state has a live sign-in and CSRF cookie, else what is missing."""
+    now = time.time() if now is None else now
+    # Playwright writes -1 for session cookies
+    live = {c.get("name") for c in state.get("cookies", []) if c.get("value") and (c.get("expires", -1) <= 0 or c["expires"] > now)}
+    if not live & SIGNED_IN_COOKIES:
+        return "not signed in: sign-in cookies missing or expired"
+    if CSRF_COOKIE not in live:
+        return f"no {CSRF_COOKIE} cookie"
+    return None
+
+
+def session_path(name: str) -> Path:
+    return SESSIONS_DIR / f"{name}.json"
+
+
+class SessionPool:
+    """Several saved logins (``sessions/<name>.json``) shared by the crawl engines.
+
+    Work goes to the healthy session with the fewest users, then the least
+    recently used. A block puts a session on a jittered, exponentially growing
+    cooldown; when every session is cooling down, ``acquire`` waits for the
+    first one to come back. Safe to share between threads and asyncio tasks.
+    """
+
+    def __init__(
+        self,
+        paths: Optional[List[Path]] = None,
+        cooldown_base: float = 60.0,
+        cooldown_max: float = 1800.0,
+    ) -> None:
+        if paths is None:
+            paths = sorted(SESSIONS_DIR.glob("*.json"))
+            if STORAGE_STATE_PATH.exists():
+                paths.insert(0, STORAGE_STATE_PATH)
+        self.sessions = [Session(p.stem if p != STORAGE_STATE_PATH else "default", Path(p)) for p in paths]
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self._lock = threading.Lock()
+        # Browser context -> the session it is signed in as
+        self._contexts: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def healthy(self) -> List[Session]:
+        return [s for s in self.sessions if s.healthy]
+
+    def _pick(self) -> Session | float:
+        """A session to use now, or how long to wait for one."""
+        with self._lock:
+            candidates = self.healthy()
+            if not candidates:
+                raise NoSessionError("no healthy session; run --check-sessions")
+            now = time.monotonic()
+            ready = [s for s in candidates if s.cooldown_until <= now]
+            if not ready:
+                return min(s.cooldown_until for s in candidates) - now
+            session = min(ready, key=lambda s: (s.in_use, s.last_used))
+            session.in_use += 1
+            session.last_used = now
+            return session
+
+    def acquire(self) -> Session:
+        while True:
+            picked = self._pick()
+            if isinstance(picked, Session):
+                return picked
+            METRICS.observe("session_wait", picked)
+            time.sleep(picked)
+
+    async def acquire_async(self) -> Session:
+        while True:
+            picked = self._pick()
+            if isinstance(picked, Session):
+                return picked
+            METRICS.observe("session_wait", picked)
+            await asyncio.sleep(picked)
+
+    def release(self, session: Session, state: Optional[Dict[str, Any]] = None) -> None:
+        """Give a session back; ``state`` is the context's refreshed storage state."""
+        with self._lock:
+            session.in_use = max(0, session.in_use - 1)
+            if state is not None:
+                session.state = state
+
+    def success(self, session: Session) -> None:
+        with self._lock:
+            session.ok += 1
+            session.strikes = 0
+        METRICS.count(f"session.{session.name}.ok")
+
+    def blocked(self, session: Session) -> float:
+        """Record a block; returns the cooldown in seconds."""
+        with self._lock:
+            session.blocks += 1
+            session.strikes += 1
+            delay = min(self.cooldown_max, self.cooldown_base * 2 ** (session.strikes - 1))
+            delay = random.uniform(delay / 2, delay)
+            session.cooldown_until = max(session.cooldown_until, time.monotonic() + delay)
+        METRICS.count(f"session.{session.name}.blocked")
+        print(f"session {session.name}: blocked, cooling down {delay:.0f}s")
+        return delay
+
+    def cooling(self, session: Session) -> bool:
+        return session.cooldown_until > time.monotonic()
+
+    def watch(self, context, session: Session) -> None:
+        """Attribute the navigations the engines report for ``context`` (see ``navigated``) to ``session``."""
+        self._contexts[context] = session
+
+    def navigated(self, context, blocked: bool) -> None:
+        """Count a classified page navigation as a success or block of the context's session."""
+        session = self._contexts.get(context)
+        if session is None:
+            return
+        if blocked:
+            self.blocked(session)
+        else:
+            self.success(session)
+
+    def report(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "name": s.name,
+                    "path": str(s.path),
+                    "healthy": s.healthy,
+                    "problem": s.problem,
+                    "requests": s.ok + s.blocks,
+                    "blocks": s.blocks,
+                    "success_rate": round(s.success_rate(), 3),
+                }
+                for s in self.sessions
+            ]
+
+    def summary(self) -> str:
+        parts = []
+        for r in self.report():
+            if not r["healthy"]:
+                parts.append(f"{r['name']}: unhealthy ({r['problem']})")
+            else:
+                parts.append(f"{r['name']}: {r['requests']} requests, {r['blocks']} blocks, {r['success_rate']:.0%} ok")
+        return "; ".join(parts) or "no sessions"
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+
+from amazon_http import HttpReviewClient  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(products=2, pages=3) as srv:
+        yield srv
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    """HttpReviewClient pointed at a fixture server, signed in as nobody."""
+    clients = []
+
+    def make(srv: FixtureServer, **kwargs) -> HttpReviewClient:
+        client = HttpReviewClient(storage_state_path=tmp_path / "no_login.json", origin=srv.origin, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from amazon_http import BlockedError, scrape_reviews_http
+from fixture_server import FixtureServer
+from http_cache import ResponseCache
+from page_archive import KIND_PAGE, PageArchive
+from review_links import ReviewLinkMap
+
+
+def test_reads_every_page_in_order(server, make_client):
+    pages = []
+    rows = scrape_reviews_http(
+        server.product_urls()[0], 5, max_pages=3, client=make_client(server),
+        on_page=lambda idx, chunk: pages.append((idx, len(chunk))),
+    )
+    assert pages == [(1, 10), (2, 10), (3, 10)]
+    assert len(rows) == 30
+    assert all(r["review_content"] for r in rows)
+
+
+def test_page_fanout_gives_the_same_rows(server, make_client):
+    link = server.product_urls()[1]
+    serial = scrape_reviews_http(link, 5, max_pages=3, client=make_client(server))
+    fanned = scrape_reviews_http(link, 5, max_pages=3, client=make_client(server, page_fanout=3))
+    assert fanned == serial
+
+
+def test_start_page_past_max_pages_fetches_nothing(server, make_client):
+    assert scrape_reviews_http(server.product_urls()[0], 5, max_pages=2, client=make_client(server), start_page=3) == []
+    assert server.stats == {}
+
+
+def test_url_without_asin_is_not_a_block(server, make_client):
+    assert scrape_reviews_http("https://www.amazon.com/gp/help", 5, client=make_client(server)) == []
+
+
+def test_captcha_raises_blocked_error(make_client):
+    with FixtureServer(products=1, captcha_rate=1.0) as srv:
+        with pytest.raises(BlockedError) as caught:
+            scrape_reviews_http(srv.product_urls()[0], 5, max_pages=3, client=make_client(srv))
+    assert caught.value.next_page == 1
+    assert caught.value.rows == []
+
+
+def test_no_reviews_page_reports_empty(make_client):
+    empty = []
+    with FixtureServer(products=1, no_reviews_rate=1.0) as srv:
+        rows = scrape_reviews_http(srv.product_urls()[0], 5, max_pages=3, client=make_client(srv), on_empty=empty.append)
+    assert rows == []
+    assert empty == [1]
+
+
+def test_archive_keeps_blocked_answers_flagged(tmp_path, make_client):
+    archive = PageArchive(tmp_path / "archive")
+    try:
+        with FixtureServer(products=1, pages=2) as srv:
+            scrape_reviews_http(srv.product_urls()[0], 5, max_pages=2, client=make_client(srv, archive=archive))
+        with FixtureServer(products=1, captcha_rate=1.0) as srv:
+            with pytest.raises(BlockedError):
+                scrape_reviews_http(srv.product_urls()[0], 5, max_pages=2, client=make_client(srv, archive=archive))
+        with sqlite3.connect(str(tmp_path / "archive" / "index.sqlite")) as db:
+            found = db.execute("SELECT kind, page, status, blocked FROM pages ORDER BY id").fetchall()
+        assert found == [(KIND_PAGE, 1, 200, 0), (KIND_PAGE, 2, 200, 0), (KIND_PAGE, 1, 200, 1)]
+        # Re-parsing skips the blocked answer and keeps the earlier good copy of page 1
+        assert [(r.page, r.status) for r in archive.latest()] == [(1, 200), (2, 200)]
+    finally:
+        archive.close()
+
+
+def test_cache_hits_are_not_archived_again(tmp_path, server, make_client):
+    archive = PageArchive(tmp_path / "archive")
+    try:
+        for _ in range(2):
+            cache = ResponseCache(tmp_path / "cache")
+            try:
+                scrape_reviews_http(server.product_urls()[0], 5, max_pages=2, client=make_client(server, cache=cache, archive=archive))
+            finally:
+                cache.close()
+        assert archive.records == 2
+    finally:
+        archive.close()
+
+
+class MovedReviewsServer(FixtureServer):
+    """The first product's ASIN reviews URL is a plain page; its detail page links elsewhere."""
+
+    def route(self, method, path, query, form):
+        asin = self.asins()[0]
+        if path.startswith(f"/product-reviews/{asin}"):
+            return 200, "text/html; charset=utf-8", "<html><body>Nothing to see</body></html>"
+        if path.startswith(f"/dp/{asin}"):
+            link = f"/product-reviews/{self.asins()[1]}?reviewerType=all_reviews"
+            return 200, "text/html; charset=utf-8", f'<a data-hook="see-all-reviews-link-foot" href="{link}">All reviews</a>'
+        return super().route(method, path, query, form)
+
+
+def test_reviews_link_is_learned_from_the_detail_page(tmp_path, make_client):
+    links = ReviewLinkMap(tmp_path / "links.sqlite")
+    try:
+        with MovedReviewsServer(products=2, pages=2) as srv:
+            link = srv.product_urls()[0]
+            rows = scrape_reviews_http(link, 5, max_pages=2, client=make_client(srv, review_links=links))
+            learned = links.get("www.amazon.com", srv.asins()[0])
+            assert learned == f"https://www.amazon.com/product-reviews/{srv.asins()[1]}?reviewerType=all_reviews"
+            assert len(rows) == 20
+
+            before = dict(srv.stats)
+            again = scrape_reviews_http(link, 5, max_pages=2, client=make_client(srv, review_links=links))
+            # Straight to the learned link: two review pages, no detail page
+            assert sum(srv.stats.values()) - sum(before.values()) == 2
+            assert again == rows
+    finally:
+        links.close()
@@ -0,0 +1,76 @@
+import pytest
+
+from dist import _scrape_unit
+from fixture_server import FixtureServer
+from work_queue import CANCELLED, DONE, FAILED, LEASED, PENDING, SqliteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with SqliteWorkQueue(tmp_path / "queue.sqlite", max_attempts=2) as q:
+        yield q
+
+
+def _listing(url="https://www.amazon.com/dp/B0BENCH001", asin="B0BENCH001", star=5, pages=4):
+    return [(url, asin, star, page) for page in range(1, pages + 1)]
+
+
+def test_a_unit_is_leased_to_one_worker(queue):
+    queue.enqueue("job", _listing(pages=1))
+    assert len(queue.lease("w1")) == 1
+    assert queue.lease("w2") == []
+
+
+def test_only_the_lease_holder_completes(queue):
+    queue.enqueue("job", _listing(pages=1))
+    unit = queue.lease("w1")[0]
+    assert not queue.complete(unit, "w2", [{"review_content": "stolen"}])
+    assert queue.complete(unit, "w1", [{"review_content": "ok"}])
+    assert list(queue.rows("job")) == [{"review_content": "ok"}]
+    assert queue.counts("job")[DONE] == 1
+
+
+def test_a_lapsed_lease_cannot_overwrite_the_new_holder(queue):
+    queue.enqueue("job", _listing(pages=1))
+    stale = queue.lease("w1", visibility=0.0)[0]
+    taken = queue.lease("w2")[0]
+    assert taken.id == stale.id
+    assert not queue.extend(stale, "w1")
+    assert queue.fail(stale, "w1", "timeout") is None
+    assert not queue.complete(stale, "w1", [{"review_content": "late"}])
+    assert queue.complete(taken, "w2", [{"review_content": "fresh"}])
+    assert list(queue.rows("job")) == [{"review_content": "fresh"}]
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.enqueue("job", _listing(pages=1))
+    assert queue.fail(queue.lease("w1")[0], "w1", "boom") == PENDING
+    assert queue.fail(queue.lease("w1")[0], "w1", "boom") == FAILED
+    assert [f["error"] for f in queue.failures("job")] == ["boom"]
+
+
+def test_cancel_after_drops_only_later_pending_pages_of_the_listing(queue):
+    queue.enqueue("job", _listing(pages=4))
+    assert [u.page for u in queue.lease("w1", n=2)] == [1, 2]
+    queue.enqueue("job", _listing(star=1, pages=4))
+    assert queue.cancel_after("job", "B0BENCH001", 5, 1) == 2
+    counts = queue.counts("job")
+    assert counts[CANCELLED] == 2
+    # The leased page 2 and the other star's listing are untouched
+    assert counts[LEASED] == 2
+    assert counts[PENDING] == 4
+
+
+def _unit(queue, srv, page):
+    asin = srv.asins()[0]
+    queue.enqueue("job", [(srv.product_urls()[0], asin, 5, page)])
+    return queue.lease("w1")[0]
+
+
+def test_scrape_unit_reports_empty_only_for_a_no_reviews_page(queue, make_client):
+    with FixtureServer(products=1, pages=2) as srv:
+        rows, blocked, empty = _scrape_unit(None, make_client(srv), _unit(queue, srv, 2), headless=True)
+    assert (len(rows), blocked, empty) == (10, False, False)
+    with FixtureServer(products=1, no_reviews_rate=1.0) as srv:
+        rows, blocked, empty = _scrape_unit(None, make_client(srv), _unit(queue, srv, 3), headless=True)
+    assert (rows, blocked, empty) == ([], False, True)
@@ -1,17 +1,31 @@
+import csv
+import hashlib
 import json
 import os
 import re
+import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
 
-import pandas as pd
+from metrics import METRICS
 
 
 ROOT_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = ROOT_DIR / "output"
 STORAGE_STATE_PATH = ROOT_DIR / "storage_state.json"
 
+# Answers that mean Amazon is blocking us, shared by the crawl engines and the session pool
+BLOCK_STATUSES = {403, 429, 503}
+BLOCK_URL_MARKERS = ["/errors/validateCaptcha", "/ap/signin"]
+# Text of captcha / robot-check pages, which Amazon often serves with a 200
+BLOCK_FLAGS = [
+    "Enter the characters you see below",
+    "To discuss automated access to Amazon data",
+    "sorry we just need to make sure you're not a robot",
+    "CBI_ROBOT_MITIGATION",
+]
+
 ASIN_PATTERNS = [
     re.compile(r"/dp/([A-Z0-9]{10})"),
     re.compile(r"/gp/product/([A-Z0-9]{10})"),
@@ -19,6 +33,15 @@ ASIN_PATTERNS = [
 ]
 
 
+def response_is_blocked(status: Optional[int], url: str) -> bool:
+    return status in BLOCK_STATUSES or any(marker in url for marker in BLOCK_URL_MARKERS)
+
+
+def text_has_block(text: str) -> bool:
+    lowered = text.lower()
+    return any(flag.lower() in lowered for flag in BLOCK_FLAGS)
+
+
 def ensure_output_dir() -> None:
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -31,20 +54,138 @@ def write_json(items: List[Dict[str, Any]], filename: str) -> Path:
     return path
 
 
-def write_csv(items: List[Dict[str, Any]], filename: str) -> Path:
-    ensure_output_dir()
-    path = OUTPUT_DIR / filename
-    df = pd.DataFrame(items)
-    df.to_csv(path, index=False)
-    return path
+REVIEW_FIELDS = [
+    "review_content",
+    "review_rating_text",
+    "review_date",
+    "reviewer",
+    "product_index",
+    "product_url",
+    "asin",
+    "star",
+]
+
+OUTPUT_FORMATS = ["jsonl", "csv", "parquet"]
+
+
+class _StreamingSink:
+    """Appends rows as they arrive; flushes every write and fsyncs periodically."""
+
+    def __init__(self, path: Path, fsync_every: float = 2.0, append: bool = False) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.count = 0
+        self._existed = append and self.path.exists() and self.path.stat().st_size > 0
+        self._f = self.path.open("a" if append else "w", encoding="utf-8", newline="")
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        self._write(rows)
+        self.count += len(rows)
+        self._f.flush()
+        if time.monotonic() - self._last_sync >= self.fsync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self.sync()
+        self._f.close()
+
+
+class JsonlSink(_StreamingSink):
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+class CsvSink(_StreamingSink):
+    def __init__(self, path: Path, fieldnames: Optional[List[str]] = None, fsync_every: float = 2.0, append: bool = False) -> None:
+        super().__init__(path, fsync_every=fsync_every, append=append)
+        self._writer = csv.DictWriter(self._f, fieldnames=fieldnames or REVIEW_FIELDS, extrasaction="ignore")
+        if not self._existed:
+            self._writer.writeheader()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+
+
+class MultiSink:
+    def __init__(self, sinks: List[Any]) -> None:
+        self.sinks = sinks
+
+    @property
+    def count(self) -> int:
+        return self.sinks[0].count if self.sinks else 0
 
+    @property
+    def paths(self) -> List[Path]:
+        return [s.path for s in self.sinks if hasattr(s, "path")]
 
-def write_text(content: str, filename: str) -> Path:
+    def __enter__(self) -> "MultiSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        for s in self.sinks:
+            s.write_rows(rows)
+
+    def sync(self) -> None:
+        for s in self.sinks:
+            s.sync()
+
+    def close(self) -> None:
+        for s in self.sinks:
+            s.close()
+
+
+def sink_paths(sinks: Iterable[MultiSink]) -> List[str]:
+    """Output paths of several sinks, each listed once; all Parquet sinks share one dataset directory."""
+    return list(dict.fromkeys(str(p) for sink in sinks for p in sink.paths))
+
+
+def parse_formats(spec: str) -> List[str]:
+    formats = [f.strip().lower() for f in spec.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in OUTPUT_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"输出格式必须为 {', '.join(OUTPUT_FORMATS)} 之一")
+    return formats
+
+
+def open_review_sinks(base_name: str, append: bool = False, formats: Iterable[str] = ("jsonl", "csv")) -> MultiSink:
     ensure_output_dir()
-    path = OUTPUT_DIR / filename
-    with path.open("w", encoding="utf-8") as f:
-        f.write(content)
-    return path
+    sinks: List[Any] = []
+    for fmt in formats:
+        if fmt == "jsonl":
+            sinks.append(JsonlSink(OUTPUT_DIR / (base_name + ".jsonl"), append=append))
+        elif fmt == "csv":
+            sinks.append(CsvSink(OUTPUT_DIR / (base_name + ".csv"), append=append))
+        elif fmt == "parquet":
+            from columnar import ParquetDatasetSink  # pyarrow is optional
+
+            sinks.append(ParquetDatasetSink())
+    return MultiSink(sinks)
 
 
 def normalize_star_input(star: str) -> int:
@@ -60,6 +201,52 @@ def normalize_star_input(star: str) -> int:
     return value
 
 
+def parse_star_list(spec: str) -> List[int]:
+    """``"5"``, ``"5星"``, ``"1,2,5"`` or ``"all"`` → distinct stars in the given order."""
+    if spec.strip().lower() in ("all", "全部"):
+        return [5, 4, 3, 2, 1]
+    stars: List[int] = []
+    for item in spec.replace("，", ",").split(","):
+        if not item.strip():
+            continue
+        star = normalize_star_input(item)
+        if star not in stars:
+            stars.append(star)
+    if not stars:
+        raise ValueError("星级必须为 1-5 的整数")
+    return stars
+
+
+RATING_NUMBER = r"(\d+(?:[.,]\d+)?)"
+# The scale comes first in Japanese ("5つ星のうち4.0") and last elsewhere
+# ("4.0 out of 5 stars", "4,0 von 5 Sternen", "4,0 sur 5 étoiles", "4.0 颗星，最多 5 颗星")
+RATING_SCALE_FIRST_RE = re.compile(r"5\s*つ星のうち\s*" + RATING_NUMBER)
+RATING_SCALE_LAST_RE = re.compile(RATING_NUMBER + r"\s*(?:out of|von|sur|de|su|van|z|из|颗星，最多|顆星，最多)\s*5\b", re.IGNORECASE)
+RATING_RE = re.compile(RATING_NUMBER)
+
+
+def rating_from_text(text: str) -> Optional[int]:
+    """``"4.0 out of 5 stars"`` or ``"5つ星のうち4.0"`` → 4; ``None`` when no rating can be read."""
+    text = text or ""
+    m = RATING_SCALE_FIRST_RE.search(text) or RATING_SCALE_LAST_RE.search(text) or RATING_RE.search(text)
+    if not m:
+        return None
+    value = int(float(m.group(1).replace(",", ".")))
+    return value if 1 <= value <= 5 else None
+
+
+def bucket_by_star(rows: Iterable[Dict[str, Any]], stars: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    buckets: Dict[int, List[Dict[str, Any]]] = {star: [] for star in stars}
+    for row in rows:
+        star = rating_from_text(row.get("review_rating_text") or "")
+        if star is None:
+            # No readable rating: the row can't be bucketed and is dropped
+            METRICS.count("unrated_rows")
+        elif star in buckets:
+            buckets[star].append(row)
+    return buckets
+
+
 def extract_host_and_asin_from_url(url: str) -> Tuple[str, Optional[str]]:
     # Replace full-width percent '％' with '%'
     url = url.replace("％", "%")
@@ -80,3 +267,11 @@ def normalize_product_url(url: str) -> str:
         return f"https://{host}/dp/{asin}"
     # Fallback: return original with full-width percent fixed
     return url.replace("％", "%")
+
+
+FINGERPRINT_FIELDS = ["reviewer", "review_date", "review_content"]
+
+
+def review_fingerprint(row: Dict[str, Any]) -> str:
+    parts = [" ".join(str(row.get(k) or "").split()) for k in FINGERPRINT_FIELDS]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils import ROOT_DIR
+
+
+QUEUE_PATH = ROOT_DIR / "work_queue.sqlite"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATES = [PENDING, LEASED, DONE, FAILED, CANCELLED]
+
+
+class WorkUnit(NamedTuple):
+    id: int
+    job: str
+    url: str
+    asin: str
+    star: int
+    page: int
+    attempts: int
+
+
+class WorkQueue:
+    """Queue of (ASIN, star, page) units shared by a coordinator and any number of workers.
+
+    A leased unit is invisible to other workers until its lease runs out
+    (visibility timeout); a worker that dies simply lets it reappear. Only the
+    worker holding a unit's lease can complete or fail it, so a worker whose
+    lease lapsed and was taken over cannot overwrite the new holder's result.
+    Backends implement the methods below.
+    """
+
+    def enqueue(self, job: str, units: Iterable[Tuple[str, str, int, int]]) -> int:
+        """Add (url, asin, star, page) units to ``job``; returns how many were new."""
+        raise NotImplementedError
+
+    def lease(self, worker: str, n: int = 1, visibility: float = 300.0) -> List[WorkUnit]:
+        raise NotImplementedError
+
+    def extend(self, unit: WorkUnit, worker: str, visibility: float = 300.0) -> bool:
+        """Push the lease deadline out; False if the unit is no longer leased by ``worker``."""
+        raise NotImplementedError
+
+    def complete(self, unit: WorkUnit, worker: str, rows: List[Dict[str, Any]]) -> bool:
+        """Store the unit's rows and mark it done; False if the unit is no longer leased by ``worker``."""
+        raise NotImplementedError
+
+    def fail(self, unit: WorkUnit, worker: str, error: str, retry_after: float = 0.0) -> Optional[str]:
+        """Record a failed attempt; returns the unit's new state (pending again, or failed for good).
+
+        None if the unit is no longer leased by ``worker``.
+        """
+        raise NotImplementedError
+
+    def cancel_after(self, job: str, asin: str, star: int, page: int) -> int:
+        """Drop the pending units past ``page`` of a listing that has run out of reviews."""
+        raise NotImplementedError
+
+    def counts(self, job: Optional[str] = None) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def rows(self, job: str) -> Iterator[Dict[str, Any]]:
+        """Stored rows of ``job`` in (ASIN, star, page) order."""
+        raise NotImplementedError
+
+    def failures(self, job: Optional[str] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class SqliteWorkQueue(WorkQueue):
+    """``WorkQueue`` in one SQLite file; fine for several processes on one machine.
+
+    Leases are taken inside ``BEGIN IMMEDIATE`` so two workers never get the
+    same unit.
+    """
+
+    def __init__(self, path: Path = QUEUE_PATH, max_attempts: int = 3) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " id INTEGER PRIMARY KEY, job TEXT, url TEXT, asin TEXT, star INTEGER, page INTEGER,"
+            " state TEXT, attempts INTEGER DEFAULT 0, worker TEXT, lease_until REAL DEFAULT 0,"
+            " available_at REAL DEFAULT 0, error TEXT, updated REAL,"
+            " UNIQUE (job, asin, star, page))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS units_state ON units (state, available_at, lease_until)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (unit_id INTEGER PRIMARY KEY, rows TEXT)")
+
+    def enqueue(self, job: str, units: Iterable[Tuple[str, str, int, int]]) -> int:
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO units (job, url, asin, star, page, state, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(job, url, asin, star, page, PENDING, now) for url, asin, star, page in units],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return self._db.total_changes - before
+
+    def lease(self, worker: str, n: int = 1, visibility: float = 300.0) -> List[WorkUnit]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Leases that ran out on their last attempt will not be retried
+                self._db.execute(
+                    "UPDATE units SET state = ?, error = COALESCE(error, 'lease expired'), updated = ?"
+                    " WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, now, LEASED, now, self.max_attempts),
+                )
+                picked = self._db.execute(
+                    "SELECT id, job, url, asin, star, page, attempts FROM units"
+                    " WHERE (state = ? AND available_at <= ?) OR (state = ? AND lease_until < ?)"
+                    " ORDER BY job, asin, star, page LIMIT ?",
+                    (PENDING, now, LEASED, now, n),
+                ).fetchall()
+                for row in picked:
+                    self._db.execute(
+                        "UPDATE units SET state = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (LEASED, worker, now + visibility, now, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return [WorkUnit(*row[:6], row[6] + 1) for row in picked]
+
+    def extend(self, unit: WorkUnit, worker: str, visibility: float = 300.0) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE units SET lease_until = ?, updated = ? WHERE id = ? AND state = ? AND worker = ?",
+                (now + visibility, now, unit.id, LEASED, worker),
+            )
+        return cur.rowcount > 0
+
+    def _leased_update(self, worker: str, unit: WorkUnit, sql: str, params: Tuple, then: Iterable[Tuple[str, Tuple]] = ()) -> bool:
+        """Run ``sql`` (an UPDATE of the unit) only while ``worker`` holds the lease, then ``then``; True if it applied."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._db.execute(sql + " WHERE id = ? AND worker = ? AND state = ?", (*params, unit.id, worker, LEASED))
+                applied = cur.rowcount > 0
+                if applied:
+                    for then_sql, then_params in then:
+                        self._db.execute(then_sql, then_params)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return applied
+
+    def complete(self, unit: WorkUnit, worker: str, rows: List[Dict[str, Any]]) -> bool:
+        return self._leased_update(
+            worker, unit, "UPDATE units SET state = ?, error = NULL, updated = ?", (DONE, time.time()),
+            then=[("INSERT OR REPLACE INTO results (unit_id, rows) VALUES (?, ?)", (unit.id, json.dumps(rows, ensure_ascii=False)))],
+        )
+
+    def fail(self, unit: WorkUnit, worker: str, error: str, retry_after: float = 0.0) -> Optional[str]:
+        now = time.time()
+        state = FAILED if unit.attempts >= self.max_attempts else PENDING
+        applied = self._leased_update(
+            worker, unit, "UPDATE units SET state = ?, error = ?, available_at = ?, lease_until = 0, updated = ?",
+            (state, error, now + retry_after, now),
+        )
+        return state if applied else None
+
+    def cancel_after(self, job: str, asin: str, star: int, page: int) -> int:
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE units SET state = ?, updated = ? WHERE job = ? AND asin = ? AND star = ? AND page > ? AND state = ?",
+                (CANCELLED, time.time(), job, asin, star, page, PENDING),
+            )
+        return cur.rowcount
+
+    def counts(self, job: Optional[str] = None) -> Dict[str, int]:
+        now = time.time()
+        where, params = ("WHERE job = ?", (job,)) if job else ("", ())
+        with self._lock:
+            found = dict(self._db.execute(f"SELECT state, COUNT(*) FROM units {where} GROUP BY state", params).fetchall())
+            # A lapsed lease is work waiting to be picked up again
+            lapsed = self._db.execute(
+                f"SELECT COUNT(*) FROM units {where} {'AND' if where else 'WHERE'} state = ? AND lease_until < ?",
+                (*params, LEASED, now),
+            ).fetchone()[0]
+        counts = {state: found.get(state, 0) for state in STATES}
+        counts["expired"] = lapsed
+        return counts
+
+    def rows(self, job: str) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            stored = self._db.execute(
+                "SELECT r.rows FROM results r JOIN units u ON u.id = r.unit_id WHERE u.job = ? AND u.state = ?"
+                " ORDER BY u.asin, u.star, u.page",
+                (job, DONE),
+            ).fetchall()
+        for (data,) in stored:
+            yield from json.loads(data)
+
+    def failures(self, job: Optional[str] = None) -> List[Dict[str, Any]]:
+        where, params = ("AND job = ?", (job,)) if job else ("", ())
+        with self._lock:
+            found = self._db.execute(
+                f"SELECT job, asin, star, page, attempts, error FROM units WHERE state = ? {where} ORDER BY job, asin, star, page",
+                (FAILED, *params),
+            ).fetchall()
+        return [dict(zip(("job", "asin", "star", "page", "attempts", "error"), row)) for row in found]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_queue(spec: Optional[str] = None, max_attempts: int = 3) -> WorkQueue:
+    """Queue backend from a spec: a path or ``sqlite:///path`` (default ``work_queue.sqlite``)."""
+    if not spec:
+        return SqliteWorkQueue(QUEUE_PATH, max_attempts=max_attempts)
+    if "://" in spec:
+        scheme, _, rest = spec.partition("://")
+        if scheme != "sqlite":
+            raise ValueError(f"unsupported queue backend: {scheme}")
+        spec = rest
+    return SqliteWorkQueue(Path(spec), max_attempts=max_attempts)